@@ -0,0 +1,123 @@
+"""Admin view of the live population aggregates (open the app with ``?admin=1``).
+
+Only available when ``CLINIC_ADMIN_TOKEN`` is set on the server; the token is
+asked for once per session. Everything shown comes from the in-memory
+aggregates in ``clinic_companion.analytics``, never from raw submissions.
+"""
+import hmac
+import json
+import os
+
+import streamlit as st
+
+from clinic_companion import sessions
+from clinic_companion.analytics import ANALYTICS, VITALS
+
+PERIODS = {"Today": 1, "Last 7 days": 7, "Last 30 days": 30, "Everything kept": None}
+
+VITAL_LABELS = {
+    "sys_bp": "Systolic BP (mmHg)",
+    "dia_bp": "Diastolic BP (mmHg)",
+    "pulse": "Pulse (bpm)",
+    "temp_c": "Temperature (°C)",
+    "glucose": "Glucose (mmol/L)",
+}
+
+def _percent(rate) -> str:
+    return "—" if rate is None else f"{rate:.0%}"
+
+def _rows(counts: dict, total: int) -> list:
+    return [{"Category": k, "Count": n, "Share": f"{n / total:.0%}" if total else "—"} for k, n in counts.items()]
+
+def authorized() -> bool:
+    token = os.environ.get("CLINIC_ADMIN_TOKEN", "")
+    if not token:
+        st.warning("The admin view is turned off. Set `CLINIC_ADMIN_TOKEN` on the server to enable it.")
+        return False
+    if st.session_state.get("admin_ok"):
+        return True
+    entered = st.text_input("Admin token", type="password")
+    if entered and hmac.compare_digest(entered.encode("utf-8"), token.encode("utf-8")):
+        st.session_state["admin_ok"] = True
+        return True
+    if entered:
+        st.error("Wrong token.")
+    return False
+
+def render() -> None:
+    st.title("📊 Clinic admin: population overview")
+    if not authorized():
+        return
+
+    days, sites = ANALYTICS.days(), ANALYTICS.sites()
+    if not days:
+        st.info("No submissions recorded yet. Aggregates appear here after the first **Generate Visit Prep**.")
+        return
+
+    f1, f2 = st.columns(2)
+    with f1:
+        period = st.selectbox("Period", list(PERIODS))
+    with f2:
+        chosen_sites = st.multiselect("Sites", sites, default=sites)
+    chosen_days = ANALYTICS.days(PERIODS[period])
+    summary = ANALYTICS.summary(chosen_days, chosen_sites)
+    counts = summary["counts"]
+
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Submissions", summary["submissions"])
+    m2.metric("Fever rate (of temperatures entered)", _percent(summary["fever_rate"]))
+    m3.metric("With urgent warnings", _percent(summary["urgent_rate"]))
+
+    st.subheader("BP categories")
+    bp = counts.get("bp", {})
+    st.dataframe(_rows(bp, sum(bp.values())), hide_index=True, use_container_width=True)
+
+    st.subheader("Hydration risk")
+    hydration = counts.get("hydration", {})
+    st.dataframe(_rows(hydration, sum(hydration.values())), hide_index=True, use_container_width=True)
+
+    st.subheader("Red flags by trigger")
+    flags = counts.get("red_flags", {})
+    if flags:
+        st.dataframe(_rows(flags, summary["submissions"]), hide_index=True, use_container_width=True)
+        st.caption("Share = submissions with that warning (one submission can have several).")
+    else:
+        st.write("None in this period.")
+
+    st.subheader("Vitals (10th / 50th / 90th percentile of values entered)")
+    vitals = summary["vitals"]
+    st.dataframe(
+        [{"Vital": VITAL_LABELS[name], "Readings": vitals[name]["n"], "p10": vitals[name]["p10"],
+          "Median": vitals[name]["p50"], "p90": vitals[name]["p90"]} for name in VITALS if name in vitals],
+        hide_index=True, use_container_width=True,
+    )
+
+    st.subheader("By day and by site")
+    by = st.radio("Group by", ("day", "site"), horizontal=True)
+    breakdown = ANALYTICS.breakdown(by, chosen_days, chosen_sites)
+    st.dataframe(
+        [{by.title(): key, "Submissions": s["submissions"], "Fever rate": _percent(s["fever_rate"]),
+          "Urgent": _percent(s["urgent_rate"]),
+          "Median systolic": s["vitals"].get("sys_bp", {}).get("p50")} for key, s in breakdown.items()],
+        hide_index=True, use_container_width=True,
+    )
+
+    st.download_button(
+        "Download this summary (.json)",
+        data=json.dumps({"period": chosen_days, "sites": chosen_sites, "summary": summary,
+                         "by_" + by: breakdown}, indent=1),
+        file_name="clinic_companion_population.json",
+        mime="application/json",
+    )
+
+    with st.expander("Server memory by session"):
+        report = sessions.MONITOR.report(top=10)
+        st.caption(f"{report['sessions']} sessions ({report['connected']} connected), "
+                   f"{report['evictions']} evicted after {report['idle_timeout_s']:.0f} s idle. "
+                   "Updated by the background sweep.")
+        st.dataframe(
+            [{"Session": u["session"][:8], "State (KB)": round(u["state_bytes"] / 1024, 1),
+              "Files (KB)": round(u["file_bytes"] / 1024, 1), "Idle (s)": u["idle_s"],
+              "Evicted": u["evicted"]} for u in report["top"]],
+            hide_index=True, use_container_width=True,
+        )
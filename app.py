@@ -1,772 +1,637 @@
-import streamlit as st
-from datetime import datetime
-import html
-
-# ---------------------------
-# Page setup
-# ---------------------------
-st.set_page_config(page_title="Clinic Companion NG", page_icon="🏥", layout="centered")
-
-DISCLAIMER = (
-    "⚠️ **Educational use only (not medical advice).**\n\n"
-    "- This tool does **not** diagnose illness or recommend treatment.\n"
-    "- Do **not** start/stop medicines based on this.\n"
-    "- Use it to prepare for a conversation with a licensed clinician.\n"
-    "- If you feel very unwell or symptoms are severe, **seek urgent medical care**."
-)
-
-def _provided_num(x) -> bool:
-    return x is not None and float(x) > 0
-
-def safe_text(s: str) -> str:
-    """Escape text that might contain HTML-like characters."""
-    return html.escape(s or "").strip()
-
-# ---------------------------
-# Educational classification helpers (non-diagnostic)
-# ---------------------------
-def classify_bp(sys_bp: int, dia_bp: int) -> str:
-    if sys_bp <= 0 or dia_bp <= 0:
-        return "Not provided"
-    # soften to reduce panic: treat 120–124 as near-typical
-    if sys_bp < 90 or dia_bp < 60:
-        return "Low range"
-    if sys_bp < 125 and dia_bp < 80:
-        return "Typical / near typical"
-    if 125 <= sys_bp <= 129 and dia_bp < 80:
-        return "Borderline (monitor)"
-    if 130 <= sys_bp <= 139 or 80 <= dia_bp <= 89:
-        return "High range (mild–moderate)"
-    if sys_bp >= 140 or dia_bp >= 90:
-        return "High range"
-    return "Check entries"
-
-def bp_context() -> str:
-    return (
-        "BP can change due to stress, pain, poor sleep, caffeine, dehydration, and illness. "
-        "Clinicians often repeat readings after 5–10 minutes of rest."
-    )
-
-def classify_temp(temp_c: float) -> str:
-    if temp_c <= 0:
-        return "Not provided"
-    if temp_c < 36.0:
-        return "Below typical"
-    if 36.0 <= temp_c <= 37.7:
-        return "Typical"
-    if 37.8 <= temp_c <= 38.9:
-        return "Fever range"
-    if temp_c >= 39.0:
-        return "High fever range"
-    return "Check entries"
-
-def temp_context() -> str:
-    return (
-        "Fever is the body’s response to infection or inflammation. In Nigeria, clinicians may consider "
-        "malaria or respiratory infections depending on symptoms and tests."
-    )
-
-def classify_pulse(pulse: int) -> str:
-    if pulse <= 0:
-        return "Not provided"
-    if pulse < 60:
-        return "Below typical resting range"
-    if 60 <= pulse <= 100:
-        return "Typical resting range"
-    if pulse > 100:
-        return "Above typical resting range"
-    return "Check entries"
-
-def pulse_context() -> str:
-    return "Pulse can rise with fever, dehydration, pain, anxiety, or recent activity. Clinicians interpret it with symptoms."
-
-def classify_pcv(pcv: float, sex: str) -> str:
-    if pcv <= 0:
-        return "Not provided"
-    if sex == "Male":
-        low_cut, high_cut = 40.0, 54.0
-    elif sex == "Female":
-        low_cut, high_cut = 36.0, 48.0
-    else:
-        low_cut, high_cut = 37.0, 52.0
-
-    if pcv < low_cut:
-        return "Below typical"
-    if low_cut <= pcv <= high_cut:
-        return "Typical"
-    if pcv > high_cut:
-        return "Above typical"
-    return "Check entries"
-
-def pcv_context() -> str:
-    return (
-        "When PCV is low, clinicians often check nutrition, recent infections (including malaria depending on exposure), "
-        "and any history of blood loss. It does not automatically mean something serious, but it deserves review."
-    )
-
-def classify_glucose(glucose_mmol: float, fasting: bool) -> str:
-    if glucose_mmol <= 0:
-        return "Not provided"
-    if fasting:
-        if glucose_mmol < 3.9:
-            return "Low fasting range"
-        if 3.9 <= glucose_mmol <= 5.5:
-            return "Typical fasting range"
-        if 5.6 <= glucose_mmol <= 6.9:
-            return "Above typical fasting range"
-        if glucose_mmol >= 7.0:
-            return "High fasting range"
-    else:
-        if glucose_mmol < 3.9:
-            return "Low range"
-        if 3.9 <= glucose_mmol <= 7.7:
-            return "Common random range"
-        if 7.8 <= glucose_mmol <= 11.0:
-            return "Above typical random range"
-        if glucose_mmol > 11.0:
-            return "High random range"
-    return "Check entries"
-
-def glucose_context(fasting: bool) -> str:
-    if fasting:
-        return "Fasting glucose is best interpreted with context. Clinicians may confirm with repeat testing or HbA1c."
-    return "Random glucose depends on recent meals. Clinicians may suggest fasting glucose or HbA1c for clarity."
-
-# ---------------------------
-# BMI
-# ---------------------------
-def compute_bmi(height_cm: float, weight_kg: float):
-    if height_cm <= 0 or weight_kg <= 0:
-        return None
-    h_m = height_cm / 100.0
-    return weight_kg / (h_m * h_m)
-
-def classify_bmi(bmi: float) -> str:
-    if bmi is None:
-        return "Not provided"
-    if bmi < 18.5:
-        return "Lower than typical range"
-    if bmi < 25:
-        return "Typical range"
-    if bmi < 30:
-        return "Above typical range"
-    return "Higher risk range"
-
-# ---------------------------
-# Hydration (educational scoring)
-# ---------------------------
-def hydration_risk(drinking_less, urine_color, peeing_less, vomiting, diarrhea, heat_sweat, dry_dizzy):
-    score = 0
-    if drinking_less == "Yes":
-        score += 1
-    if urine_color == "Yellow":
-        score += 1
-    if urine_color == "Dark yellow":
-        score += 2
-    if peeing_less == "Yes":
-        score += 2
-    if vomiting == "Some":
-        score += 1
-    if vomiting == "Frequent":
-        score += 2
-    if diarrhea == "Some":
-        score += 1
-    if diarrhea == "Frequent":
-        score += 2
-    if heat_sweat == "Yes":
-        score += 1
-    if dry_dizzy == "Yes":
-        score += 1
-
-    if score >= 6:
-        return "High", score
-    if score >= 3:
-        return "Moderate", score
-    return "Low", score
-
-def hydration_advice(level: str):
-    if level == "High":
-        return [
-            "If you cannot keep fluids down, feel faint/confused, or symptoms are worsening, seek urgent medical care.",
-            "Small sips frequently can be easier than large amounts at once, especially if nauseated.",
-            "If vomiting/diarrhea is present, you can ask your clinician/pharmacist about oral rehydration solutions (ORS).",
-        ]
-    if level == "Moderate":
-        return [
-            "Increase fluid intake gradually. Small frequent sips may be easier if nauseated.",
-            "Watch for urine becoming lighter and urinating more normally over time.",
-            "If fever/heat exposure is present, drink a bit more than usual and rest.",
-        ]
-    return [
-        "Hydration looks okay from what you entered. Keep drinking fluids regularly.",
-        "If you’re in heat or sweating heavily, increase fluids a little and monitor urine color.",
-    ]
-
-# ---------------------------
-# Red flags (conservative)
-# ---------------------------
-def red_flags(symptoms_text: str, sys_bp: int, dia_bp: int, temp_c: float, glucose_mmol: float,
-             vomiting: str, diarrhea: str):
-    s = (symptoms_text or "").lower()
-    flags = []
-
-    symptom_triggers = [
-        ("chest pain", "Chest pain or heavy chest pressure"),
-        ("difficulty breathing", "Difficulty breathing"),
-        ("shortness of breath", "Shortness of breath"),
-        ("faint", "Fainting or repeated fainting"),
-        ("confusion", "Confusion or altered mental state"),
-        ("seiz", "Seizure / convulsions"),
-        ("stroke", "Stroke-like symptoms (face droop, arm weakness, speech trouble)"),
-        ("vomit blood", "Vomiting blood"),
-        ("black stool", "Black/tarry stool"),
-        ("bleeding", "Uncontrolled bleeding"),
-    ]
-    for key, label in symptom_triggers:
-        if key in s:
-            flags.append(label)
-
-    if sys_bp > 180 or dia_bp > 120:
-        flags.append("Very high blood pressure range (urgent assessment recommended).")
-    if (sys_bp > 0 and dia_bp > 0) and (sys_bp < 85 or dia_bp < 55):
-        flags.append("Very low blood pressure range, especially if weak/faint (urgent assessment may be needed).")
-    if temp_c >= 39.5:
-        flags.append("Very high fever (urgent assessment if persistent or with severe symptoms).")
-    if glucose_mmol > 13.9:
-        flags.append("Very high blood sugar range (urgent assessment if unwell, vomiting, confusion, or dehydrated).")
-    if 0 < glucose_mmol < 3.0:
-        flags.append("Very low blood sugar range (urgent assessment if shaky, sweaty, confused, faint).")
-
-    # dehydration + inability to keep fluids down (simple proxy)
-    if vomiting == "Frequent" or diarrhea == "Frequent":
-        flags.append("Frequent vomiting/diarrhea can cause dehydration. Seek care if you can’t keep fluids down.")
-
-    return list(dict.fromkeys(flags))
-
-# ---------------------------
-# Questions generator
-# ---------------------------
-def smart_questions(has_bp, has_temp, has_pulse, has_pcv, has_glucose, has_hydration, has_bmi):
-    qs = [
-        "Based on my symptoms and examination, what are the main things you are considering?",
-        "Which result matters most right now, and which ones can be monitored later?",
-        "Should we repeat any readings (BP/temperature) to confirm accuracy?",
-        "Do I need more tests? If yes, which ones and when?",
-        "What warning signs mean I should return urgently or go to emergency care?",
-        "While we investigate, what practical steps should I focus on (hydration, rest, meals, sleep)?",
-    ]
-    if has_bp:
-        qs.append("Was my blood pressure checked properly (correct cuff size, sitting position, after rest)?")
-    if has_temp:
-        qs.append("If this is fever, what causes are most likely in my case, and what tests are needed?")
-    if has_pulse:
-        qs.append("Is my pulse expected for my condition (fever, pain, anxiety, dehydration)?")
-    if has_pcv:
-        qs.append("If my PCV is low, should we check iron deficiency, malaria (if relevant), or bleeding?")
-    if has_glucose:
-        qs.append("Should I do fasting glucose or HbA1c to confirm what this reading means?")
-    if has_hydration:
-        qs.append("Could dehydration be contributing to my symptoms, and what should I monitor at home?")
-    if has_bmi:
-        qs.append("Does my weight/BMI affect what you want to check (BP, glucose, sleep, lifestyle risks)?")
-    return qs[:12]
-
-# ---------------------------
-# Summary builder
-# ---------------------------
-def build_summary(caregiver: bool, patient_name: str, age: str, sex: str,
-                  symptoms: str, onset: str, progression: str, main_concern: str,
-                  meds: str, supplements: str,
-                  sys_bp: int, dia_bp: int, pulse: int, temp_c: float,
-                  pcv: float, glucose: float, fasting: bool,
-                  height_cm: float, weight_kg: float, bmi: float,
-                  hyd_inputs: dict):
-    who = "Patient" if not caregiver else "Patient (info provided by caregiver)"
-    lines = []
-    lines.append(f"{who}: {patient_name or 'N/A'} | Age: {age or 'N/A'} | Sex: {sex or 'N/A'}")
-    lines.append(f"Date/Time: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    lines.append("")
-    lines.append("Symptoms/Concerns:")
-    if symptoms.strip():
-        lines.append(f"- {symptoms.strip()}")
-    else:
-        lines.append("- N/A")
-    if onset:
-        lines.append(f"- Started: {onset}")
-    if progression:
-        lines.append(f"- Trend: {progression}")
-    if main_concern.strip():
-        lines.append(f"- Main worry: {main_concern.strip()}")
-
-    lines.append("")
-    lines.append("Medicines / Supplements (as reported):")
-    if meds.strip():
-        lines.append(f"- Medicines: {meds.strip()}")
-    else:
-        lines.append("- Medicines: N/A")
-    if supplements.strip():
-        lines.append(f"- Supplements/herbal: {supplements.strip()}")
-    else:
-        lines.append("- Supplements/herbal: N/A")
-
-    lines.append("")
-    lines.append("Values Provided:")
-    if sys_bp > 0 and dia_bp > 0:
-        lines.append(f"- BP: {sys_bp}/{dia_bp} mmHg")
-    if pulse > 0:
-        lines.append(f"- Pulse: {pulse} bpm")
-    if temp_c > 0:
-        lines.append(f"- Temperature: {temp_c:.1f} °C")
-    if pcv > 0:
-        lines.append(f"- PCV: {pcv:.1f} %")
-    if glucose > 0:
-        lines.append(f"- Glucose: {glucose:.1f} mmol/L ({'fasting' if fasting else 'random'})")
-    if height_cm > 0 and weight_kg > 0 and bmi is not None:
-        lines.append(f"- Height/Weight: {height_cm:.1f} cm / {weight_kg:.1f} kg | BMI: {bmi:.1f} kg/m²")
-
-    # hydration summary (brief)
-    if any(v for v in hyd_inputs.values() if v):
-        lines.append("")
-        lines.append("Hydration notes (as reported):")
-        for k, v in hyd_inputs.items():
-            if v:
-                lines.append(f"- {k}: {v}")
-
-    lines.append("")
-    lines.append("Goal for visit:")
-    lines.append("- Understand what these findings mean in context, confirm what needs repeat testing, and agree next steps.")
-    return "\n".join(lines)
-
-# ---------------------------
-# UI helpers (safe HTML card rendering)
-# ---------------------------
-def status_badge(label: str) -> str:
-    typical_markers = {
-        "Typical / near typical", "Typical", "Typical fasting range", "Common random range", "Typical resting range", "Typical range"
-    }
-    if label in typical_markers:
-        return "✅ Typical"
-    if label == "Not provided":
-        return "➖ Not provided"
-    if "High" in label or "Low" in label or "Above" in label or "Below" in label or "Fever" in label or "Borderline" in label:
-        return "⚠️ Outside usual range"
-    return "ℹ️ Check"
-
-def render_card(title: str, value_line: str, classification: str, context: str = ""):
-    # Escape everything to prevent any tag leakage
-    t = safe_text(title)
-    v = safe_text(value_line)
-    c = safe_text(classification)
-    ctx = safe_text(context)
-
-    st.markdown(
-        f"""
-        <div style="border:1px solid rgba(255,255,255,0.12);
-                    border-radius:14px; padding:14px; margin-bottom:10px;">
-            <div style="font-size:16px; font-weight:700; margin-bottom:6px;">{t}</div>
-            <div style="font-size:14px; margin-bottom:6px;"><b>{v}</b></div>
-            <div style="font-size:13px; opacity:0.95; margin-bottom:6px;">
-                {status_badge(classification)} — {c}
-            </div>
-            <div style="font-size:12.5px; opacity:0.85; line-height:1.35;">
-                {ctx}
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
-
-# ---------------------------
-# Sidebar
-# ---------------------------
-with st.sidebar:
-    st.header("Quick guide")
-    st.write("1) Enter symptoms")
-    st.write("2) Add any values you know")
-    st.write("3) Click **Generate**")
-    st.write("")
-    st.write("You’ll get: explanation, urgent warnings, questions, and a clinic summary.")
-    st.divider()
-    st.caption("Tip: If you don’t have lab results, you can still use the doctor questions and summary.")
-    st.divider()
-    st.caption("Clinic Companion NG is educational and does not replace professional care.")
-
-# ---------------------------
-# Hero banner
-# ---------------------------
-st.markdown(
-    """
-    <div style="background: linear-gradient(90deg, rgba(15,23,42,1) 0%, rgba(2,132,199,0.25) 100%);
-                padding:18px; border-radius:16px; border:1px solid rgba(255,255,255,0.10);">
-        <h2 style="margin:0;">🏥 Clinic Companion NG</h2>
-        <p style="margin:6px 0 0 0; opacity:0.9;">
-            Helping you prepare calmly and confidently for your hospital visit.
-        </p>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
-
-st.write("")
-st.info(DISCLAIMER)
-
-st.markdown(
-    "> It’s normal to feel worried when test results don’t make sense. This tool helps you organize your story and questions — not to diagnose you."
-)
-
-# ---------------------------
-# Input form
-# ---------------------------
-with st.form("inputs"):
-    st.subheader("Basic details (optional)")
-    caregiver = st.checkbox("I am filling this for someone else (caregiver mode)")
-
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        patient_name = st.text_input("Name (optional)")
-    with col2:
-        age = st.text_input("Age (optional)")
-    with col3:
-        sex = st.selectbox("Sex (optional)", ["Prefer not to say", "Male", "Female"])
-
-    st.subheader("Body measurements (optional)")
-    b1, b2 = st.columns(2)
-    with b1:
-        height_cm = st.number_input("Height (cm)", min_value=0.0, max_value=250.0, value=0.0, step=0.5)
-    with b2:
-        weight_kg = st.number_input("Weight (kg)", min_value=0.0, max_value=300.0, value=0.0, step=0.5)
-
-    st.subheader("Symptoms")
-    symptoms = st.text_area(
-        "Describe symptoms (example: weakness, dizziness, fever, headache, cough, body pain).",
-        height=90
-    )
-
-    st.subheader("Symptom timeline (optional)")
-    t1, t2 = st.columns(2)
-    with t1:
-        onset = st.selectbox(
-            "When did these symptoms start?",
-            ["", "Today", "2–3 days ago", "1–2 weeks ago", "Longer than 2 weeks"]
-        )
-    with t2:
-        progression = st.selectbox(
-            "How are the symptoms changing?",
-            ["", "Getting better", "Getting worse", "About the same"]
-        )
-    main_concern = st.text_area("What worries you most right now? (optional)", height=70)
-
-    st.subheader("Medicines & supplements (optional)")
-    meds = st.text_input("Current medicines (if any) — e.g., BP meds, painkillers, antibiotics")
-    supplements = st.text_input("Supplements/herbal mixtures (if any)")
-
-    st.subheader("Hydration check (optional)")
-    h1, h2, h3 = st.columns(3)
-    with h1:
-        drinking_less = st.selectbox("Drinking less than usual?", ["", "No", "Yes"])
-    with h2:
-        urine_color = st.selectbox("Urine color (best guess)", ["", "Pale yellow", "Yellow", "Dark yellow"])
-    with h3:
-        peeing_less = st.selectbox("Urinating less than usual?", ["", "No", "Yes"])
-
-    h4, h5, h6 = st.columns(3)
-    with h4:
-        vomiting = st.selectbox("Vomiting?", ["", "No", "Some", "Frequent"])
-    with h5:
-        diarrhea = st.selectbox("Diarrhea?", ["", "No", "Some", "Frequent"])
-    with h6:
-        heat_sweat = st.selectbox("Heat exposure / heavy sweating?", ["", "No", "Yes"])
-
-    dry_dizzy = st.selectbox("Dry mouth or dizziness?", ["", "No", "Yes"])
-
-    st.subheader("Vitals (enter what you know)")
-    c1, c2, c3 = st.columns(3)
-    with c1:
-        sys_bp = st.number_input("Systolic BP (mmHg)", min_value=0, max_value=300, value=0, step=1)
-    with c2:
-        dia_bp = st.number_input("Diastolic BP (mmHg)", min_value=0, max_value=200, value=0, step=1)
-    with c3:
-        pulse = st.number_input("Pulse (bpm)", min_value=0, max_value=250, value=0, step=1)
-
-    c4, c5 = st.columns(2)
-    with c4:
-        temp_c = st.number_input("Temperature (°C)", min_value=0.0, max_value=45.0, value=0.0, step=0.1)
-    with c5:
-        pcv = st.number_input("PCV (%)", min_value=0.0, max_value=80.0, value=0.0, step=0.5)
-
-    st.subheader("Blood sugar (optional)")
-    g1, g2 = st.columns(2)
-    with g1:
-        glucose = st.number_input("Glucose (mmol/L)", min_value=0.0, max_value=60.0, value=0.0, step=0.1)
-    with g2:
-        fasting = st.checkbox("This was a fasting test")
-
-    st.caption("You can leave any field blank if you don’t know it.")
-    submitted = st.form_submit_button("Generate Visit Prep")
-
-# ---------------------------
-# Results
-# ---------------------------
-if submitted:
-    st.write("")
-    st.progress(0.25)
-    st.caption("Step 1/4: Reviewing what you entered...")
-
-    has_any = any([
-        safe_text(symptoms),
-        sys_bp > 0 and dia_bp > 0,
-        pulse > 0,
-        temp_c > 0,
-        pcv > 0,
-        glucose > 0,
-        height_cm > 0 and weight_kg > 0,
-        any([drinking_less, urine_color, peeing_less, vomiting, diarrhea, heat_sweat, dry_dizzy]),
-        safe_text(meds),
-        safe_text(supplements),
-        onset,
-        progression,
-        safe_text(main_concern),
-    ])
-
-    if not has_any:
-        st.warning("Please enter symptoms or at least one value (BP, temperature, pulse, PCV, glucose, BMI, or hydration info).")
-        st.stop()
-
-    # Jump navigation
-    st.markdown(
-        """
-        **Jump to:**  
-        - [Vitals snapshot](#vitals-snapshot)  
-        - [Doctor checks](#doctor-checks)  
-        - [Urgent care](#urgent-care)  
-        - [Questions](#questions)  
-        - [Clinic summary](#clinic-summary)
-        """
-    )
-
-    st.write("")
-    st.progress(0.50)
-    st.caption("Step 2/4: What doctors usually look at")
-
-    st.markdown('<a name="vitals-snapshot"></a>', unsafe_allow_html=True)
-    st.subheader("1️⃣ Vitals snapshot (clinic-style)")
-
-    bmi = compute_bmi(height_cm, weight_kg)
-    bp_label = classify_bp(int(sys_bp), int(dia_bp))
-    temp_label = classify_temp(float(temp_c))
-    pulse_label = classify_pulse(int(pulse))
-    pcv_label = classify_pcv(float(pcv), sex)
-    glu_label = classify_glucose(float(glucose), bool(fasting))
-    bmi_label = classify_bmi(bmi)
-
-    left, right = st.columns(2)
-
-    with left:
-        render_card(
-            "🩺 Blood Pressure",
-            f"{int(sys_bp)}/{int(dia_bp)} mmHg" if sys_bp > 0 and dia_bp > 0 else "Not provided",
-            bp_label,
-            bp_context() if bp_label != "Not provided" else ""
-        )
-        render_card(
-            "❤️ Pulse",
-            f"{int(pulse)} bpm" if pulse > 0 else "Not provided",
-            pulse_label,
-            pulse_context() if pulse_label != "Not provided" else ""
-        )
-
-    with right:
-        render_card(
-            "🌡 Temperature",
-            f"{float(temp_c):.1f} °C" if temp_c > 0 else "Not provided",
-            temp_label,
-            temp_context() if temp_label != "Not provided" else ""
-        )
-        render_card(
-            "🧪 PCV",
-            f"{float(pcv):.1f} %" if pcv > 0 else "Not provided",
-            pcv_label,
-            pcv_context() if pcv_label != "Not provided" else ""
-        )
-        render_card(
-            "🍬 Blood Sugar",
-            f"{float(glucose):.1f} mmol/L ({'fasting' if fasting else 'random'})" if glucose > 0 else "Not provided",
-            glu_label,
-            glucose_context(bool(fasting)) if glu_label != "Not provided" else ""
-        )
-
-    # BMI card (optional)
-    if bmi is not None:
-        render_card(
-            "📏 BMI (Body Mass Index)",
-            f"{bmi:.1f} kg/m²",
-            bmi_label,
-            "BMI is one of many tools clinicians use. It does not tell the whole health story."
-        )
-
-    st.write("")
-    st.progress(0.75)
-    st.caption("Step 3/4: What your doctor may want to check + urgent warnings")
-
-    st.markdown('<a name="doctor-checks"></a>', unsafe_allow_html=True)
-    st.subheader("2️⃣ Doctor checks (what clinicians commonly ask next)")
-
-    doctor_checks = []
-
-    # Timeline
-    if onset or progression:
-        doctor_checks.append("Symptom timeline: when it started and whether it’s getting better/worse/same.")
-    else:
-        doctor_checks.append("Symptom timeline: when it started, what triggers it, what makes it better/worse.")
-
-    # Hydration context
-    if any([drinking_less, urine_color, peeing_less, vomiting, diarrhea, heat_sweat, dry_dizzy]):
-        doctor_checks.append("Hydration: intake, vomiting/diarrhea, urine color and frequency, heat/sweating exposure.")
-    else:
-        doctor_checks.append("Hydration: fluid intake, urine color, vomiting/diarrhea, fever/heat exposure.")
-
-    # Medicines
-    doctor_checks.append("Medicines and supplements: BP meds, painkillers, antibiotics, herbs/supplements.")
-
-    # BP
-    if sys_bp > 0 and dia_bp > 0:
-        if int(sys_bp) < 90 or int(dia_bp) < 60:
-            doctor_checks.append("Low BP range: hydration status, standing vs sitting readings, recent illness, medication effects.")
-        elif int(sys_bp) >= 140 or int(dia_bp) >= 90:
-            doctor_checks.append("High BP range: repeat BP after rest, sleep/stress, salt intake, monitoring plan.")
-        else:
-            doctor_checks.append("BP interpretation: confirm correct cuff/position and repeat after rest if needed.")
-
-    # Fever
-    if temp_c > 0 and float(temp_c) >= 37.8:
-        doctor_checks.append("Fever: likely causes in your context (including malaria/respiratory infections) and tests to confirm.")
-
-    # PCV
-    if pcv > 0:
-        low_male = (sex == "Male" and float(pcv) < 40)
-        low_female = (sex == "Female" and float(pcv) < 36)
-        low_unsure = (sex == "Prefer not to say" and float(pcv) < 37)
-        if low_male or low_female or low_unsure:
-            doctor_checks.append("Low PCV: nutrition, malaria risk (if relevant), and bleeding history; consider iron studies/repeat test.")
-
-    # Glucose
-    if glucose > 0:
-        doctor_checks.append("Glucose: confirm with fasting glucose or HbA1c if needed, depending on context and symptoms.")
-
-    # BMI
-    if bmi is not None:
-        doctor_checks.append("Weight/BMI: consider lifestyle risks and whether it relates to BP/glucose/sleep patterns.")
-
-    for item in doctor_checks:
-        st.write(f"- {item}")
-
-    # Hydration output (educational)
-    st.subheader("💧 Hydration check (educational)")
-    if any([drinking_less, urine_color, peeing_less, vomiting, diarrhea, heat_sweat, dry_dizzy]):
-        level, score = hydration_risk(drinking_less, urine_color, peeing_less, vomiting, diarrhea, heat_sweat, dry_dizzy)
-
-        if level == "High":
-            st.error(f"Hydration risk: **{level}** (score {score})")
-        elif level == "Moderate":
-            st.warning(f"Hydration risk: **{level}** (score {score})")
-        else:
-            st.success(f"Hydration risk: **{level}** (score {score})")
-
-        st.write("What you can do now (safe steps):")
-        for tip in hydration_advice(level):
-            st.write(f"- {tip}")
-    else:
-        st.info("Optional: fill the hydration section to get hydration guidance.")
-
-    st.markdown('<a name="urgent-care"></a>', unsafe_allow_html=True)
-    st.subheader("3️⃣ When to seek urgent care")
-    flags = red_flags(
-        symptoms_text=symptoms,
-        sys_bp=int(sys_bp),
-        dia_bp=int(dia_bp),
-        temp_c=float(temp_c),
-        glucose_mmol=float(glucose),
-        vomiting=vomiting,
-        diarrhea=diarrhea
-    )
-
-    if flags:
-        st.error("If any of these apply to you, please seek urgent medical care:")
-        for f in flags:
-            st.write(f"- {f}")
-    else:
-        st.success("No obvious urgent red flags detected from what you entered. If symptoms worsen, seek care.")
-
-    st.write("")
-    st.progress(1.0)
-    st.caption("Step 4/4: Questions + clinic summary ready")
-
-    st.markdown('<a name="questions"></a>', unsafe_allow_html=True)
-    with st.expander("4️⃣ Smart questions to ask your doctor", expanded=True):
-        has_bp = (sys_bp > 0 and dia_bp > 0)
-        has_temp = (temp_c > 0)
-        has_pulse = (pulse > 0)
-        has_pcv = (pcv > 0)
-        has_glucose = (glucose > 0)
-        has_hyd = any([drinking_less, urine_color, peeing_less, vomiting, diarrhea, heat_sweat, dry_dizzy])
-        has_bmi = (bmi is not None)
-
-        qs = smart_questions(has_bp, has_temp, has_pulse, has_pcv, has_glucose, has_hyd, has_bmi)
-        for i, q in enumerate(qs, start=1):
-            st.write(f"{i}. {q}")
-
-    st.subheader("🧾 What to bring to the clinic (simple checklist)")
-    st.write("- Previous test results / hospital cards (if any)")
-    st.write("- A list of medicines and supplements you’ve taken recently")
-    st.write("- This summary (copy/paste below)")
-    st.write("- A trusted person to accompany you if you feel anxious or weak")
-
-    st.markdown('<a name="clinic-summary"></a>', unsafe_allow_html=True)
-    with st.expander("5️⃣ Short summary for your clinic visit (copy/paste)", expanded=True):
-        st.write("You can copy this and show it to your clinician. It saves time and reduces confusion.")
-
-        hyd_inputs = {
-            "Drinking less": drinking_less,
-            "Urine color": urine_color,
-            "Peeing less": peeing_less,
-            "Vomiting": vomiting,
-            "Diarrhea": diarrhea,
-            "Heat/sweating": heat_sweat,
-            "Dry mouth/dizziness": dry_dizzy,
-        }
-
-        summary_text = build_summary(
-            caregiver=caregiver,
-            patient_name=patient_name,
-            age=age,
-            sex=sex,
-            symptoms=symptoms,
-            onset=onset,
-            progression=progression,
-            main_concern=main_concern,
-            meds=meds,
-            supplements=supplements,
-            sys_bp=int(sys_bp),
-            dia_bp=int(dia_bp),
-            pulse=int(pulse),
-            temp_c=float(temp_c),
-            pcv=float(pcv),
-            glucose=float(glucose),
-            fasting=bool(fasting),
-            height_cm=float(height_cm),
-            weight_kg=float(weight_kg),
-            bmi=bmi if bmi is not None else None,
-            hyd_inputs=hyd_inputs
-        )
-
-        # Copy-friendly display + download
-        st.text_area("Clinic summary (copy this):", value=summary_text, height=260)
-        st.download_button(
-            "Download summary as .txt",
-            data=summary_text.encode("utf-8"),
-            file_name="clinic_companion_summary.txt",
-            mime="text/plain",
-        )
-
-    st.caption(DISCLAIMER)
-    st.caption("Built with Python + Streamlit. Designed for education and visit preparation, not diagnosis.")
+from datetime import datetime
+import os
+import uuid
+
+import streamlit as st
+
+from clinic_companion import analytics, audit, config, export, handoff, history, i18n, metrics, outbox, printable, sessions
+from clinic_companion.cache import cached_assess_visit
+from clinic_companion.engine import (
+    DISCLAIMER,
+    INTAKE_CHOICES,
+    INTAKE_LIMITS,
+    VisitRecord,
+    bp_context,
+    glucose_context,
+    hydration_advice,
+    pcv_context,
+    pulse_context,
+    safe_text,
+    status_badge,
+    temp_context,
+    visit_summary,
+)
+
+# ---------------------------
+# Page setup
+# ---------------------------
+st.set_page_config(page_title="Clinic Companion NG", page_icon="🏥", layout="centered")
+metrics.configure_from_env()
+sessions.configure_from_env()
+analytics.configure_from_env()
+config.watch()  # hot-reloads CLINIC_RULES_DIR
+config.pin()  # one rule set for this whole run, even if a reload lands mid-render
+
+if "admin" in st.query_params:  # population overview for clinic admins (needs CLINIC_ADMIN_TOKEN)
+    import admin_page
+    admin_page.render()
+    st.stop()
+
+sessions.touch(st.session_state)  # memory accounting and the idle clock (see sessions.py)
+
+# ---------------------------
+# UI helpers (safe HTML card rendering)
+# ---------------------------
+def render_card(title: str, value_line: str, classification: str, context: str = "", trend: str = ""):
+    # Escape everything to prevent any tag leakage
+    t = safe_text(title)
+    v = safe_text(value_line)
+    c = safe_text(_(classification))
+    ctx = safe_text(context)
+    trend_html = (
+        f'<div style="font-size:12.5px; opacity:0.85; margin-top:6px;">📈 {safe_text(trend)}</div>'
+        if trend else ""
+    )
+
+    st.markdown(
+        f"""
+        <div style="border:1px solid rgba(255,255,255,0.12);
+                    border-radius:14px; padding:14px; margin-bottom:10px;">
+            <div style="font-size:16px; font-weight:700; margin-bottom:6px;">{t}</div>
+            <div style="font-size:14px; margin-bottom:6px;"><b>{v}</b></div>
+            <div style="font-size:13px; opacity:0.95; margin-bottom:6px;">
+                {_(status_badge(classification))} — {c}
+            </div>
+            <div style="font-size:12.5px; opacity:0.85; line-height:1.35;">
+                {ctx}
+            </div>
+            {trend_html}
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+# Low-data layout: the whole vitals snapshot is one element with one shared
+# stylesheet instead of a block of inline styles per card.
+LITE_CSS = (
+    "<style>.cc-g{display:grid;grid-template-columns:repeat(auto-fit,minmax(210px,1fr));gap:8px}"
+    ".cc-c{border:1px solid rgba(255,255,255,.12);border-radius:12px;padding:10px}"
+    ".cc-c b{display:block;font-size:15px}.cc-c i{display:block;font-style:normal;font-size:12.5px;opacity:.85}</style>"
+)
+
+def lite_card(title: str, value_line: str, classification: str, context: str = "", trend: str = "") -> str:
+    parts = [
+        f"<b>{safe_text(title)}</b>{safe_text(value_line)}",
+        f"<i>{_(status_badge(classification))} — {safe_text(_(classification))}</i>",
+    ]
+    if context:
+        parts.append(f"<i>{safe_text(context)}</i>")
+    if trend:
+        parts.append(f"<i>📈 {safe_text(trend)}</i>")
+    return f'<div class="cc-c">{"".join(parts)}</div>'
+
+CLINIC_CHECKLIST = (
+    i18n.N_("Previous test results / hospital cards (if any)"),
+    i18n.N_("A list of medicines and supplements you’ve taken recently"),
+    i18n.N_("This summary (copy/paste below)"),
+    i18n.N_("A trusted person to accompany you if you feel anxious or weak"),
+)
+
+def lite_default() -> bool:
+    """Low-data mode starts on with ``?lite=1`` in the URL or ``CLINIC_LITE_MODE=1`` on the server."""
+    value = st.query_params.get("lite") or os.environ.get("CLINIC_LITE_MODE", "")
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+# ---------------------------
+# Sidebar
+# ---------------------------
+with st.sidebar:
+    # Same label in every language, so the choice survives its own rerun. The
+    # catalog is loaded once per process (i18n.catalog), not per session or rerun.
+    lang_codes = list(i18n.LANGUAGES)
+    lang = st.selectbox("🌐 Language / Èdè / Asụsụ / Harshe", lang_codes,
+                        index=lang_codes.index(i18n.language_from(st.query_params.get("lang"))),
+                        format_func=i18n.LANGUAGES.get)
+    _ = i18n.translator(lang)
+    st.header(_("Quick guide"))
+    st.write(_("1) Enter symptoms"))
+    st.write(_("2) Add any values you know"))
+    st.write(_("3) Click **Generate**"))
+    st.write("")
+    st.write(_("You’ll get: explanation, urgent warnings, questions, and a clinic summary."))
+    st.divider()
+    st.caption(_("Tip: If you don’t have lab results, you can still use the doctor questions and summary."))
+    st.divider()
+    lite = st.toggle(_("📶 Low-data mode"), value=lite_default(),
+                     help=_("Shows results as a few compact blocks: much less data per submit on slow or metered connections."))
+    st.divider()
+    st.caption(_("Clinic Companion NG is educational and does not replace professional care."))
+
+# ---------------------------
+# Hero banner
+# ---------------------------
+st.markdown(
+    f"""
+    <div style="background: linear-gradient(90deg, rgba(15,23,42,1) 0%, rgba(2,132,199,0.25) 100%);
+                padding:18px; border-radius:16px; border:1px solid rgba(255,255,255,0.10);">
+        <h2 style="margin:0;">🏥 Clinic Companion NG</h2>
+        <p style="margin:6px 0 0 0; opacity:0.9;">
+            {_("Helping you prepare calmly and confidently for your hospital visit.")}
+        </p>
+    </div>
+    """,
+    unsafe_allow_html=True
+)
+
+st.write("")
+st.info(_(DISCLAIMER))
+
+st.markdown(
+    "> " + _("It’s normal to feel worried when test results don’t make sense. This tool helps you organize your story and questions — not to diagnose you.")
+)
+
+# ---------------------------
+# Input form
+# ---------------------------
+with st.form("inputs"):
+    st.subheader(_("Basic details (optional)"))
+    caregiver = st.checkbox(_("I am filling this for someone else (caregiver mode)"))
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        patient_name = st.text_input(_("Name (optional)"))
+    with col2:
+        age = st.text_input(_("Age (optional)"))
+    with col3:
+        sex = st.selectbox(_("Sex (optional)"), INTAKE_CHOICES["sex"], format_func=_)
+    pregnant = st.checkbox(_("Currently pregnant (uses antenatal reference ranges)"))
+    patient_id = ""
+    if history.store_from_env() is not None:  # trends need an ID as well as the name
+        patient_id = st.text_input(_("Patient ID for visit history (clinic card or phone number)"),
+                                   help=_("Trends from earlier visits are shown only when the ID and name match."))
+
+    st.subheader(_("Body measurements (optional)"))
+    b1, b2 = st.columns(2)
+    with b1:
+        height_cm = st.number_input(_("Height (cm)"), min_value=0.0, max_value=INTAKE_LIMITS["height_cm"], value=0.0, step=0.5)
+    with b2:
+        weight_kg = st.number_input(_("Weight (kg)"), min_value=0.0, max_value=INTAKE_LIMITS["weight_kg"], value=0.0, step=0.5)
+
+    st.subheader(_("Symptoms"))
+    symptoms = st.text_area(
+        _("Describe symptoms (example: weakness, dizziness, fever, headache, cough, body pain)."),
+        height=90
+    )
+
+    st.subheader(_("Symptom timeline (optional)"))
+    t1, t2 = st.columns(2)
+    with t1:
+        onset = st.selectbox(
+            _("When did these symptoms start?"),
+            INTAKE_CHOICES["onset"], format_func=_
+        )
+    with t2:
+        progression = st.selectbox(
+            _("How are the symptoms changing?"),
+            INTAKE_CHOICES["progression"], format_func=_
+        )
+    main_concern = st.text_area(_("What worries you most right now? (optional)"), height=70)
+
+    st.subheader(_("Medicines & supplements (optional)"))
+    meds = st.text_input(_("Current medicines (if any) — e.g., BP meds, painkillers, antibiotics"))
+    supplements = st.text_input(_("Supplements/herbal mixtures (if any)"))
+
+    st.subheader(_("Hydration check (optional)"))
+    h1, h2, h3 = st.columns(3)
+    with h1:
+        drinking_less = st.selectbox(_("Drinking less than usual?"), INTAKE_CHOICES["drinking_less"], format_func=_)
+    with h2:
+        urine_color = st.selectbox(_("Urine color (best guess)"), INTAKE_CHOICES["urine_color"], format_func=_)
+    with h3:
+        peeing_less = st.selectbox(_("Urinating less than usual?"), INTAKE_CHOICES["peeing_less"], format_func=_)
+
+    h4, h5, h6 = st.columns(3)
+    with h4:
+        vomiting = st.selectbox(_("Vomiting?"), INTAKE_CHOICES["vomiting"], format_func=_)
+    with h5:
+        diarrhea = st.selectbox(_("Diarrhea?"), INTAKE_CHOICES["diarrhea"], format_func=_)
+    with h6:
+        heat_sweat = st.selectbox(_("Heat exposure / heavy sweating?"), INTAKE_CHOICES["heat_sweat"], format_func=_)
+
+    dry_dizzy = st.selectbox(_("Dry mouth or dizziness?"), INTAKE_CHOICES["dry_dizzy"], format_func=_)
+
+    st.subheader(_("Vitals (enter what you know)"))
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        sys_bp = st.number_input(_("Systolic BP (mmHg)"), min_value=0, max_value=INTAKE_LIMITS["sys_bp"], value=0, step=1)
+    with c2:
+        dia_bp = st.number_input(_("Diastolic BP (mmHg)"), min_value=0, max_value=INTAKE_LIMITS["dia_bp"], value=0, step=1)
+    with c3:
+        pulse = st.number_input(_("Pulse (bpm)"), min_value=0, max_value=INTAKE_LIMITS["pulse"], value=0, step=1)
+
+    c4, c5 = st.columns(2)
+    with c4:
+        temp_c = st.number_input(_("Temperature (°C)"), min_value=0.0, max_value=INTAKE_LIMITS["temp_c"], value=0.0, step=0.1)
+    with c5:
+        pcv = st.number_input(_("PCV (%)"), min_value=0.0, max_value=INTAKE_LIMITS["pcv"], value=0.0, step=0.5)
+
+    st.subheader(_("Blood sugar (optional)"))
+    g1, g2 = st.columns(2)
+    with g1:
+        glucose = st.number_input(_("Glucose (mmol/L)"), min_value=0.0, max_value=INTAKE_LIMITS["glucose"], value=0.0, step=0.1)
+    with g2:
+        fasting = st.checkbox(_("This was a fasting test"))
+
+    st.caption(_("You can leave any field blank if you don’t know it."))
+    submitted = st.form_submit_button(_("Generate Visit Prep"))
+
+# ---------------------------
+# Results
+# ---------------------------
+# The last submission is kept in session state and each results section is a
+# fragment: a widget inside one section (e.g. the summary download) reruns just
+# that section instead of the whole page (sidebar, banner, form and cards).
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+def card_trend(trends: dict, *names: str) -> str:
+    """Trend line(s) for a vitals card from the visit history (empty when there is none)."""
+    parts = []
+    for name in names:
+        trend = trends.get(name)
+        if trend is not None and trend.count > 1:
+            text = history.trend_text(trend, lang)
+            parts.append(f"{_(history.METRICS[name][0])}: {text}" if len(names) > 1 else text)
+    return " ".join(parts)
+
+def vital_cards(v: VisitRecord, result: dict, trends: dict) -> list:
+    """(title, value line, classification, context, trend) for each vitals card, BMI last when known."""
+    labels = result["labels"]
+    bmi = result["bmi"]
+    missing = _("Not provided")
+    # classifications stay in English here: render_card/lite_card translate them after picking the badge
+    cards = [
+        (
+            _("🩺 Blood Pressure"),
+            f"{v.sys_bp}/{v.dia_bp} mmHg" if v.has_bp else missing,
+            labels["bp"],
+            _(bp_context()) if labels["bp"] != "Not provided" else "",
+            card_trend(trends, "sys_bp", "dia_bp"),
+        ),
+        (
+            _("❤️ Pulse"),
+            f"{v.pulse} bpm" if v.pulse > 0 else missing,
+            labels["pulse"],
+            _(pulse_context()) if labels["pulse"] != "Not provided" else "",
+            card_trend(trends, "pulse"),
+        ),
+        (
+            _("🌡 Temperature"),
+            f"{v.temp_c:.1f} °C" if v.temp_c > 0 else missing,
+            labels["temp"],
+            _(temp_context()) if labels["temp"] != "Not provided" else "",
+            card_trend(trends, "temp_c"),
+        ),
+        (
+            _("🧪 PCV"),
+            f"{v.pcv:.1f} %" if v.pcv > 0 else missing,
+            labels["pcv"],
+            _(pcv_context()) if labels["pcv"] != "Not provided" else "",
+            card_trend(trends, "pcv"),
+        ),
+        (
+            _("🍬 Blood Sugar"),
+            f"{v.glucose:.1f} mmol/L ({_('fasting') if v.fasting else _('random')})" if v.glucose > 0 else missing,
+            labels["glucose"],
+            _(glucose_context(v.fasting)) if labels["glucose"] != "Not provided" else "",
+            card_trend(trends, "glucose"),
+        ),
+    ]
+    # BMI card (optional)
+    if bmi is not None:
+        cards.append((
+            _("📏 BMI (Body Mass Index)"),
+            f"{bmi:.1f} kg/m²",
+            labels["bmi"],
+            _("BMI is one of many tools clinicians use. It does not tell the whole health story."),
+            card_trend(trends, "bmi"),
+        ))
+    return cards
+
+@fragment
+def vitals_section(v: VisitRecord, result: dict, trends: dict):
+    st.markdown('<a name="vitals-snapshot"></a>', unsafe_allow_html=True)
+    st.subheader(_("1️⃣ Vitals snapshot (clinic-style)"))
+
+    cards = vital_cards(v, result, trends)
+    left, right = st.columns(2)
+
+    with left:
+        for card in cards[:2]:
+            render_card(*card)
+
+    with right:
+        for card in cards[2:5]:
+            render_card(*card)
+
+    for card in cards[5:]:
+        render_card(*card)
+
+@fragment
+def doctor_checks_section(result: dict):
+    st.markdown('<a name="doctor-checks"></a>', unsafe_allow_html=True)
+    st.subheader(_("2️⃣ Doctor checks (what clinicians commonly ask next)"))
+
+    for item in result["doctor_checks"]:
+        st.write(f"- {_(item)}")
+
+@fragment
+def hydration_section(result: dict):
+    st.subheader(_("💧 Hydration check (educational)"))
+    if result["hydration"] is not None:
+        level, score = result["hydration"]["level"], result["hydration"]["score"]
+        risk = _("Hydration risk: **{level}** (score {score})").format(level=_(level), score=score)
+
+        if level == "High":
+            st.error(risk)
+        elif level == "Moderate":
+            st.warning(risk)
+        else:
+            st.success(risk)
+
+        st.write(_("What you can do now (safe steps):"))
+        for tip in hydration_advice(level):
+            st.write(f"- {_(tip)}")
+    else:
+        st.info(_("Optional: fill the hydration section to get hydration guidance."))
+
+@fragment
+def urgent_care_section(result: dict):
+    st.markdown('<a name="urgent-care"></a>', unsafe_allow_html=True)
+    st.subheader(_("3️⃣ When to seek urgent care"))
+    flags = result["red_flags"]
+
+    if flags:
+        st.error(_("If any of these apply to you, please seek urgent medical care:"))
+        for f in flags:
+            st.write(f"- {_(f)}")
+    else:
+        st.success(_("No obvious urgent red flags detected from what you entered. If symptoms worsen, seek care."))
+
+@fragment
+def questions_section(result: dict):
+    st.markdown('<a name="questions"></a>', unsafe_allow_html=True)
+    with st.expander(_("4️⃣ Smart questions to ask your doctor"), expanded=True):
+        for i, q in enumerate(result["questions"], start=1):
+            st.write(f"{i}. {_(q)}")
+
+@fragment
+def summary_section(result: dict):
+    st.markdown('<a name="clinic-summary"></a>', unsafe_allow_html=True)
+    with st.expander(_("5️⃣ Short summary for your clinic visit (copy/paste)"), expanded=True):
+        st.write(_("You can copy this and show it to your clinician. It saves time and reduces confusion."))
+
+        summary_text = result["summary"]
+
+        # Copy-friendly display + download
+        st.text_area(_("Clinic summary (copy this):"), value=summary_text, height=260)
+        st.download_button(
+            _("Download summary as .txt"),
+            data=summary_text.encode("utf-8"),
+            file_name="clinic_companion_summary.txt",
+            mime="text/plain",
+        )
+
+def lite_vitals(v: VisitRecord, result: dict, trends: dict):
+    cards = "".join(lite_card(*card) for card in vital_cards(v, result, trends))
+    st.markdown(f'{LITE_CSS}<h4>{_("🩺 Vitals snapshot")}</h4><div class="cc-g">{cards}</div>', unsafe_allow_html=True)
+
+def lite_guidance(result: dict):
+    """Red flags in one alert, then doctor checks, hydration, questions and the checklist as one markdown block."""
+    flags = result["red_flags"]
+    if flags:
+        st.error(f"**{_('If any of these apply to you, please seek urgent medical care:')}**\n" + "".join(f"\n- {_(f)}" for f in flags))
+    else:
+        st.success(_("No obvious urgent red flags detected from what you entered. If symptoms worsen, seek care."))
+
+    lines = ["#### " + _("Doctor checks")]
+    lines += [f"- {_(item)}" for item in result["doctor_checks"]]
+    if result["hydration"] is not None:
+        level, score = result["hydration"]["level"], result["hydration"]["score"]
+        lines += ["", "#### " + _("💧 Hydration"),
+                  _("Hydration risk: **{level}** (score {score})").format(level=_(level), score=score), ""]
+        lines += [f"- {_(tip)}" for tip in hydration_advice(level)]
+    lines += ["", "#### " + _("Questions to ask your doctor")]
+    lines += [f"{i}. {_(q)}" for i, q in enumerate(result["questions"], start=1)]
+    lines += ["", "#### " + _("What to bring")]
+    lines += [f"- {_(item)}" for item in CLINIC_CHECKLIST]
+    st.markdown("\n".join(lines))
+
+@fragment
+def lite_summary_section(result: dict):
+    summary_text = result["summary"]
+    st.code(summary_text, language=None)
+    st.download_button(
+        _("Download summary as .txt"),
+        data=summary_text.encode("utf-8"),
+        file_name="clinic_companion_summary.txt",
+        mime="text/plain",
+    )
+
+def print_document(v: VisitRecord, result: dict, trends: dict) -> printable.Document:
+    """The printable page for this result, in the selected language, with the QR hand-off code."""
+    if submitted or "handoff" not in st.session_state:  # stamped once per submission, so reruns hit the print cache
+        try:
+            st.session_state["handoff"] = handoff.to_text(handoff.encode(v, result["red_flags"], st.session_state.get("visit_time")))
+        except ValueError:  # red flags that do not fit: no QR rather than one that drops some
+            st.session_state["handoff"] = ""
+    rows = tuple(
+        (title, value, _(status_badge(label)), _(label)) if label != "Not provided" else (title, value, "", "")
+        for title, value, label, _context, _trend in vital_cards(v, result, trends)
+    )
+    return printable.Document(lang, rows, tuple(_(flag) for flag in result["red_flags"]), result["summary"],
+                              st.session_state["handoff"])
+
+def printable_section(doc: printable.Document):
+    """PDF/HTML download buttons and the QR code. The renders were queued with the results and are normally done by now."""
+    futures = printable.PRINTS.prepare(doc)
+    if all(future.done() for future in futures.values()):
+        printable_downloads(futures)
+    else:
+        printable_pending(doc)
+
+@fragment
+def printable_downloads(futures: dict):
+    for fmt, future in futures.items():
+        if future.exception() is not None:
+            continue
+        if fmt == "qr":
+            with st.expander(_("📱 QR code for the clinician")):
+                st.image(future.result(), width=240)
+                st.caption(_("Scan at triage to load this visit without retyping it (no internet needed)."))
+            continue
+        _render, mime, ext = printable.FORMATS[fmt]
+        st.download_button(
+            _("Download printable summary ({ext})").format(ext=ext),
+            data=future.result(),
+            file_name=f"clinic_companion_summary{ext}",
+            mime=mime,
+            key=f"print-{fmt}",
+        )
+
+@fragment(run_every=0.5)
+def printable_pending(doc: printable.Document):
+    # Polls without blocking the script run; the full rerun shows the (now cached) files and stops the polling.
+    if all(future.done() for future in printable.PRINTS.prepare(doc).values()):
+        st.rerun()
+    st.caption(_("Preparing the printable summary..."))
+
+@fragment
+def bulk_export_section():
+    with st.expander(_("📦 Summaries for a whole clinic list (CSV → zip)")):
+        st.write(_(
+            "Upload a CSV with one patient per row, using the form's field names as column headers "
+            "(e.g. `patient_name`, `age`, `symptoms`, `sys_bp`, `dia_bp`, `temp_c`). "
+            "You get one summary file per patient plus an `index.csv` that marks who has urgent warnings."
+        ))
+        upload = st.file_uploader(_("Clinic list (CSV)"), type=["csv"])
+        if upload is not None:
+            try:
+                data, stats = export.export_csv_bytes(upload.getvalue())
+            except ValueError:
+                st.error(_("This file could not be read as text. Save the list as CSV (UTF-8 or Windows) and upload it again."))
+                return
+            st.caption(_("{exported} summaries ready, {flagged} with urgent warnings").format(**stats)
+                       + (_(", {failed} rows could not be read (see index.csv)").format(**stats) if stats["failed"] else "") + ".")
+            st.download_button(
+                _("Download summaries (.zip)"),
+                data=data,
+                file_name="clinic_companion_summaries.zip",
+                mime="application/zip",
+            )
+
+bulk_export_section()
+
+if submitted:
+    # The summary's Date/Time: pinned per submission, so reruns rebuild the same printable page
+    st.session_state["visit_time"] = datetime.now()
+    st.session_state["intake"] = VisitRecord({
+        "caregiver": caregiver, "patient_name": patient_name, "age": age, "sex": sex, "pregnant": pregnant,
+        "symptoms": symptoms, "onset": onset, "progression": progression, "main_concern": main_concern,
+        "meds": meds, "supplements": supplements,
+        "sys_bp": sys_bp, "dia_bp": dia_bp, "pulse": pulse, "temp_c": temp_c, "pcv": pcv,
+        "glucose": glucose, "fasting": fasting, "height_cm": height_cm, "weight_kg": weight_kg,
+        "drinking_less": drinking_less, "urine_color": urine_color, "peeing_less": peeing_less,
+        "vomiting": vomiting, "diarrhea": diarrhea, "heat_sweat": heat_sweat, "dry_dizzy": dry_dizzy,
+    })
+    # Recorded once per submission (not on reruns); needs CLINIC_HISTORY_DB, its salt, a patient ID and a name.
+    # One visit per session and patient: a corrected re-submit replaces it rather than adding a reading.
+    store = history.store_from_env()
+    session = st.session_state.setdefault("history_session", uuid.uuid4().hex)
+    st.session_state["trends"] = (history.record_and_trend(store, st.session_state["intake"], patient_id, session)
+                                  if store else {})
+    # Queued on disk for the central store (needs CLINIC_OUTBOX_DIR) and synced in the background.
+    if st.session_state["intake"].has_any:
+        outbox.queue_visit(st.session_state["intake"])
+
+@fragment(run_every=sessions.MONITOR.sweep_interval or None)
+def idle_watch():
+    # Runs in this session's own script thread, so evicting never races a script run
+    if sessions.evict_if_idle(st.session_state):
+        st.rerun()
+
+if sessions.MONITOR.idle_timeout and sessions.MONITOR.sweep_interval > 0:
+    idle_watch()
+
+if st.session_state.pop(sessions.EVICTED_KEY, False) and not submitted:
+    st.info(_("Your results were cleared after a long pause to free memory. Press **Generate Visit Prep** to see them again."))
+
+v = st.session_state.get("intake")  # a VisitRecord: coerced once at submit, reused on reruns
+if v is not None:
+    run = metrics.RunTimer()
+
+    if not lite:
+        st.write("")
+        st.progress(0.25)
+        st.caption(_("Step 1/4: Reviewing what you entered..."))
+
+    with run.stage("input_review"):
+        if not v.has_any:
+            st.session_state.pop("intake", None)
+            st.warning(_("Please enter symptoms or at least one value (BP, temperature, pulse, PCV, glucose, BMI, or hydration info)."))
+            st.stop()
+
+        # Every classifier, red flags, questions and the summary in one memoized call:
+        # identical submissions (across reruns and sessions) reuse the cached result.
+        visit_time = st.session_state.get("visit_time")
+        result = cached_assess_visit(v, now=visit_time)
+        if submitted:  # population aggregates and the audit log count each submission once, not reruns
+            site = analytics.site_from(st.query_params.get("site"))
+            analytics.ANALYTICS.record(v, result, site)
+            audit.record_visit(v, result, site, lang)  # buffered; needs CLINIC_AUDIT_DIR
+        if lang != i18n.DEFAULT_LANGUAGE:  # the cached result's summary is in English
+            result = {**result, "summary": visit_summary(v, visit_time, lang=lang)}
+        trends = st.session_state.get("trends", {})
+        if trends:
+            result = {**result, "summary": history.summary_with_trends(result["summary"], trends, lang)}
+        # Rendered on background threads while the rest of the page is drawn.
+        doc = print_document(v, result, trends)
+        printable.PRINTS.prepare(doc)
+
+    if lite:
+        # A few compact elements: no progress bars, step captions or jump links.
+        with run.stage("vitals_snapshot"):
+            lite_vitals(v, result, trends)
+        with run.stage("doctor_checks"):
+            lite_guidance(result)
+        with run.stage("questions_summary"):
+            lite_summary_section(result)
+            printable_section(doc)
+    else:
+        # Jump navigation
+        st.markdown(
+            f"""
+            **{_('Jump to:')}**  
+            - [{_('Vitals snapshot')}](#vitals-snapshot)  
+            - [{_('Doctor checks')}](#doctor-checks)  
+            - [{_('Urgent care')}](#urgent-care)  
+            - [{_('Questions')}](#questions)  
+            - [{_('Clinic summary')}](#clinic-summary)
+            """
+        )
+
+        with run.stage("vitals_snapshot"):
+            st.write("")
+            st.progress(0.50)
+            st.caption(_("Step 2/4: What doctors usually look at"))
+
+            vitals_section(v, result, trends)
+
+        with run.stage("doctor_checks"):
+            st.write("")
+            st.progress(0.75)
+            st.caption(_("Step 3/4: What your doctor may want to check + urgent warnings"))
+
+            doctor_checks_section(result)
+            hydration_section(result)
+            urgent_care_section(result)
+
+        with run.stage("questions_summary"):
+            st.write("")
+            st.progress(1.0)
+            st.caption(_("Step 4/4: Questions + clinic summary ready"))
+
+            questions_section(result)
+
+            st.subheader(_("🧾 What to bring to the clinic (simple checklist)"))
+            for item in CLINIC_CHECKLIST:
+                st.write(f"- {_(item)}")
+
+            summary_section(result)
+            printable_section(doc)
+
+    run.finish(result, submitted)  # outcome counters once per submission; stage timings every rerun
+
+    st.caption(_(DISCLAIMER))
+    st.caption(_("Built with Python + Streamlit. Designed for education and visit preparation, not diagnosis."))
+
+sessions.touch(st.session_state)  # publish what this run left in the session
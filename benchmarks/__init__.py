@@ -0,0 +1 @@
+"""Benchmarks for Clinic Companion NG (``python -m benchmarks --help``)."""
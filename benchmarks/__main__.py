@@ -0,0 +1,141 @@
+"""Run the benchmark suite or compare two result files.
+
+    python -m benchmarks run                      # engine + render + import, print a table
+    python -m benchmarks run -o benchmarks/baseline.json
+    python -m benchmarks compare benchmarks/baseline.json results.json --threshold 0.25
+    python -m benchmarks run --compare benchmarks/baseline.json
+    python -m benchmarks loadtest --sessions 1,5,10,20   # concurrent sessions on a local server
+    python -m benchmarks check                    # correctness checks (exit 1 on a failure)
+
+``compare`` exits with status 1 when any benchmark's median got slower than the
+baseline by more than the threshold (a fraction: 0.25 = 25 %). Payload entries
+(``payload.*``) are compared on bytes sent instead of time.
+"""
+import argparse
+from datetime import datetime, timezone
+import json
+import platform
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))  # app.py imports clinic_companion from the repo root
+
+SUITES = ("engine", "render", "import")
+
+def run_suites(suites, quick: bool = False) -> dict:
+    results = {}
+    if "engine" in suites:
+        from . import bench_engine
+        results.update(bench_engine.run(n_records=300 if quick else 2000, repeats=3 if quick else 7))
+    if "render" in suites:
+        from . import bench_render
+        results.update(bench_render.run(repeats=2 if quick else 5))
+    if "import" in suites:
+        from . import bench_import
+        results.update(bench_import.run(repeats=3 if quick else 7))
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+def _unit(result: dict) -> str:
+    return "bytes" if "bytes" in result else "median_us"
+
+def compare(baseline: dict, current: dict, threshold: float):
+    """Rows of (name, baseline, current, change, regressed, unit) for benchmarks in both files."""
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        unit = _unit(cur)
+        if unit not in base:
+            continue
+        change = cur[unit] / base[unit] - 1 if base[unit] else 0.0
+        rows.append((name, base[unit], cur[unit], change, change > threshold, unit))
+    return rows
+
+def print_results(data: dict) -> None:
+    print(f"{'benchmark':<34} {'median':>12} {'min':>12}")
+    for name, r in data["results"].items():
+        if _unit(r) == "bytes":
+            print(f"{name:<34} {_fmt_bytes(r['bytes']):>12} {int(r['messages']):>9} msg")
+        else:
+            print(f"{name:<34} {_fmt(r['median_us']):>12} {_fmt(r['min_us']):>12}")
+
+def print_comparison(rows, threshold: float) -> int:
+    print(f"{'benchmark':<34} {'baseline':>12} {'current':>12} {'change':>8}")
+    regressions = 0
+    for name, base, cur, change, regressed, unit in rows:
+        regressions += regressed
+        mark = "  REGRESSION" if regressed else ""
+        fmt = _fmt_bytes if unit == "bytes" else _fmt
+        print(f"{name:<34} {fmt(base):>12} {fmt(cur):>12} {change:>+7.0%}{mark}")
+    if regressions:
+        print(f"\n{regressions} benchmark(s) slower (or larger) than baseline by more than {threshold:.0%}")
+    return 1 if regressions else 0
+
+def _fmt(us: float) -> str:
+    if us >= 1e6:
+        return f"{us / 1e6:.2f} s"
+    if us >= 1e3:
+        return f"{us / 1e3:.2f} ms"
+    return f"{us:.2f} µs"
+
+def _fmt_bytes(n: float) -> str:
+    return f"{n / 1024:.1f} KiB" if n >= 1024 else f"{n:.0f} B"
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Clinic Companion NG benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run the benchmarks")
+    p_run.add_argument("--suite", choices=SUITES, action="append", help="only run this suite (repeatable)")
+    p_run.add_argument("--quick", action="store_true", help="fewer records and repeats (smoke run)")
+    p_run.add_argument("-o", "--output", help="write results JSON here")
+    p_run.add_argument("--compare", metavar="BASELINE", help="compare against a baseline JSON after running")
+    p_run.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before flagging (default 0.25)")
+
+    p_cmp = sub.add_parser("compare", help="compare two results files")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before flagging (default 0.25)")
+
+    p_check = sub.add_parser("check", help="run the correctness checks")
+    p_check.add_argument("names", nargs="*", help="only these checks (default: all)")
+
+    from . import loadtest
+    loadtest.add_parser(sub)
+
+    args = parser.parse_args(argv)
+    if args.command == "check":
+        from . import checks
+        return checks.run(args.names)
+    if args.command == "loadtest":
+        return args.func(args)
+    if args.command == "compare":
+        return print_comparison(compare(_load(args.baseline), _load(args.current), args.threshold), args.threshold)
+
+    data = run_suites(args.suite or SUITES, quick=args.quick)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        return print_comparison(compare(_load(args.compare), data, args.threshold), args.threshold)
+    print_results(data)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Micro-benchmarks for the engine helpers over synthetic intake records."""
+from clinic_companion import engine, handoff, printable
+from clinic_companion.analytics import KLLSketch, PopulationAnalytics
+from clinic_companion.cache import ResultCache, cached_assess_visit
+from clinic_companion.columnar import VisitColumns
+from clinic_companion.config import current as current_config
+from clinic_companion.rules import FEATURES, RULES, Rule, RuleSet, default_rules, features
+from clinic_companion.triggers import default_matcher
+
+from .synthetic import intakes, long_symptom_texts
+from .timing import measure
+
+def _cases(records):
+    v = [engine.normalize_intake(r) for r in records]
+    hyd = [tuple(x[name] for name in engine.HYDRATION_FIELDS) for x in v]
+    bmis = [engine.compute_bmi(x["height_cm"], x["weight_kg"]) for x in v]
+    summary_kwargs = []
+    for x, bmi in zip(v, bmis):
+        kw = {k: x[k] for k in ("caregiver", "patient_name", "age", "sex", "symptoms", "onset", "progression",
+                                "main_concern", "meds", "supplements", "sys_bp", "dia_bp", "pulse", "temp_c",
+                                "pcv", "glucose", "fasting", "height_cm", "weight_kg")}
+        kw["bmi"] = bmi
+        kw["hyd_inputs"] = {label: x[name] for name, label in engine.HYDRATION_LABELS.items()}
+        summary_kwargs.append(kw)
+    columns = {name: [x[name] for x in v] for name in engine.INTAKE_DEFAULTS}
+    visits = [engine.VisitRecord(r) for r in records]
+    stored = VisitColumns(visits)
+    warm_cache = ResultCache(maxsize=len(records) + 1, ttl=0)
+    for r in records:
+        cached_assess_visit(r, warm_cache)
+
+    return {
+        "engine.classify_bp": lambda: [engine.classify_bp(x["sys_bp"], x["dia_bp"], x["age"]) for x in v],
+        "engine.classify_temp": lambda: [engine.classify_temp(x["temp_c"]) for x in v],
+        "engine.classify_pulse": lambda: [engine.classify_pulse(x["pulse"], x["age"]) for x in v],
+        "engine.classify_pcv": lambda: [engine.classify_pcv(x["pcv"], x["sex"], x["pregnant"]) for x in v],
+        "engine.classify_glucose": lambda: [engine.classify_glucose(x["glucose"], x["fasting"], x["pregnant"]) for x in v],
+        "engine.classify_bmi": lambda: [engine.classify_bmi(b, x["age"]) for b, x in zip(bmis, v)],
+        "engine.hydration_risk": lambda: [engine.hydration_risk(*h) for h in hyd],
+        "engine.red_flags": lambda: [
+            engine.red_flags(x["symptoms"], x["sys_bp"], x["dia_bp"], x["temp_c"], x["glucose"], x["vomiting"], x["diarrhea"])
+            for x in v
+        ],
+        "engine.smart_questions": lambda: [
+            engine.smart_questions(x["sys_bp"] > 0 and x["dia_bp"] > 0, x["temp_c"] > 0, x["pulse"] > 0, x["pcv"] > 0,
+                                   x["glucose"] > 0, any(h), b is not None)
+            for x, h, b in zip(v, hyd, bmis)
+        ],
+        "engine.build_summary": lambda: [engine.build_summary(**kw) for kw in summary_kwargs],
+        "engine.VisitRecord": lambda: [engine.VisitRecord(r) for r in records],
+        "engine.visit_summary": lambda: [engine.visit_summary(x) for x in visits],
+        "engine.assess_visit": lambda: [engine.assess_visit(r) for r in records],
+        "engine.assess_visit_cached_hit": lambda: [cached_assess_visit(r, warm_cache) for r in records],
+        "engine.assess_many": lambda: engine.assess_many(columns),
+        "columnar.VisitColumns.assess": lambda: stored.assess(),
+    }
+
+def _local_rules(n: int, seed: int = 5) -> RuleSet:
+    """The built-in rules plus ``n`` synthetic local rules, each needing one to three features."""
+    import random
+
+    rng = random.Random(seed)
+    extra = []
+    for i in range(n):
+        required = rng.sample(range(len(FEATURES)), rng.randint(1, 3))
+        extra.append(Rule(rng.choice(("check", "question")), sum(1 << b for b in required), 0, f"local rule {i}"))
+    return RuleSet(RULES + extra)
+
+def _rule_cases(records):
+    visits = [engine.VisitRecord(r) for r in records]
+    masks = [features(v, engine.assess_visit(v)["labels"]) for v in visits]
+    ranges = current_config().ranges
+    axes = [ranges.bp_axes(v.sys_bp, v.dia_bp, engine.age_band(v.age)) for v in visits]  # as assess_visit has them
+    builtin, local = default_rules(), _local_rules(500)
+    return {
+        "rules.features": lambda: [features(v, {"pcv": "Typical", "temp": "Typical"}, a) for v, a in zip(visits, axes)],
+        "rules.evaluate": lambda: [(builtin.doctor_checks(m), builtin.questions(m)) for m in masks],
+        "rules.evaluate_uncached": lambda: [(builtin._evaluate(m, "check"), builtin._evaluate(m, "question"))
+                                            for m in masks],
+        "rules.evaluate_500_local_uncached": lambda: [(local._evaluate(m, "check"), local._evaluate(m, "question"))
+                                                      for m in masks],
+    }
+
+def _analytics_cases(records):
+    visits = [engine.VisitRecord(r) for r in records]
+    results = [engine.assess_visit(v) for v in visits]
+    sites = ("Ikeja", "Kano", "Enugu")
+    readings = [float(v.sys_bp) for v in visits if v.sys_bp]
+
+    def record():
+        store = PopulationAnalytics()
+        for i, (v, r) in enumerate(zip(visits, results)):
+            store.record(v, r, sites[i % 3])
+
+    def sketch():
+        s = KLLSketch(seed=1)
+        for x in readings * 10:
+            s.update(x)
+
+    return {
+        "analytics.record": record,
+        "analytics.kll_update_x10": sketch,
+    }
+
+def _text_cases(texts):
+    """Trigger matching on long, misspelt free text, with and without the per-word fuzzy cache warm."""
+    matcher = default_matcher()
+
+    def cold():
+        for text in texts:
+            matcher.fuzzy._cache.clear()
+            matcher.trigger_ids(text)
+
+    return {
+        "triggers.long_text": lambda: [matcher.trigger_ids(text) for text in texts],
+        "triggers.long_text_cold": cold,
+    }
+
+def _print_cases(records):
+    """Printable page renders (one A4 page per visit), and a cached submit of an already rendered page."""
+    docs = []
+    for r in records:
+        result = engine.assess_visit(r)
+        rows = tuple((name, "", engine.status_badge(label), label) for name, label in result["labels"].items())
+        docs.append(printable.Document("en", rows, tuple(result["red_flags"]), result["summary"]))
+    warm = printable.PrintRenderer(workers=1)
+    for doc in docs:
+        warm.submit(doc, "pdf").result()
+
+    return {
+        "printable.render_pdf": lambda: [printable.render_pdf(doc) for doc in docs],
+        "printable.render_html": lambda: [printable.render_html(doc) for doc in docs],
+        "printable.submit_cached": lambda: [warm.submit(doc, "pdf") for doc in docs],
+    }
+
+def _handoff_cases(records):
+    """QR hand-off packing: encode to Base45 text and decode back."""
+    texts = [handoff.to_text(handoff.encode(r)) for r in records]
+    return {
+        "handoff.encode": lambda: [handoff.to_text(handoff.encode(r)) for r in records],
+        "handoff.decode": lambda: [handoff.from_text(t) for t in texts],
+    }
+
+def run(n_records: int = 2000, repeats: int = 7) -> dict:
+    records = intakes(n_records)
+    cases = {**_cases(records), **_rule_cases(records), **_analytics_cases(records), **_handoff_cases(records)}
+    results = {name: measure(fn, repeats, per=n_records) for name, fn in cases.items()}
+    texts = long_symptom_texts(max(10, n_records // 20))
+    results.update({name: measure(fn, repeats, per=len(texts)) for name, fn in _text_cases(texts).items()})
+    pages = records[: max(10, n_records // 20)]
+    results.update({name: measure(fn, repeats, per=len(pages)) for name, fn in _print_cases(pages).items()})
+    return results
@@ -0,0 +1,55 @@
+"""Cold-start timings: each sample is a fresh interpreter.
+
+What a new worker pays before it can answer: importing the engine, the first
+assessment (range tables and trigger automaton ready), the same without the
+precompiled artifact, and the first full render of ``app.py`` (Streamlit import
+included). Bytecode is compiled up front so the numbers do not include it.
+"""
+import compileall
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from .timing import measure
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_SNIPPETS = {
+    "import.engine": "import clinic_companion.engine",
+    "import.first_assess": (
+        "import clinic_companion.engine as e\n"
+        "e.assess_visit({'symptoms': 'chest pain', 'sys_bp': 150, 'dia_bp': 95})"
+    ),
+    "import.first_render": (
+        "from streamlit.testing.v1 import AppTest\n"
+        "AppTest.from_file('app.py', default_timeout=60).run()"
+    ),
+}
+
+def _timed(code: str, env: dict) -> float:
+    """Run ``code`` in a fresh interpreter; returns its own perf_counter duration in seconds."""
+    wrapper = (
+        "import time, json\n"
+        "_t0 = time.perf_counter()\n"
+        f"exec({code!r})\n"
+        "print(json.dumps(time.perf_counter() - _t0))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", wrapper], cwd=ROOT, env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return float(json.loads(out.strip().splitlines()[-1]))
+
+def run(repeats: int = 7) -> dict:
+    compileall.compile_dir(ROOT / "clinic_companion", quiet=1)
+    compileall.compile_file(ROOT / "app.py", quiet=1)
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    no_artifact = {**env, "CLINIC_TABLES_PATH": "off"}
+    cases = {
+        "import.engine": (_SNIPPETS["import.engine"], env),
+        "import.first_assess": (_SNIPPETS["import.first_assess"], env),
+        "import.first_assess_no_artifact": (_SNIPPETS["import.first_assess"], no_artifact),
+        "import.first_render": (_SNIPPETS["import.first_render"], env),
+    }
+    return {name: measure(lambda c=code, e=e: _timed(c, e), repeats) for name, (code, e) in cases.items()}
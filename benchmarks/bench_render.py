@@ -0,0 +1,158 @@
+"""End-to-end render timings: drive app.py headlessly with Streamlit's AppTest.
+
+Also measures what one submit sends to the browser: the serialized size of the
+``ForwardMsg`` protobufs a session would push over the websocket, for the full
+layout and for low-data mode (``?lite=1``).
+"""
+from contextlib import contextmanager
+from pathlib import Path
+import statistics
+import time
+
+from .synthetic import intakes, red_flag_heavy
+from .timing import measure
+
+APP = str(Path(__file__).resolve().parent.parent / "app.py")
+
+# intake field -> (widget kind, label) on the form
+FORM_WIDGETS = {
+    "caregiver": ("checkbox", "I am filling this for someone else (caregiver mode)"),
+    "patient_name": ("text_input", "Name (optional)"),
+    "age": ("text_input", "Age (optional)"),
+    "sex": ("selectbox", "Sex (optional)"),
+    "pregnant": ("checkbox", "Currently pregnant (uses antenatal reference ranges)"),
+    "height_cm": ("number_input", "Height (cm)"),
+    "weight_kg": ("number_input", "Weight (kg)"),
+    "symptoms": ("text_area", "Describe symptoms (example: weakness, dizziness, fever, headache, cough, body pain)."),
+    "onset": ("selectbox", "When did these symptoms start?"),
+    "progression": ("selectbox", "How are the symptoms changing?"),
+    "main_concern": ("text_area", "What worries you most right now? (optional)"),
+    "meds": ("text_input", "Current medicines (if any) — e.g., BP meds, painkillers, antibiotics"),
+    "supplements": ("text_input", "Supplements/herbal mixtures (if any)"),
+    "drinking_less": ("selectbox", "Drinking less than usual?"),
+    "urine_color": ("selectbox", "Urine color (best guess)"),
+    "peeing_less": ("selectbox", "Urinating less than usual?"),
+    "vomiting": ("selectbox", "Vomiting?"),
+    "diarrhea": ("selectbox", "Diarrhea?"),
+    "heat_sweat": ("selectbox", "Heat exposure / heavy sweating?"),
+    "dry_dizzy": ("selectbox", "Dry mouth or dizziness?"),
+    "sys_bp": ("number_input", "Systolic BP (mmHg)"),
+    "dia_bp": ("number_input", "Diastolic BP (mmHg)"),
+    "pulse": ("number_input", "Pulse (bpm)"),
+    "temp_c": ("number_input", "Temperature (°C)"),
+    "pcv": ("number_input", "PCV (%)"),
+    "glucose": ("number_input", "Glucose (mmol/L)"),
+    "fasting": ("checkbox", "This was a fasting test"),
+}
+
+def fill_form(at, record: dict) -> None:
+    """Set every form widget from an intake record (fields left out stay blank)."""
+    for field, value in record.items():
+        if field not in FORM_WIDGETS:
+            continue
+        kind, label = FORM_WIDGETS[field]
+        widget = next(w for w in getattr(at, kind) if w.label == label)
+        if kind == "checkbox":
+            widget.check() if value else widget.uncheck()
+        elif kind == "selectbox":
+            widget.select(value)
+        elif kind == "number_input":
+            widget.set_value(value)
+        else:
+            widget.input(value)
+
+def submit_button(at):
+    return next(b for b in at.button if b.label == "Generate Visit Prep")
+
+def new_app_test(timeout: float = 60):
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file(APP, default_timeout=timeout).run()
+
+def _submit_case(record):
+    from clinic_companion.cache import RESULT_CACHE
+
+    def once():
+        at = new_app_test()
+        fill_form(at, record)
+        RESULT_CACHE.clear()  # time the cold path, not a cache hit from the previous repeat
+        start = time.perf_counter()
+        submit_button(at).click().run()
+        elapsed = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(f"app raised during benchmark: {at.exception[0].value}")
+        return elapsed
+    return once
+
+@contextmanager
+def count_payload():
+    """Sum the ForwardMsg bytes and message count of every script run inside the block.
+
+    Counted after Streamlit's queue has merged redundant deltas, i.e. what a real
+    session flushes to the websocket (download data is served over HTTP and not included).
+    """
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    totals = {"bytes": 0, "messages": 0}
+    original = LocalScriptRunner.forward_msgs
+
+    def forward_msgs(self):
+        msgs = original(self)
+        totals["bytes"] += sum(msg.ByteSize() for msg in msgs)
+        totals["messages"] += len(msgs)
+        return msgs
+
+    LocalScriptRunner.forward_msgs = forward_msgs
+    try:
+        yield totals
+    finally:
+        LocalScriptRunner.forward_msgs = original
+
+def rerun_payload(timeout: float = 60) -> dict:
+    """Bytes and messages for a plain rerun of the page (banner, sidebar and form, no results)."""
+    at = new_app_test(timeout)
+    with count_payload() as totals:
+        at.run()
+    return dict(totals)
+
+def submit_payload(record: dict, lite: bool = False, timeout: float = 60) -> dict:
+    """Bytes and messages sent for one submit of ``record`` (the page load itself not counted)."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    if lite:
+        at.query_params["lite"] = "1"
+    at.run()
+    fill_form(at, record)
+    with count_payload() as totals:
+        submit_button(at).click().run()
+    if at.exception:
+        raise RuntimeError(f"app raised during benchmark: {at.exception[0].value}")
+    return dict(totals)
+
+# bytes/s of a typical congested 3G link; only used to put the byte counts in perspective
+SLOW_3G_BPS = 400_000 / 8
+
+def _payload_case(sample, repeats: int) -> dict:
+    sizes = [sample() for _ in range(repeats)]
+    size = statistics.median(s["bytes"] for s in sizes)
+    return {
+        "bytes": size,
+        "messages": statistics.median(s["messages"] for s in sizes),
+        "slow_3g_ms": round(size / SLOW_3G_BPS * 1000, 1),
+        "repeats": repeats,
+    }
+
+def run(repeats: int = 5) -> dict:
+    full = intakes(1, seed=11)[0]
+    cases = {
+        "render.initial_load": lambda: new_app_test() and None,
+        "render.empty_submit": _submit_case({}),
+        "render.full_submit": _submit_case(full),
+        "render.red_flag_submit": _submit_case(red_flag_heavy()),
+    }
+    results = {name: measure(fn, repeats) for name, fn in cases.items()}
+    results["payload.page_rerun"] = _payload_case(rerun_payload, 2)
+    for layout, lite in (("full", False), ("lite", True)):
+        results[f"payload.full_submit.{layout}"] = _payload_case(lambda: submit_payload(full, lite), 2)
+        results[f"payload.red_flag_submit.{layout}"] = _payload_case(lambda: submit_payload(red_flag_heavy(), lite), 2)
+    return results
@@ -0,0 +1,157 @@
+"""Correctness checks run before trusting a benchmark (``python -m benchmarks check``).
+
+Each check returns a list of failure messages; an empty list is a pass.
+"""
+from datetime import date
+
+from clinic_companion import analytics, engine, export, handoff
+from clinic_companion.columnar import VisitColumns
+from clinic_companion.triggers import default_matcher
+
+from .synthetic import intakes
+
+# symptom text -> trigger keys it must fire (and nothing else)
+TRIGGER_CASES = {
+    # real words one edit from a trigger word
+    "I have a contusion on my knee": [],
+    "the doctors are on strike": [],
+    "stoke the fire": [],
+    "he works in dog breeding": [],
+    "a bleeping sound in my ear": [],
+    "blending my food": [],
+    "a breach of trust": [],
+    # short words are never corrected
+    "paint fumes": [],
+    "strok": [],
+    # misspellings that must still fire
+    "chest pian": ["chest pain"],
+    "siezure": ["seiz"],
+    "siezures last night": ["seiz"],
+    "shortnes of breath": ["shortness of breath"],
+    "difficuty breathing": ["difficulty breathing"],
+    "confsion": ["confusion"],
+    "bledding from the wound": ["bleeding"],
+    "convlusion": ["seiz"],
+    # short pack phrases fire as whole words only
+    "ẹ dákun, orí ń fọ́ mi": [],
+    "I live in Egbado": [],
+    "ó dákú lánàá": ["faint"],
+    "ẹ̀gbà": ["stroke"],
+}
+
+def trigger_cases() -> list:
+    matcher = default_matcher()
+    failures = []
+    for text, want in TRIGGER_CASES.items():
+        got = sorted({m.trigger for m in matcher.scan(text)})
+        if got != sorted(want):
+            failures.append(f"{text!r}: fired {got}, expected {sorted(want)}")
+    return failures
+
+def _parity(records, many) -> list:
+    """Rows where ``assess_many`` output differs from ``assess_visit`` on the same records."""
+    failures = []
+    for i, record in enumerate(records):
+        one = engine.assess_visit(record)
+        got = {name: str(many[name][i]) for name in ("bp", "temp", "pulse", "pcv", "glucose")}
+        got["bmi"] = str(many["bmi_label"][i])
+        if got != one["labels"]:
+            diff = {k: (one["labels"][k], got[k]) for k in got if got[k] != one["labels"][k]}
+            failures.append(f"record {i}: labels (assess_visit, assess_many) {diff}")
+        if one["hydration"] and one["hydration"]["level"] != many["hydration_level"][i]:
+            failures.append(f"record {i}: hydration {one['hydration']['level']} != {many['hydration_level'][i]}")
+        if one["red_flags"] != many["red_flags"][i]:
+            failures.append(f"record {i}: red flags {one['red_flags']} != {many['red_flags'][i]}")
+    return failures
+
+def assess_many_parity(n: int = 2000) -> list:
+    """``assess_many`` (raw columns and ``VisitColumns``) agrees with ``assess_visit`` row for row."""
+    records = intakes(n, seed=11)
+    for i, record in enumerate(records[::7]):  # pregnancy ticked for men and unspecified sex too
+        record["pregnant"] = True
+        record["sex"] = ("Male", "Female", "Prefer not to say")[i % 3]
+    columns = {name: [r[name] for r in records] for name in engine.INTAKE_DEFAULTS}
+    failures = _parity(records, engine.assess_many(columns))
+    failures += _parity(records, VisitColumns([engine.VisitRecord(r) for r in records]).assess())
+    return failures[:20] + ([f"... {len(failures) - 20} more"] if len(failures) > 20 else [])
+
+def handoff_flags(n: int = 200) -> list:
+    """Every red flag survives a hand-off round trip, including labels outside ``FLAG_CODES``."""
+    failures = []
+    site_flags = ["Possible snakebite: refer now", "Possible snakebite: refer now", "Ésọ́ (site label)"]
+    for i, record in enumerate(intakes(n, seed=5)):
+        flags = engine.assess_visit(record)["red_flags"] + site_flags[:i % 4]
+        expected = list(dict.fromkeys(flags))
+        got = handoff.from_text(handoff.to_text(handoff.encode(record, flags))).flag_labels
+        if sorted(got) != sorted(expected):
+            failures.append(f"row {i}: sent {expected}, read back {got}")
+    try:
+        handoff.encode({}, ["x" * 200, "y" * 200])
+        failures.append("over-long site labels were encoded instead of refused")
+    except ValueError:
+        pass
+    return failures[:5]
+
+def non_finite_values() -> list:
+    """Non-finite and overflowing numbers are a ``ValueError`` for that record, never a crash or a label."""
+    failures = []
+    for field, value in [("sys_bp", "inf"), ("sys_bp", 1e999), ("pulse", "-inf"), ("temp_c", "nan"),
+                         ("glucose", float("nan")), ("dia_bp", "1e999")]:
+        try:
+            engine.VisitRecord({field: value})
+            failures.append(f"{field}={value!r} was accepted")
+        except ValueError:
+            pass
+        except Exception as exc:
+            failures.append(f"{field}={value!r} raised {type(exc).__name__}")
+    return failures
+
+def export_bad_cells() -> list:
+    """A CSV cell that is not a finite number fails its row in ``index.csv``, not the export."""
+    import csv
+    import io
+    import zipfile
+
+    data = b"patient_name,sys_bp,dia_bp,temp_c\nAda,1e999,80,\nBola,inf,80,\nChidi,120,80,nan\nDayo,120,80,37.0\n"
+    try:
+        archive, stats = export.export_csv_bytes(data)
+    except Exception as exc:
+        return [f"export raised {type(exc).__name__}: {exc}"]
+    if (stats["exported"], stats["failed"]) != (1, 3):
+        return [f"expected 1 exported and 3 failed, got {stats}"]
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        rows = list(csv.DictReader(io.StringIO(zf.read("index.csv").decode("utf-8"))))
+    return [f"row {row['index']} has no error in index.csv" for row in rows[:3] if not row["error"]]
+
+def analytics_periods() -> list:
+    """Periods are calendar days back from today, not the last N days that happen to have data."""
+    store = analytics.PopulationAnalytics(max_days=30, today=lambda: date(2026, 10, 17))
+    visit = engine.VisitRecord({"sys_bp": 120})
+    result = engine.assess_visit(visit)
+    for day in (1, 12, 16, 17):
+        store.record(visit, result, day=date(2026, 10, day))
+    store.record(visit, result, day=date(2026, 9, 1))
+    expected = {1: ["2026-10-17"], 7: ["2026-10-12", "2026-10-16", "2026-10-17"],
+                None: ["2026-10-01", "2026-10-12", "2026-10-16", "2026-10-17"]}
+    return [f"days({n}) = {store.days(n)}, expected {days}" for n, days in expected.items() if store.days(n) != days]
+
+CHECKS = {
+    "triggers.fuzzy": trigger_cases,
+    "engine.assess_many_parity": assess_many_parity,
+    "handoff.flags": handoff_flags,
+    "engine.non_finite": non_finite_values,
+    "export.bad_cells": export_bad_cells,
+    "analytics.periods": analytics_periods,
+}
+
+def run(names=None) -> int:
+    failed = 0
+    for name, check in CHECKS.items():
+        if names and name not in names:
+            continue
+        failures = check()
+        failed += bool(failures)
+        print(f"{name:<34} {'FAIL' if failures else 'ok'}")
+        for message in failures:
+            print(f"    {message}")
+    return 1 if failed else 0
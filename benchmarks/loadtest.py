@@ -0,0 +1,328 @@
+"""Concurrent-session load test: N browser sessions submitting the form at once.
+
+Starts ``streamlit run app.py`` on a free local port (or uses ``--url``) and
+drives each session over the same websocket protocol the browser uses: a
+``rerun_script`` message carrying the widget values and the submit trigger, then
+waiting for ``script_finished``. Sessions submit a mix of synthetic intakes,
+red-flag-heavy forms and empty submits, with an exponential think time between
+them, and a share of sessions use low-data mode (``?lite=1``).
+
+    python -m benchmarks loadtest --sessions 1,5,10,20 --submits 10
+    python -m benchmarks loadtest --sessions 50 --think 2 -o load.json
+
+Reported per level: p50/p95/p99/max submit-to-render latency, submits per
+second, errors, and the server's resident memory (before, peak, and the growth
+per connected session). Each level gets a fresh server so the memory figures
+are not inflated by the sessions of the previous level. The client runs on the
+same machine and takes some CPU, so treat the numbers as a lower bound for a
+dedicated instance.
+"""
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .bench_render import APP, FORM_WIDGETS
+from .synthetic import intakes, red_flag_heavy
+
+STREAM_PATH = "/_stcore/stream"
+HEALTH_PATH = "/_stcore/health"
+
+# share of submits per kind, and of sessions in low-data mode
+MIX = (("intake", 0.8), ("red_flag", 0.1), ("empty", 0.1))
+LITE_SHARE = 0.3
+
+def percentile(samples, q: float) -> float:
+    """Nearest-rank percentile (``q`` in 0-100) of a non-empty list."""
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+def rss_bytes(pid: int):
+    """Resident set size of ``pid`` from /proc, or None where that is not available."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@contextmanager
+def local_server(timeout: float = 60):
+    """Run ``streamlit run app.py`` headless on a free port; yields (base url, pid)."""
+    port = _free_port()
+    cmd = [sys.executable, "-m", "streamlit", "run", APP, "--server.headless", "true",
+           "--server.address", "127.0.0.1", "--server.port", str(port),
+           "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"]
+    with tempfile.TemporaryFile() as log:
+        proc = subprocess.Popen(cmd, cwd=str(Path(APP).parent), stdout=log, stderr=subprocess.STDOUT)
+        url = f"http://127.0.0.1:{port}"
+        try:
+            if not asyncio.run(_wait_healthy(url, proc, timeout)):
+                log.seek(0)
+                tail = log.read().decode("utf-8", "replace")[-2000:]
+                raise RuntimeError(f"streamlit server did not start:\n{tail}")
+            yield url, proc.pid
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+async def _wait_healthy(url: str, proc, timeout: float) -> bool:
+    from tornado.httpclient import AsyncHTTPClient
+
+    client = AsyncHTTPClient()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            break
+        try:
+            await client.fetch(url + HEALTH_PATH, request_timeout=2)
+            return True
+        except Exception:
+            await asyncio.sleep(0.1)
+    return False
+
+# ---------------------------
+# One simulated browser session
+# ---------------------------
+class Session:
+    """A websocket session that knows the form's widget ids after the first page load."""
+
+    def __init__(self, url: str, lite: bool, timeout: float):
+        self.ws_url = url.replace("http", "ws", 1) + STREAM_PATH
+        self.query = "lite=1" if lite else ""
+        self.timeout = timeout
+        self.widgets = {}  # label -> widget proto
+        self.ws = None
+
+    async def connect(self) -> None:
+        from tornado.websocket import websocket_connect
+
+        self.ws = await websocket_connect(self.ws_url)
+        await self.rerun([])
+
+    def close(self) -> None:
+        if self.ws is not None:
+            self.ws.close()
+
+    async def rerun(self, states) -> bool:
+        """Send one rerun with ``states``; True if the script finished without an exception."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = self.query
+        msg.rerun_script.widget_states.widgets.extend(states)
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        ok = True
+        while True:
+            raw = await asyncio.wait_for(self.ws.read_message(), self.timeout)
+            if raw is None:
+                raise ConnectionError("server closed the websocket")
+            fm = ForwardMsg.FromString(raw)
+            kind = fm.WhichOneof("type")
+            if kind == "delta" and fm.delta.WhichOneof("type") == "new_element":
+                element = fm.delta.new_element
+                name = element.WhichOneof("type")
+                if name == "exception":
+                    ok = False
+                widget = getattr(element, name)
+                if getattr(widget, "id", "") and getattr(widget, "label", ""):
+                    self.widgets[widget.label] = widget
+            elif kind == "script_finished":
+                return ok
+
+    def form_states(self, record: dict) -> list:
+        """WidgetState protos for ``record`` plus the submit button's trigger."""
+        from streamlit.proto.NumberInput_pb2 import NumberInput
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        states = []
+        for field, value in record.items():
+            if field not in FORM_WIDGETS:
+                continue
+            kind, label = FORM_WIDGETS[field]
+            widget = self.widgets[label]
+            state = WidgetState(id=widget.id)
+            if kind == "checkbox":
+                state.bool_value = bool(value)
+            elif kind == "selectbox":
+                state.int_value = list(widget.options).index(value)
+            elif kind == "number_input":
+                if widget.data_type == NumberInput.INT:
+                    state.int_value = int(value)
+                else:
+                    state.double_value = float(value)
+            else:
+                state.string_value = str(value)
+            states.append(state)
+        states.append(WidgetState(id=self.widgets["Generate Visit Prep"].id, trigger_value=True))
+        return states
+
+async def _run_session(url: str, lite: bool, records, think: float, timeout: float, rng, out: dict) -> None:
+    session = Session(url, lite, timeout)
+    try:
+        await session.connect()
+        out["connected"] += 1
+        for record in records:
+            await asyncio.sleep(rng.expovariate(1 / think) if think > 0 else 0)
+            start = time.perf_counter()
+            try:
+                ok = await session.rerun(session.form_states(record))
+            except asyncio.TimeoutError:
+                ok = False
+            if ok:
+                out["latencies"].append(time.perf_counter() - start)
+            else:
+                out["errors"] += 1
+    except (OSError, ConnectionError, asyncio.TimeoutError) as exc:
+        out["errors"] += 1
+        out["messages"].append(f"{type(exc).__name__}: {exc}")
+    finally:
+        await out["done"].put(session)
+
+def _records(rng, pool, heavy, n: int) -> list:
+    kinds, weights = zip(*MIX)
+    out = []
+    for kind in rng.choices(kinds, weights, k=n):
+        out.append(rng.choice(pool) if kind == "intake" else heavy if kind == "red_flag" else {})
+    return out
+
+async def _run_level(url: str, pid, sessions: int, submits: int, think: float, timeout: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    pool, heavy = intakes(500, seed=seed), red_flag_heavy()
+    out = {"latencies": [], "errors": 0, "connected": 0, "messages": [], "done": asyncio.Queue()}
+    rss_before = rss_bytes(pid) if pid else None
+    peak = rss_before or 0
+
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(_run_session(url, rng.random() < LITE_SHARE, _records(rng, pool, heavy, submits),
+                                              think, timeout, random.Random(rng.random()), out))
+             for _ in range(sessions)]
+    finished = []
+    while len(finished) < sessions:
+        try:
+            finished.append(await asyncio.wait_for(out["done"].get(), 0.25))
+        except asyncio.TimeoutError:
+            pass
+        if pid:
+            peak = max(peak, rss_bytes(pid) or 0)
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*tasks)
+    # every session still connected (and holding its results): what each one costs the server
+    rss_after = rss_bytes(pid) if pid else None
+    for session in finished:
+        session.close()
+
+    latencies = out["latencies"]
+    result = {
+        "sessions": sessions,
+        "submits": len(latencies),
+        "errors": out["errors"],
+        "elapsed_s": round(elapsed, 2),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+    }
+    if latencies:
+        ms = [s * 1000 for s in latencies]
+        result.update({f"p{q}_ms": round(percentile(ms, q), 1) for q in (50, 95, 99)})
+        result["max_ms"] = round(max(ms), 1)
+    if rss_before is not None and rss_after is not None:
+        result.update({
+            "rss_before_mb": round(rss_before / 2**20, 1),
+            "rss_peak_mb": round(max(peak, rss_after) / 2**20, 1),
+            "rss_per_session_kb": round((rss_after - rss_before) / 1024 / max(out["connected"], 1), 1),
+        })
+    if out["messages"]:
+        result["error_messages"] = sorted(set(out["messages"]))[:5]
+    return result
+
+async def _warm_up(url: str, timeout: float) -> None:
+    """One session loads the page and submits once, so imports and tables are not charged to the first level."""
+    session = Session(url, False, timeout)
+    try:
+        await session.connect()
+        await session.rerun(session.form_states(red_flag_heavy()))
+    finally:
+        session.close()
+
+def run_level(sessions: int, submits: int = 10, think: float = 1.0, timeout: float = 60,
+              url: str = None, seed: int = 2024) -> dict:
+    """One load level; starts (and stops) a local server unless ``url`` is given."""
+    if url:
+        return asyncio.run(_run_level(url.rstrip("/"), None, sessions, submits, think, timeout, seed))
+    with local_server() as (base, pid):
+        asyncio.run(_warm_up(base, timeout))
+        time.sleep(0.5)
+        return asyncio.run(_run_level(base, pid, sessions, submits, think, timeout, seed))
+
+def print_header() -> None:
+    print(f"{'sessions':>8} {'submits':>8} {'err':>4} {'per s':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} "
+          f"{'RSS peak':>9} {'/session':>9}")
+
+def print_level(r: dict) -> None:
+    lat = [f"{r[k]:.0f} ms" if k in r else "-" for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")]
+    peak = f"{r['rss_peak_mb']:.0f} MB" if "rss_peak_mb" in r else "-"
+    per = f"{r['rss_per_session_kb']:.0f} KB" if "rss_per_session_kb" in r else "-"
+    print(f"{r['sessions']:>8} {r['submits']:>8} {r['errors']:>4} {r['throughput_per_s']:>7.1f} "
+          f"{lat[0]:>9} {lat[1]:>9} {lat[2]:>9} {lat[3]:>9} {peak:>9} {per:>9}", flush=True)
+    for message in r.get("error_messages", ()):
+        print(f"{'':>8} ! {message}")
+
+def run(args) -> int:
+    levels = []
+    print_header()
+    for n in args.sessions:
+        levels.append(run_level(n, args.submits, args.think, args.timeout, args.url, args.seed))
+        print_level(levels[-1])
+    if args.output:
+        data = {
+            "meta": {
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "submits_per_session": args.submits,
+                "think_s": args.think,
+                "url": args.url or "local",
+            },
+            "levels": levels,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+    return 1 if any(r["errors"] for r in levels) else 0
+
+def _sessions(text: str) -> list:
+    return [int(n) for n in text.split(",") if n.strip()]
+
+def add_parser(subparsers):
+    p = subparsers.add_parser("loadtest", help="simulate concurrent sessions against a local server")
+    p.add_argument("--sessions", type=_sessions, default=[1, 5, 10, 20],
+                   help="comma-separated concurrency levels (default 1,5,10,20)")
+    p.add_argument("--submits", type=int, default=10, help="submits per session (default 10)")
+    p.add_argument("--think", type=float, default=1.0, help="mean seconds between submits (default 1.0, 0 = none)")
+    p.add_argument("--timeout", type=float, default=60, help="seconds before a submit counts as failed")
+    p.add_argument("--url", help="use a running server (e.g. http://127.0.0.1:8501) instead; no memory figures")
+    p.add_argument("--seed", type=int, default=2024)
+    p.add_argument("-o", "--output", help="write the levels as JSON here")
+    p.set_defaults(func=run)
+    return p
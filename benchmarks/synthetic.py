@@ -0,0 +1,90 @@
+"""Synthetic intake records with roughly the mix seen at outreach days.
+
+Most people leave most fields blank; vitals that are entered cluster around
+adult reference values with a long tail; symptom text mixes English and Pidgin.
+"""
+import random
+
+SYMPTOM_PHRASES = [
+    "fever", "headache", "body pain", "weakness", "dizziness", "cough", "catarrh", "malaria",
+    "stomach pain", "belle dey pain", "tiredness", "poor appetite", "joint pain", "back pain",
+    "chest pain", "shortness of breath", "fainted yesterday", "chest dey hook me", "black stool",
+    "vomit blood", "confusion", "seizure",
+]
+RED_FLAG_PHRASES = ["chest pain", "difficulty breathing", "fainting", "seizure", "vomit blood", "black stool",
+                    "chest dey hook me", "i no fit breathe", "bleeding wey no gree stop"]
+
+FILLER_WORDS = ("i", "have", "been", "feeling", "since", "last", "week", "and", "my", "the", "when", "with",
+                "sometimes", "at", "night", "after", "eating", "walking", "it", "comes", "goes", "very", "bad", "also")
+
+def _maybe(rng, p, value, blank=0):
+    return value if rng.random() < p else blank
+
+def intake(rng: random.Random) -> dict:
+    n_sym = rng.choice([0, 1, 1, 2, 2, 3, 4])
+    return {
+        "caregiver": rng.random() < 0.2,
+        "patient_name": _maybe(rng, 0.5, rng.choice(["Ada", "Musa", "Ngozi", "Tunde", "Bisi"]), ""),
+        "age": _maybe(rng, 0.7, str(rng.choice([rng.randint(18, 80), rng.randint(1, 17)])), ""),
+        "sex": rng.choice(["Prefer not to say", "Male", "Female", "Female"]),
+        "pregnant": rng.random() < 0.05,
+        "symptoms": ", ".join(rng.sample(SYMPTOM_PHRASES, n_sym)),
+        "onset": rng.choice(["", "Today", "2–3 days ago", "1–2 weeks ago", "Longer than 2 weeks"]),
+        "progression": rng.choice(["", "Getting better", "Getting worse", "About the same"]),
+        "main_concern": _maybe(rng, 0.3, "I want to know if it is malaria", ""),
+        "meds": _maybe(rng, 0.4, rng.choice(["paracetamol", "amlodipine 5mg", "artemether-lumefantrine"]), ""),
+        "supplements": _maybe(rng, 0.2, "agbo", ""),
+        "sys_bp": _maybe(rng, 0.6, max(70, int(rng.gauss(130, 20)))),
+        "dia_bp": _maybe(rng, 0.6, max(40, int(rng.gauss(84, 12)))),
+        "pulse": _maybe(rng, 0.5, max(40, int(rng.gauss(85, 15)))),
+        "temp_c": _maybe(rng, 0.5, round(rng.gauss(37.3, 0.9), 1), 0.0),
+        "pcv": _maybe(rng, 0.3, round(rng.gauss(36, 5), 1), 0.0),
+        "glucose": _maybe(rng, 0.3, round(max(2.0, rng.lognormvariate(1.75, 0.35)), 1), 0.0),
+        "fasting": rng.random() < 0.4,
+        "height_cm": _maybe(rng, 0.3, round(rng.gauss(165, 9), 1), 0.0),
+        "weight_kg": _maybe(rng, 0.3, round(rng.gauss(70, 14), 1), 0.0),
+        "drinking_less": rng.choice(["", "", "No", "Yes"]),
+        "urine_color": rng.choice(["", "", "Pale yellow", "Yellow", "Dark yellow"]),
+        "peeing_less": rng.choice(["", "", "No", "Yes"]),
+        "vomiting": rng.choice(["", "", "No", "Some", "Frequent"]),
+        "diarrhea": rng.choice(["", "", "No", "Some", "Frequent"]),
+        "heat_sweat": rng.choice(["", "", "No", "Yes"]),
+        "dry_dizzy": rng.choice(["", "", "No", "Yes"]),
+    }
+
+def intakes(n: int, seed: int = 2024) -> list:
+    rng = random.Random(seed)
+    return [intake(rng) for _ in range(n)]
+
+def typo(rng: random.Random, word: str) -> str:
+    """``word`` with one random swap, drop or doubled letter (first letter kept)."""
+    if len(word) < 4:
+        return word
+    i = rng.randint(1, len(word) - 2)
+    kind = rng.choice(("swap", "drop", "double"))
+    if kind == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if kind == "drop":
+        return word[:i] + word[i + 1:]
+    return word[:i] + word[i] + word[i:]
+
+def long_symptom_texts(n: int, words: int = 100, seed: int = 99) -> list:
+    """Free-text symptom descriptions of about ``words`` words, one in five words misspelt."""
+    rng = random.Random(seed)
+    vocab = list(FILLER_WORDS) + " ".join(SYMPTOM_PHRASES + RED_FLAG_PHRASES).split()
+    texts = []
+    for _ in range(n):
+        picked = [rng.choice(vocab) for _ in range(words)]
+        texts.append(" ".join(typo(rng, w) if rng.random() < 0.2 else w for w in picked))
+    return texts
+
+def red_flag_heavy(seed: int = 7) -> dict:
+    """One worst-case submission: long symptom text full of triggers and extreme vitals."""
+    rng = random.Random(seed)
+    record = intake(rng)
+    record.update({
+        "symptoms": ". ".join(RED_FLAG_PHRASES * 3),
+        "sys_bp": 195, "dia_bp": 125, "pulse": 130, "temp_c": 40.1, "glucose": 15.2,
+        "vomiting": "Frequent", "diarrhea": "Frequent", "urine_color": "Dark yellow", "peeing_less": "Yes",
+    })
+    return record
@@ -0,0 +1,25 @@
+"""Small timing helpers shared by the benchmark modules."""
+import statistics
+import time
+
+def measure(run_once, repeats: int, per: int = 1) -> dict:
+    """Call ``run_once`` ``repeats`` times; report per-item wall time in microseconds.
+
+    ``per`` is how many items one call processes (e.g. records in a loop), so the
+    numbers stay comparable when the workload size changes. If ``run_once`` returns
+    a number, that is taken as the elapsed seconds instead (for cases with setup
+    that should not be timed).
+    """
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        timed = run_once()
+        elapsed = timed if isinstance(timed, float) else time.perf_counter() - start
+        samples.append(elapsed / per * 1e6)
+    return {
+        "median_us": statistics.median(samples),
+        "min_us": min(samples),
+        "max_us": max(samples),
+        "repeats": repeats,
+        "per": per,
+    }
@@ -0,0 +1,81 @@
+"""Clinic Companion NG: headless assessment engine shared by the Streamlit app and tools."""
+from .engine import (
+    DISCLAIMER,
+    SYMPTOM_TRIGGERS,
+    VITAL_FLAGS,
+    VisitRecord,
+    assess_many,
+    assess_visit,
+    bp_context,
+    build_summary,
+    classify_bmi,
+    classify_bp,
+    classify_glucose,
+    classify_pcv,
+    classify_pulse,
+    classify_temp,
+    compute_bmi,
+    glucose_context,
+    hydration_advice,
+    hydration_risk,
+    normalize_intake,
+    pcv_context,
+    pulse_context,
+    red_flags,
+    safe_text,
+    smart_questions,
+    status_badge,
+    temp_context,
+    visit_summary,
+)
+from .columnar import VisitColumns
+from .fuzzy import FuzzyIndex
+from .ranges import RANGE_TABLES, RANGES, RangeTables, age_band
+from .rules import RULES, RuleSet, build_rules, default_rules, load_rules
+from .triggers import TriggerMatch, TriggerMatcher, build_matcher, default_matcher, load_pack
+
+__all__ = [
+    "DISCLAIMER",
+    "FuzzyIndex",
+    "RANGES",
+    "RANGE_TABLES",
+    "RULES",
+    "RangeTables",
+    "RuleSet",
+    "SYMPTOM_TRIGGERS",
+    "TriggerMatch",
+    "TriggerMatcher",
+    "VITAL_FLAGS",
+    "VisitColumns",
+    "VisitRecord",
+    "age_band",
+    "assess_many",
+    "assess_visit",
+    "bp_context",
+    "build_matcher",
+    "build_rules",
+    "build_summary",
+    "classify_bmi",
+    "classify_bp",
+    "classify_glucose",
+    "classify_pcv",
+    "classify_pulse",
+    "classify_temp",
+    "compute_bmi",
+    "default_matcher",
+    "default_rules",
+    "glucose_context",
+    "hydration_advice",
+    "hydration_risk",
+    "load_pack",
+    "load_rules",
+    "normalize_intake",
+    "pcv_context",
+    "pulse_context",
+    "red_flags",
+    "safe_text",
+    "smart_questions",
+    "status_badge",
+    "temp_context",
+    "visit_summary",
+]
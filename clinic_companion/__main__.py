@@ -0,0 +1,23 @@
+"""Command line entry point: ``python -m clinic_companion <command> ...``."""
+import argparse
+import sys
+
+from . import api, audit, batch, config, export, handoff, i18n, outbox, precompiled
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m clinic_companion", description="Clinic Companion NG tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    batch.add_parser(subparsers)
+    api.add_parser(subparsers)
+    export.add_parser(subparsers)
+    precompiled.add_parser(subparsers)
+    i18n.add_parser(subparsers)
+    outbox.add_parser(subparsers)
+    handoff.add_parser(subparsers)
+    audit.add_parser(subparsers)
+    config.add_parser(subparsers)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
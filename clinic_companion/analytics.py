@@ -0,0 +1,324 @@
+"""Live population aggregates for clinic admins, updated on every submit.
+
+Each submission adds to the aggregate of its (day, site): counters for BP and
+temperature categories, fever, the ``hydration_risk`` level and red flags by
+trigger, and a KLL quantile sketch per vital (systolic/diastolic BP, pulse,
+temperature, glucose). A sketch keeps a few hundred numbers however many
+readings it has seen and answers any quantile to within about 1 % of rank, and
+two sketches merge into one, so a summary over any set of days and sites is built
+from the per-day aggregates without going back to raw records.
+
+Aggregates are kept for ``CLINIC_ANALYTICS_DAYS`` days (default 90). Set
+``CLINIC_ANALYTICS_FILE`` to keep them across restarts (JSON, rewritten at most
+every 30 seconds). The site is ``?site=`` in the app URL when it names one of the
+sites in ``CLINIC_SITES``, otherwise ``CLINIC_SITE``.
+"""
+from datetime import date, timedelta
+import json
+import math
+import os
+from pathlib import Path
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .metrics import FLAG_KEYS
+from .rules import FEVER_LABELS
+
+DEFAULT_K = 200
+DEFAULT_DAYS = int(os.environ.get("CLINIC_ANALYTICS_DAYS", "90"))
+SAVE_EVERY = 30.0  # seconds between snapshots to CLINIC_ANALYTICS_FILE
+DEFAULT_SITE = "default"
+
+VITALS = ("sys_bp", "dia_bp", "pulse", "temp_c", "glucose")
+QUANTILES = (0.1, 0.5, 0.9)
+
+# ---------------------------
+# KLL quantile sketch
+# ---------------------------
+class KLLSketch:
+    """Streaming quantiles in O(k) memory (Karnin, Lang & Liberty's KLL sketch).
+
+    Level ``h`` holds items that each stand for ``2**h`` readings. When a level
+    fills up it is sorted and every other item (odd or even positions, at random)
+    moves up a level. Capacities shrink by 2/3 per level below the top, which
+    bounds the total size at about ``3k`` items.
+    """
+
+    def __init__(self, k: int = DEFAULT_K, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        self.min = self.max = None
+        self.levels: List[list] = [[]]
+        self._rng = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, value: float) -> None:
+        self.levels[0].append(value)
+        self.n += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            if len(self.levels[h]) >= self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append([])
+                items = sorted(self.levels[h])
+                leftover = [items.pop()] if len(items) % 2 else []  # an odd item stays behind
+                self.levels[h + 1].extend(items[self._rng.random() < 0.5::2])
+                self.levels[h] = leftover
+            h += 1
+
+    def merge(self, other: "KLLSketch") -> None:
+        """Fold ``other`` into this sketch (both keep answering within their error bound)."""
+        if not other.n:
+            return
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, items in enumerate(other.levels):
+            self.levels[h].extend(items)
+        self.n += other.n
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at rank ``q`` (0-1), or None for an empty sketch."""
+        if not self.n:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        weighted = sorted((v, 1 << h) for h, items in enumerate(self.levels) for v in items)
+        target = q * sum(w for _, w in weighted)
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return self.max
+
+    def state(self) -> dict:
+        return {"k": self.k, "n": self.n, "min": self.min, "max": self.max, "levels": self.levels}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "KLLSketch":
+        sketch = cls(state["k"])
+        sketch.n, sketch.min, sketch.max = state["n"], state["min"], state["max"]
+        sketch.levels = [list(items) for items in state["levels"]] or [[]]
+        return sketch
+
+# ---------------------------
+# Per (day, site) aggregates
+# ---------------------------
+class Aggregate:
+    """Counters and vital-sign sketches for one day at one site."""
+
+    __slots__ = ("submissions", "counts", "sketches")
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.submissions = 0
+        # dimension -> category -> count
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self.sketches = {name: KLLSketch(k) for name in VITALS}
+
+    def _count(self, dimension: str, category: str, amount: int = 1) -> None:
+        counts = self.counts.setdefault(dimension, {})
+        counts[category] = counts.get(category, 0) + amount
+
+    def add(self, visit, result: dict) -> None:
+        labels = result["labels"]
+        self.submissions += 1
+        if visit.has_bp:
+            self._count("bp", labels["bp"])
+        if visit.temp_c > 0:
+            self._count("temp", labels["temp"])
+            self._count("fever", "yes" if labels["temp"] in FEVER_LABELS else "no")  # same test as the rule feature
+        hydration = result["hydration"]
+        self._count("hydration", hydration["level"] if hydration else "not_provided")
+        self._count("urgent", "yes" if result["red_flags"] else "no")
+        for label in result["red_flags"]:
+            self._count("red_flags", FLAG_KEYS.get(label, "other"))
+        for name in VITALS:
+            value = getattr(visit, name)
+            if value > 0:
+                self.sketches[name].update(float(value))
+
+    def merge(self, other: "Aggregate") -> None:
+        self.submissions += other.submissions
+        for dimension, counts in other.counts.items():
+            for category, n in counts.items():
+                self._count(dimension, category, n)
+        for name, sketch in other.sketches.items():
+            self.sketches[name].merge(sketch)
+
+    def summary(self) -> dict:
+        def rate(dimension: str) -> Optional[float]:
+            counts = self.counts.get(dimension, {})
+            total = sum(counts.values())
+            return round(counts.get("yes", 0) / total, 4) if total else None
+
+        return {
+            "submissions": self.submissions,
+            "fever_rate": rate("fever"),
+            "urgent_rate": rate("urgent"),
+            "counts": {dim: dict(sorted(c.items(), key=lambda kv: -kv[1])) for dim, c in self.counts.items()},
+            "vitals": {
+                name: {"n": s.n, **{f"p{int(q * 100)}": s.quantile(q) for q in QUANTILES}}
+                for name, s in self.sketches.items() if s.n
+            },
+        }
+
+    def state(self) -> dict:
+        return {"submissions": self.submissions, "counts": self.counts,
+                "sketches": {name: s.state() for name, s in self.sketches.items()}}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "Aggregate":
+        agg = cls()
+        agg.submissions = state["submissions"]
+        agg.counts = state["counts"]
+        for name, sketch in state["sketches"].items():
+            agg.sketches[name] = KLLSketch.from_state(sketch)
+        return agg
+
+class PopulationAnalytics:
+    """Thread-safe store of aggregates keyed by (ISO day, site)."""
+
+    def __init__(self, k: int = DEFAULT_K, max_days: int = DEFAULT_DAYS, path: Optional[str] = None,
+                 today: Callable[[], date] = date.today):
+        self.k = k
+        self.max_days = max_days
+        self.path = path
+        self._today = today
+        self._data: Dict[tuple, Aggregate] = {}
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+
+    def record(self, visit, result: dict, site: str = DEFAULT_SITE, day: Optional[date] = None) -> None:
+        """Add one assessed submission (a ``VisitRecord`` and its ``assess_visit`` result)."""
+        key = ((day or self._today()).isoformat(), site or DEFAULT_SITE)
+        with self._lock:
+            agg = self._data.get(key)
+            if agg is None:
+                agg = self._data[key] = Aggregate(self.k)
+                self._expire()
+            agg.add(visit, result)
+            due = self.path and time.monotonic() - self._saved_at >= SAVE_EVERY
+        if due:
+            self.save()
+
+    def since(self, n_days: int) -> str:
+        """ISO date of the first of the last ``n_days`` calendar days (today included)."""
+        return (self._today() - timedelta(days=n_days - 1)).isoformat()
+
+    def _expire(self) -> None:
+        if not self.max_days:
+            return
+        cutoff = self.since(self.max_days)
+        for key in [k for k in self._data if k[0] < cutoff]:
+            del self._data[key]
+
+    def days(self, last: Optional[int] = None) -> List[str]:
+        """Days with data, oldest first; only those within the last ``last`` calendar days if given."""
+        cutoff = self.since(last) if last else ""
+        with self._lock:
+            return sorted({d for d, _ in self._data if d >= cutoff})
+
+    def sites(self) -> List[str]:
+        with self._lock:
+            return sorted({s for _, s in self._data})
+
+    def summary(self, days: Optional[Iterable[str]] = None, sites: Optional[Iterable[str]] = None) -> dict:
+        """Merged summary over the given days and sites (default: all)."""
+        days = set(days) if days is not None else None
+        sites = set(sites) if sites is not None else None
+        total = Aggregate(self.k)
+        with self._lock:
+            for (d, s), agg in self._data.items():
+                if (days is None or d in days) and (sites is None or s in sites):
+                    total.merge(agg)
+        return total.summary()
+
+    def breakdown(self, by: str = "day", days: Optional[Iterable[str]] = None,
+                  sites: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+        """One summary per day (``by="day"``) or per site (``by="site"``)."""
+        with self._lock:
+            keys = sorted({d if by == "day" else s for d, s in self._data})
+        days = list(days) if days is not None else None
+        sites = list(sites) if sites is not None else None
+        if by == "day":
+            return {d: self.summary([d], sites) for d in keys if days is None or d in days}
+        return {s: self.summary(days, [s]) for s in keys if sites is None or s in sites}
+
+    def state(self) -> dict:
+        with self._lock:
+            return {"version": 1, "k": self.k,
+                    "aggregates": [{"day": d, "site": s, **agg.state()} for (d, s), agg in sorted(self._data.items())]}
+
+    def load(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        if not path or not Path(path).exists():
+            return
+        state = json.loads(Path(path).read_text(encoding="utf-8"))
+        with self._lock:
+            for entry in state["aggregates"]:
+                key = (entry["day"], entry["site"])
+                agg = Aggregate.from_state(entry)
+                if key in self._data:
+                    self._data[key].merge(agg)
+                else:
+                    self._data[key] = agg
+            self._expire()
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write a JSON snapshot atomically (temporary file, then rename)."""
+        path = path or self.path
+        if not path:
+            return
+        data = json.dumps(self.state(), separators=(",", ":"))
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._saved_at = time.monotonic()
+
+ANALYTICS = PopulationAnalytics(path=os.environ.get("CLINIC_ANALYTICS_FILE") or None)
+_loaded = False
+_load_lock = threading.Lock()
+
+def configure_from_env() -> None:
+    """Load the ``CLINIC_ANALYTICS_FILE`` snapshot once per process."""
+    global _loaded
+    with _load_lock:
+        if not _loaded:
+            _loaded = True
+            ANALYTICS.load()
+
+def allowed_sites() -> Tuple[str, ...]:
+    """``CLINIC_SITE`` (the default site) followed by the comma-separated ``CLINIC_SITES``."""
+    default = os.environ.get("CLINIC_SITE", "").strip()[:40] or DEFAULT_SITE
+    extra = (s.strip()[:40] for s in os.environ.get("CLINIC_SITES", "").split(","))
+    return tuple(dict.fromkeys([default, *filter(None, extra)]))
+
+def site_from(value: Optional[str]) -> str:
+    """Site label for a ``?site=`` value: one of ``allowed_sites()`` (matched ignoring
+    case), else the default site, so a URL cannot add sites to the aggregates."""
+    sites = allowed_sites()
+    wanted = (value or "").strip().casefold()
+    return next((s for s in sites if s.casefold() == wanted), sites[0])
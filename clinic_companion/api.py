@@ -0,0 +1,361 @@
+"""Async JSON HTTP API for kiosks, SMS gateways and partner systems.
+
+A small HTTP/1.1 server on ``asyncio`` streams (no framework needed):
+
+- ``POST /v1/assess``        one intake record -> labels, hydration, red flags, doctor checks, questions, summary
+- ``POST /v1/assess/batch``  ``{"records": [...]}`` -> ``{"results": [...]}`` in the same order
+- ``POST /v1/sync``          gzip NDJSON of queued visits from an outbox (``--sync-db``); each
+                             idempotency key is stored once -> ``{"accepted", "duplicates", "rejected"}``
+- ``GET  /healthz``          liveness plus cache and concurrency counters and the rule set version
+
+Connections are kept alive between requests. At most ``max_inflight`` requests
+are assessed at once; up to ``max_queue`` more wait their turn and anything
+beyond that is turned away with ``503`` and ``Retry-After`` so clients back off
+instead of piling up.
+
+Run it with ``python -m clinic_companion serve --port 8080``.
+"""
+import asyncio
+import json
+import logging
+import sys
+import zlib
+from typing import List, Optional, Tuple
+
+from . import config
+from .cache import RESULT_CACHE, cached_assess_visit
+from .engine import INTAKE_CHOICES, INTAKE_DEFAULTS, INTAKE_LIMITS, normalize_intake
+
+try:  # optional, noticeably faster on large batches
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+logger = logging.getLogger("clinic_companion.api")
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_BATCH = 1000
+MAX_KEY_LENGTH = 64
+IDLE_TIMEOUT = 30.0
+INLINE_BATCH = 50  # larger batches are assessed on a worker thread to keep the loop responsive
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+           431: "Request Header Fields Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _loads(body: bytes):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, details=None, headers=None):
+        super().__init__(message)
+        self.status, self.message, self.details = status, message, details
+        self.headers = headers or {}
+
+# ---------------------------
+# Validation
+# ---------------------------
+def _type_error(name: str, value) -> Optional[str]:
+    """Why ``value`` cannot fill intake field ``name`` (None when it can; null means left blank)."""
+    default = INTAKE_DEFAULTS[name]
+    if value is None:
+        return None
+    if isinstance(default, bool):
+        return None if isinstance(value, bool) else f"{name} must be true or false"
+    if isinstance(default, str):
+        return None if isinstance(value, str) else f"{name} must be a string"
+    if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+        return None
+    return f"{name} must be a number"
+
+def validate_record(obj) -> Tuple[Optional[dict], List[str]]:
+    """Check an intake record like the form would; returns (record, errors)."""
+    if not isinstance(obj, dict):
+        return None, ["record must be a JSON object"]
+    errors = [f"unknown field {name!r}" for name in obj if name not in INTAKE_DEFAULTS and name != "id"]
+    type_errors = [e for e in (_type_error(name, value) for name, value in obj.items() if name in INTAKE_DEFAULTS) if e]
+    if type_errors:
+        return None, errors + type_errors
+    try:
+        intake = normalize_intake(obj)
+    except ValueError as exc:
+        return None, errors + [str(exc)]
+    for name, choices in INTAKE_CHOICES.items():
+        if name in obj and intake[name] not in choices:
+            errors.append(f"{name} must be one of {list(choices)}")
+    for name, limit in INTAKE_LIMITS.items():
+        if not 0 <= intake[name] <= limit:
+            errors.append(f"{name} must be between 0 and {limit}")
+    return (obj if not errors else None), errors
+
+def _assess(record: dict) -> dict:
+    result = cached_assess_visit(record)
+    if "id" in record:
+        result = {"id": record["id"], **result}
+    return result
+
+def _gunzip(body: bytes) -> bytes:
+    """Decode a gzip request body, refusing anything that inflates past ``MAX_BODY_BYTES``."""
+    decompressor = zlib.decompressobj(31)
+    try:
+        data = decompressor.decompress(body, MAX_BODY_BYTES)
+    except zlib.error:
+        raise HTTPError(400, "body is not valid gzip") from None
+    if decompressor.unconsumed_tail:
+        raise HTTPError(413, f"decompressed body larger than {MAX_BODY_BYTES} bytes")
+    return data
+
+def _sync_entries(body: bytes) -> Tuple[list, list]:
+    """Outbox NDJSON -> (valid entries, rejected ``{"key"|"line", "errors"}``)."""
+    entries, rejected = [], []
+    for number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            entry = _loads(line)
+        except ValueError:
+            rejected.append({"line": number, "errors": ["not valid JSON"]})
+            continue
+        key = entry.get("key") if isinstance(entry, dict) else None
+        if not isinstance(key, str) or not 0 < len(key) <= MAX_KEY_LENGTH:
+            rejected.append({"line": number, "errors": [f"key must be a string of 1-{MAX_KEY_LENGTH} characters"]})
+            continue
+        record, errors = validate_record(entry.get("record"))
+        if errors:
+            rejected.append({"key": key, "errors": errors})
+        else:
+            entries.append({**entry, "record": record})
+    return entries, rejected
+
+def _assess_batch(records: list) -> list:
+    results = []
+    for i, obj in enumerate(records):
+        record, errors = validate_record(obj)
+        if errors:
+            results.append({"index": i, "errors": errors})
+        else:
+            results.append({"index": i, **_assess(record)})
+    return results
+
+# ---------------------------
+# Server
+# ---------------------------
+class AssessmentServer:
+    def __init__(self, max_inflight: int = 64, max_queue: int = 1024, max_batch: int = MAX_BATCH,
+                 idle_timeout: float = IDLE_TIMEOUT, sync_store=None):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.idle_timeout = idle_timeout
+        self.sync_store = sync_store  # outbox.SyncStore behind /v1/sync, or None
+        self._slots = asyncio.Semaphore(max_inflight)
+        self.waiting = 0
+        self.inflight = 0
+        self.served = 0
+        self.rejected = 0
+
+    # ----- request handling -----
+    async def dispatch(self, method: str, path: str, body: bytes):
+        path = path.split("?", 1)[0]
+        if path == "/healthz":
+            if method != "GET":
+                raise HTTPError(405, "use GET")
+            return 200, {
+                "status": "ok",
+                "inflight": self.inflight,
+                "waiting": self.waiting,
+                "served": self.served,
+                "rejected": self.rejected,
+                "cache": RESULT_CACHE.stats(),
+                "rules_version": config.active().version,
+            }
+        if path not in ("/v1/assess", "/v1/assess/batch") and (path != "/v1/sync" or self.sync_store is None):
+            raise HTTPError(404, f"no route for {path}")
+        if method != "POST":
+            raise HTTPError(405, "use POST")
+        if path == "/v1/sync":
+            async with self._admit():
+                entries, rejected = _sync_entries(body)
+                if len(entries) + len(rejected) > self.max_batch:
+                    raise HTTPError(413, f"at most {self.max_batch} records per sync request")
+                counts = await asyncio.get_running_loop().run_in_executor(None, self.sync_store.ingest, entries)
+                return 200, {**counts, "rejected": rejected}
+        try:
+            payload = _loads(body)
+        except ValueError:
+            raise HTTPError(400, "body is not valid JSON") from None
+
+        async with self._admit():
+            if path == "/v1/assess":
+                record, errors = validate_record(payload)
+                if errors:
+                    raise HTTPError(422, "invalid intake record", errors)
+                return 200, await asyncio.get_running_loop().run_in_executor(None, _assess, record)
+
+            records = payload.get("records") if isinstance(payload, dict) else None
+            if not isinstance(records, list):
+                raise HTTPError(422, 'batch body must look like {"records": [...]}')
+            if len(records) > self.max_batch:
+                raise HTTPError(413, f"at most {self.max_batch} records per batch")
+            if len(records) <= INLINE_BATCH:
+                results = _assess_batch(records)
+            else:
+                results = await asyncio.get_running_loop().run_in_executor(None, _assess_batch, records)
+            return 200, {"results": results}
+
+    def _admit(self):
+        server = self
+
+        class _Admission:
+            async def __aenter__(self):
+                if server._slots.locked() and server.waiting >= server.max_queue:
+                    server.rejected += 1
+                    raise HTTPError(503, "server busy, retry shortly", headers={"Retry-After": "1"})
+                server.waiting += 1
+                try:
+                    await server._slots.acquire()
+                finally:
+                    server.waiting -= 1
+                server.inflight += 1
+
+            async def __aexit__(self, *exc):
+                server.inflight -= 1
+                server._slots.release()
+
+        return _Admission()
+
+    # ----- HTTP/1.1 plumbing -----
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {"error": "request headers too large"}, keep_alive=False)
+                    return
+                keep_alive = await self._handle_one(head, reader, writer)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _handle_one(self, head: bytes, reader, writer) -> bool:
+        try:
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, path, version = request_line.split(" ", 2)
+        except ValueError:
+            await self._respond(writer, 400, {"error": "malformed request line"}, keep_alive=False)
+            return False
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+        try:
+            if "chunked" in headers.get("transfer-encoding", "").lower():
+                keep_alive = False  # the chunked body is still on the wire
+                raise HTTPError(411, "chunked bodies are not supported; send Content-Length")
+            try:
+                length = int(headers.get("content-length", "0") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                keep_alive = False  # the body's extent is unknown
+                raise HTTPError(400, "Content-Length must be a non-negative integer")
+            if length > MAX_BODY_BYTES:
+                raise HTTPError(413, f"body larger than {MAX_BODY_BYTES} bytes")
+            body = await reader.readexactly(length) if length else b""
+            if headers.get("content-encoding", "").lower() == "gzip":
+                body = _gunzip(body)
+            status, payload = await self.dispatch(method.upper(), path, body)
+            extra = {}
+        except HTTPError as exc:
+            status, extra = exc.status, exc.headers
+            payload = {"error": exc.message}
+            if exc.details:
+                payload["details"] = exc.details
+            if exc.status == 413:
+                keep_alive = False  # the unread body is still on the wire
+        except asyncio.IncompleteReadError:
+            return False
+        except Exception:
+            logger.exception("unhandled error for %s %s", method, path)
+            status, payload, extra = 500, {"error": "internal error"}, {}
+        self.served += 1
+        await self._respond(writer, status, payload, keep_alive, extra)
+        return keep_alive
+
+    async def _respond(self, writer, status: int, payload, keep_alive: bool, extra_headers=None):
+        body = _dumps(payload)
+        lines = [
+            f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if keep_alive:
+            lines.append(f"Keep-Alive: timeout={int(self.idle_timeout)}")
+        for name, value in (extra_headers or {}).items():
+            lines.append(f"{name}: {value}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080, ready: Optional[asyncio.Event] = None):
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES,
+                                            backlog=1024)
+        self.sockets = server.sockets
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+
+# ---------------------------
+# CLI entry point
+# ---------------------------
+def run(args) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    sync_store = None
+    if args.sync_db:
+        from .outbox import SyncStore
+
+        sync_store = SyncStore(args.sync_db)
+    config.watch()  # hot-reloads CLINIC_RULES_DIR
+    server = AssessmentServer(max_inflight=args.max_inflight, max_queue=args.max_queue, max_batch=args.max_batch,
+                              sync_store=sync_store)
+    print(f"Serving assessment API on http://{args.host}:{args.port} "
+          f"(max {args.max_inflight} in flight, {args.max_queue} queued"
+          f"{', /v1/sync into ' + args.sync_db if args.sync_db else ''})", file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def add_parser(subparsers):
+    p = subparsers.add_parser("serve", help="Run the JSON HTTP API",
+                              description="Serve /v1/assess and /v1/assess/batch (and /v1/sync with --sync-db) over HTTP.")
+    p.add_argument("--host", default="127.0.0.1", help="bind address (default: 127.0.0.1)")
+    p.add_argument("--port", type=int, default=8080, help="port (default: 8080)")
+    p.add_argument("--max-inflight", type=int, default=64, help="requests assessed concurrently")
+    p.add_argument("--max-queue", type=int, default=1024, help="requests allowed to wait before 503s")
+    p.add_argument("--max-batch", type=int, default=MAX_BATCH, help="records allowed per batch request")
+    p.add_argument("--sync-db", help="SQLite file that stores visits synced from outboxes (enables /v1/sync)")
+    p.set_defaults(func=run)
+    return p
@@ -0,0 +1,353 @@
+"""Buffered audit log of the red flags and classifications shown for each submission.
+
+For clinical governance every submitted visit leaves one JSON line: when it was
+submitted, the site and language, a pseudonymous visit id (``cache.intake_key``
+of the intake; no name, symptoms or values are stored), the classifications on
+the results page and the red flags that fired.
+
+Writing it never slows a submit:
+
+- ``AuditLog.record`` only appends to an in-memory buffer. A background writer
+  formats the buffered visits and appends them to ``audit.log`` every
+  ``flush_interval`` seconds, or as soon as ``batch`` visits are waiting, with
+  one write and one fsync per batch
+- loss on a crash is bounded by the buffer: at most ``flush_interval`` seconds
+  of submissions, and never more than ``max_pending`` visits (past that, new
+  records are dropped and counted instead of holding up the app). A normal
+  exit flushes the buffer; a torn last line is cut off when the log is reopened
+- once ``audit.log`` reaches ``max_bytes`` it is renamed to
+  ``audit-<seq>-<first>-<last>.log`` (times of its first and last record) and
+  gzip-compressed by the writer; the plain file is removed once the compressed
+  copy is on disk. Only the newest ``keep`` compressed files are kept (0 = all)
+- ``read`` streams records oldest first, one line at a time. Files wholly
+  outside a ``since``/``until`` window are skipped by name, and the time, site
+  and flag filters test the raw line before it is parsed
+
+    CLINIC_AUDIT_DIR=audit streamlit run app.py
+    python -m clinic_companion audit --dir audit --since 2026-10-01 --flag "Very high fever"
+"""
+import atexit
+from collections import deque
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
+
+MAX_BYTES = int(float(os.environ.get("CLINIC_AUDIT_MAX_MB", "8")) * (1 << 20))  # rotate the current file at this size
+KEEP = int(os.environ.get("CLINIC_AUDIT_KEEP", "0"))  # compressed files kept; 0 keeps all
+FLUSH_INTERVAL = float(os.environ.get("CLINIC_AUDIT_FLUSH", "1"))  # seconds
+BATCH = 256  # a flush starts early once this many visits are waiting
+MAX_PENDING = 10000  # buffered visits; past this new records are dropped (and counted)
+
+CURRENT = "audit.log"
+_ROTATED = re.compile(r"^audit-(\d{8})-(\d{8}T\d{6})-(\d{8}T\d{6})\.log(\.gz)?$")
+
+logger = logging.getLogger("clinic_companion.audit")
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _stamp(iso: str) -> str:
+    """``2026-10-17T09:30:00Z`` -> ``20261017T093000`` (file names)."""
+    return iso.replace("-", "").replace(":", "")[:15]
+
+def parse_time(value: str, end_of_day: bool = False) -> str:
+    """A date or ISO time (naive means UTC) in the log's own ``ts`` format, so times compare as strings.
+
+    With ``end_of_day`` a bare date means its last second (for inclusive upper bounds).
+    """
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return _iso(moment.timestamp() + (86399 if end_of_day and len(value) == 10 else 0))
+
+def audit_entry(submitted_at: float, site: str, lang: str, record, result: dict) -> dict:
+    """The audit line for one submission; ``ts`` comes first so readers can filter on it unparsed."""
+    from .cache import intake_key
+
+    labels = dict(result["labels"])
+    if result.get("hydration"):
+        labels["hydration"] = result["hydration"]["level"]
+    return {
+        "ts": _iso(submitted_at),
+        "site": site,
+        "lang": lang,
+        "visit": intake_key(record),
+        "labels": labels,
+        "red_flags": list(result["red_flags"]),
+    }
+
+def _gzip_file(path: str, fsync: bool) -> str:
+    """Compress ``path`` to ``path.gz`` (written to a temporary name, then renamed) and remove it."""
+    import gzip
+    import shutil
+
+    target = path + ".gz"
+    with open(path, "rb") as src, open(target + ".tmp", "wb") as raw:
+        with gzip.GzipFile(os.path.basename(path), "wb", 6, raw, mtime=0) as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        raw.flush()
+        if fsync:
+            os.fsync(raw.fileno())
+    os.replace(target + ".tmp", target)
+    os.remove(path)
+    return target
+
+class AuditLog:
+    """Append-only, size-rotated audit log behind an in-memory buffer and a writer thread."""
+
+    def __init__(self, directory: str, max_bytes: int = MAX_BYTES, keep: int = KEEP,
+                 flush_interval: float = FLUSH_INTERVAL, batch: int = BATCH,
+                 max_pending: int = MAX_PENDING, fsync: bool = True):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.flush_interval = flush_interval
+        self.batch = batch
+        self.max_pending = max_pending
+        self.fsync = fsync
+        self._buffer = deque()
+        self._lock = threading.Lock()  # guards the buffer and counters
+        self._write_lock = threading.Lock()  # one flush at a time (writer thread, atexit, callers)
+        self._wake = threading.Event()
+        self._thread = None
+        self.recorded = self.written = self.dropped = self.errors = self.flushes = self.rotations = 0
+        self._recover()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _recover(self) -> None:
+        """Finish an interrupted rotation, cut a torn last line, and pick up the current file's state."""
+        self._seq = 0
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".gz.tmp"):
+                os.remove(self._path(name))
+                continue
+            match = _ROTATED.match(name)
+            if match is None:
+                continue
+            self._seq = max(self._seq, int(match.group(1)))
+            if not match.group(4):  # renamed but not yet compressed
+                if os.path.exists(self._path(name + ".gz")):
+                    os.remove(self._path(name))
+                else:
+                    _gzip_file(self._path(name), self.fsync)
+        path = self._path(CURRENT)
+        self._first = self._last = None
+        if os.path.exists(path):
+            with open(path, "rb+") as f:
+                data = f.read()
+                end = data.rfind(b"\n") + 1
+                if end < len(data):
+                    f.truncate(end)
+                    logger.warning("cut a torn last line from %s", path)
+                lines = data[:end].splitlines()
+            if lines:
+                self._first = json.loads(lines[0])["ts"]
+                self._last = json.loads(lines[-1])["ts"]
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+
+    # ---------------------------
+    # Writing
+    # ---------------------------
+    def record(self, record, result: dict, site: str = "", lang: str = "", submitted_at: Optional[float] = None) -> bool:
+        """Buffer one submission (formatted later by the writer); False if the buffer is full and it was dropped."""
+        with self._lock:
+            if len(self._buffer) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._buffer.append((submitted_at or time.time(), site, lang, record, result))
+            self.recorded += 1
+            waiting = len(self._buffer)
+        if waiting >= self.batch:
+            self._wake.set()
+        return True
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of records written."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._buffer = self._buffer, deque()
+            if not pending:
+                return 0
+            entries = [audit_entry(*item) for item in pending]
+            data = "".join(json.dumps(e, ensure_ascii=False, separators=(",", ":")) + "\n" for e in entries).encode("utf-8")
+            try:
+                self._file.write(data)
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            except OSError:
+                logger.exception("audit log write failed; %d records lost", len(entries))
+                with self._lock:
+                    self.errors += len(entries)
+                return 0
+            self._size += len(data)
+            self._first = self._first or entries[0]["ts"]
+            self._last = entries[-1]["ts"]
+            with self._lock:
+                self.written += len(entries)
+                self.flushes += 1
+            if self._size >= self.max_bytes:
+                self._rotate()
+            return len(entries)
+
+    def _rotate(self) -> None:
+        """Move the current file aside, start a new one, then compress the old one (caller holds the write lock)."""
+        self._file.close()
+        self._seq += 1
+        name = f"audit-{self._seq:08d}-{_stamp(self._first)}-{_stamp(self._last)}.log"
+        os.replace(self._path(CURRENT), self._path(name))
+        self._file = open(self._path(CURRENT), "ab")
+        self._size = 0
+        self._first = self._last = None
+        try:
+            _gzip_file(self._path(name), self.fsync)
+        except OSError:  # left as plain text; compressed when the log is next opened
+            logger.exception("could not compress %s", name)
+        self.rotations += 1
+        if self.keep:
+            for path in rotated_files(self.directory)[:-self.keep]:
+                os.remove(path)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="clinic-audit", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:  # a bad record must not stop auditing
+                logger.exception("audit flush failed")
+
+    def close(self) -> None:
+        self.flush()
+        with self._write_lock:
+            self._file.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"buffered": len(self._buffer), "recorded": self.recorded, "written": self.written,
+                    "dropped": self.dropped, "errors": self.errors, "flushes": self.flushes,
+                    "rotations": self.rotations, "current_bytes": self._size}
+
+    def prometheus_lines(self):
+        stats = self.stats()
+        for name, kind in (("written", "counter"), ("dropped", "counter"), ("errors", "counter"),
+                           ("buffered", "gauge")):
+            metric = f"clinic_audit_{name}" + ("_total" if kind == "counter" else "")
+            yield f"# TYPE {metric} {kind}"
+            yield f"{metric} {stats[name]}"
+
+# ---------------------------
+# Reading
+# ---------------------------
+def rotated_files(directory: str) -> List[str]:
+    """Compressed (or not yet compressed) rotated files, oldest first."""
+    by_seq = {}
+    for name in os.listdir(directory):
+        match = _ROTATED.match(name)
+        if match and (match.group(4) or int(match.group(1)) not in by_seq):
+            by_seq[int(match.group(1))] = name
+    return [os.path.join(directory, by_seq[seq]) for seq in sorted(by_seq)]
+
+def _span(path: str) -> Tuple[str, str]:
+    match = _ROTATED.match(os.path.basename(path))
+    return match.group(2), match.group(3)
+
+def read(directory: str, since: Optional[str] = None, until: Optional[str] = None,
+         site: Optional[str] = None, flag: Optional[str] = None) -> Iterator[dict]:
+    """Audit records oldest first, optionally filtered.
+
+    ``since``/``until`` are inclusive and in ``parse_time`` form; ``flag`` matches
+    any part of a red flag's (English) text.
+    """
+    import gzip
+
+    files = [p for p in rotated_files(directory)
+             if not (since and _span(p)[1] < _stamp(since)) and not (until and _span(p)[0] > _stamp(until))]
+    current = os.path.join(directory, CURRENT)
+    if os.path.exists(current):
+        files.append(current)
+    site_needle = ('"site":' + json.dumps(site, ensure_ascii=False)).encode("utf-8") if site is not None else None
+    flag_needle = json.dumps(flag, ensure_ascii=False)[1:-1].encode("utf-8") if flag is not None else None
+    for path in files:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):  # being written right now
+                    break
+                ts = line[7:27].decode("ascii")  # {"ts":"2026-10-17T09:30:00Z",...
+                if (since and ts < since) or (until and ts > until):
+                    continue
+                if site_needle is not None and site_needle not in line:
+                    continue
+                if flag_needle is not None and flag_needle not in line:
+                    continue
+                entry = json.loads(line)
+                if flag is not None and not any(flag in fired for fired in entry["red_flags"]):
+                    continue
+                yield entry
+
+# ---------------------------
+# App integration
+# ---------------------------
+_log = None
+_log_lock = threading.Lock()
+
+def log_from_env() -> Optional[AuditLog]:
+    """The process-wide audit log in ``CLINIC_AUDIT_DIR`` (writer thread started), or None."""
+    global _log
+    directory = os.environ.get("CLINIC_AUDIT_DIR")
+    if not directory:
+        return None
+    with _log_lock:
+        if _log is None or _log.directory != directory:
+            _log = AuditLog(directory)
+            _log.start()
+        return _log
+
+def record_visit(record, result: dict, site: str = "", lang: str = "") -> bool:
+    """Audit one submission when the log is enabled; returns at once, the write happens in the background."""
+    log = log_from_env()
+    return log.record(record, result, site, lang) if log is not None else False
+
+# ---------------------------
+# CLI entry point
+# ---------------------------
+def run(args) -> int:
+    since = parse_time(args.since) if args.since else None
+    until = parse_time(args.until, end_of_day=True) if args.until else None
+    count = 0
+    for entry in read(args.dir, since, until, site=args.site, flag=args.flag):
+        count += 1
+        if not args.count:
+            sys.stdout.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+    if args.count:
+        print(count)
+    return 0
+
+def add_parser(subparsers):
+    p = subparsers.add_parser("audit", help="Read the audit log of red flags and classifications",
+                              description="Streams audit records (JSON lines, oldest first), compressed files included.")
+    p.add_argument("--dir", default=os.environ.get("CLINIC_AUDIT_DIR", "audit"), help="audit log directory")
+    p.add_argument("--since", help="first time to include (ISO date or time, UTC unless given)")
+    p.add_argument("--until", help="last time to include (a date alone includes the whole day)")
+    p.add_argument("--site", help="only this site")
+    p.add_argument("--flag", help='only visits with a red flag containing this text, e.g. "Very high fever"')
+    p.add_argument("--count", action="store_true", help="print only the number of matching records")
+    p.set_defaults(func=run)
+    return p
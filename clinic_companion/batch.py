@@ -0,0 +1,161 @@
+"""Offline batch assessment: JSONL/CSV intake in, one JSON result per line out.
+
+Records are streamed through a chain of generators, cut into fixed-size chunks
+and fanned out to a process pool. Only a bounded number of chunks are in flight
+at any time and results are written back in input order, so memory use stays
+flat no matter how large the intake file is.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import csv
+from itertools import islice
+import json
+import os
+import sys
+import time
+from typing import Iterable, Iterator, List
+
+from .engine import assess_visit
+
+DEFAULT_CHUNK_SIZE = 256
+
+# ---------------------------
+# Readers
+# ---------------------------
+def read_jsonl(lines: Iterable[str]) -> Iterator[dict]:
+    for lineno, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield {"_error": f"line {lineno}: invalid JSON ({exc.msg})"}
+            continue
+        if isinstance(record, dict):
+            yield record
+        else:
+            yield {"_error": f"line {lineno}: expected a JSON object, got {type(record).__name__}"}
+
+def read_csv(lines: Iterable[str]) -> Iterator[dict]:
+    yield from csv.DictReader(lines)
+
+def read_records(stream, fmt: str = "auto") -> Iterator[dict]:
+    """Yield intake records from a text stream; ``fmt`` is ``jsonl``, ``csv`` or ``auto``."""
+    lines = iter(stream)
+    if fmt == "auto":
+        first = next(lines, "")
+        while first and not first.strip():
+            first = next(lines, "")
+        fmt = "jsonl" if first.lstrip().startswith("{") else "csv"
+        lines = _prepend(first, lines)
+    if fmt == "jsonl":
+        return read_jsonl(lines)
+    if fmt == "csv":
+        return read_csv(lines)
+    raise ValueError(f"Unknown input format {fmt!r} (expected jsonl, csv or auto)")
+
+def _prepend(first: str, rest: Iterator[str]) -> Iterator[str]:
+    if first:
+        yield first
+    yield from rest
+
+# ---------------------------
+# Assessment
+# ---------------------------
+def assess_record(index: int, record: dict) -> dict:
+    """One output line: the record's position, its id (if given) and the assessment or error."""
+    out = {"index": index}
+    if not isinstance(record, dict):
+        out["error"] = f"expected a JSON object, got {type(record).__name__}"
+        return out
+    if "id" in record:
+        out["id"] = record["id"]
+    if "_error" in record:
+        out["error"] = record["_error"]
+        return out
+    try:
+        out.update(assess_visit(record))
+    except ValueError as exc:
+        out["error"] = str(exc)
+    return out
+
+def assess_chunk(chunk: List[tuple]) -> List[dict]:
+    return [assess_record(index, record) for index, record in chunk]
+
+def chunked(records: Iterable[dict], size: int) -> Iterator[List[tuple]]:
+    numbered = enumerate(records)
+    while True:
+        chunk = list(islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+def assess_stream(records: Iterable[dict], workers: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict]:
+    """Assess records in input order. ``workers`` <= 1 runs in-process; otherwise a process pool."""
+    chunks = chunked(records, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from assess_chunk(chunk)
+        return
+
+    max_in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(assess_chunk, chunk))
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+# ---------------------------
+# CLI entry point
+# ---------------------------
+def run(args) -> int:
+    workers = args.workers if args.workers is not None else (os.cpu_count() or 1)
+    source = open(args.input, encoding="utf-8", newline="") if args.input != "-" else sys.stdin
+    sink = open(args.output, "w", encoding="utf-8") if args.output != "-" else sys.stdout
+    count = errors = flagged = 0
+    started = time.perf_counter()
+    try:
+        for result in assess_stream(read_records(source, args.format), workers, args.chunk_size):
+            if not args.full:
+                result.pop("questions", None)
+                result.pop("doctor_checks", None)
+            sink.write(json.dumps(result, ensure_ascii=False))
+            sink.write("\n")
+            count += 1
+            errors += "error" in result
+            flagged += bool(result.get("red_flags"))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    elapsed = time.perf_counter() - started
+    if not args.quiet:
+        rate = count / elapsed if elapsed > 0 else 0.0
+        print(
+            f"Processed {count} records in {elapsed:.2f}s ({rate:,.0f} records/s, {max(workers, 1)} worker(s)); "
+            f"{flagged} with red flags, {errors} errors",
+            file=sys.stderr,
+        )
+    return 1 if errors and args.strict else 0
+
+def add_parser(subparsers):
+    p = subparsers.add_parser(
+        "batch",
+        help="Assess a JSONL/CSV intake file and write one JSON result per line",
+        description="Reads intake records (form field names as keys) and writes summaries and red flags as JSONL.",
+    )
+    p.add_argument("input", nargs="?", default="-", help="intake file (default: stdin)")
+    p.add_argument("-o", "--output", default="-", help="output JSONL file (default: stdout)")
+    p.add_argument("--format", choices=("auto", "jsonl", "csv"), default="auto", help="input format (default: auto)")
+    p.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count; 1 = in-process)")
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="records per work unit")
+    p.add_argument("--full", action="store_true", help="also include the suggested questions and doctor checks in each result")
+    p.add_argument("--strict", action="store_true", help="exit with status 1 if any record failed")
+    p.add_argument("-q", "--quiet", action="store_true", help="do not print the throughput report")
+    p.set_defaults(func=run)
+    return p
@@ -0,0 +1,113 @@
+"""Memoized visit assessments.
+
+Results are keyed on a hash of the *normalized* intake (types coerced, text
+trimmed, blanks filled in), so two submissions that only differ in how the form
+delivered the values share one entry, and on the version of the rule set that
+produced them (see ``config.py``). The cache is process-wide, bounded (LRU
+eviction) and entries expire after a TTL. It is safe to use from the threads
+Streamlit runs sessions on.
+"""
+from collections import OrderedDict
+from datetime import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from .config import pinned
+from .engine import VisitRecord, assess_visit, normalize_intake, restamp_summary
+
+DEFAULT_MAXSIZE = int(os.environ.get("CLINIC_CACHE_SIZE", "2048"))
+DEFAULT_TTL = float(os.environ.get("CLINIC_CACHE_TTL", "900"))  # seconds; 0 disables expiry
+
+def intake_key(record) -> str:
+    """Canonical hash of a normalized intake record."""
+    intake = normalize_intake(record)
+    payload = json.dumps(intake, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL and hit/miss/eviction counters."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL, clock: Callable[[], float] = time.monotonic):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            stored_at, value = entry
+            if self.ttl and self._clock() - stored_at > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (self._clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute: Callable[[], object]):
+        sentinel = _MISSING
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            # Computed outside the lock; two sessions racing on one key just both compute it.
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+_MISSING = object()
+
+RESULT_CACHE = ResultCache()
+
+def cached_assess_visit(record, cache: Optional[ResultCache] = None, now: Optional[datetime] = None) -> dict:
+    """``assess_visit`` through the result cache (``record`` may be a dict or ``VisitRecord``).
+
+    The cached summary keeps the time of the first computation, so it is re-stamped
+    with ``now`` (default: the current time) on the way out. Nested lists and dicts
+    are shared between callers, so treat the result as read-only.
+    """
+    cache = RESULT_CACHE if cache is None else cache
+    visit = VisitRecord.of(record)
+    with pinned() as config:  # keyed on the rule set too, so a reload never serves older results
+        result = cache.get_or_compute((config.version, intake_key(visit)), lambda: assess_visit(visit))
+    return {**result, "summary": restamp_summary(result["summary"], now)}
@@ -0,0 +1,137 @@
+"""Array-backed storage for many visits (reporting, cohort assessment).
+
+Holding tens of thousands of visits as dicts or objects costs a few hundred
+bytes of per-row overhead before any data. ``VisitColumns`` keeps one column
+per intake field instead:
+
+- vitals and measurements in ``array.array`` (4-byte ints / 8-byte floats)
+- yes/no flags in a ``bytearray`` (one byte each)
+- low-cardinality text (sex, age, the select-box answers) as 2-byte codes into a
+  per-column table of distinct values
+- free text (name, symptoms, concerns, medicines) as a plain list of strings
+
+Rows go in already normalized (through ``VisitRecord``), ``columns()`` feeds
+``assess_many`` directly and ``visits[i]`` gives a ``VisitRecord`` back.
+"""
+from array import array
+import sys
+from typing import Iterable, Iterator
+
+from .engine import INTAKE_CHOICES, INTAKE_DEFAULTS, VisitRecord, assess_many
+
+FREE_TEXT = ("patient_name", "symptoms", "main_concern", "meds", "supplements")
+
+def _kind(name: str) -> str:
+    default = INTAKE_DEFAULTS[name]
+    if isinstance(default, bool):
+        return "flag"
+    if isinstance(default, int):
+        return "i"
+    if isinstance(default, float):
+        return "d"
+    return "text" if name in FREE_TEXT else "code"
+
+KINDS = {name: _kind(name) for name in INTAKE_DEFAULTS}
+
+class VisitColumns:
+    """Append-only columnar store of normalized visits."""
+
+    def __init__(self, records: Iterable = ()):
+        self._data = {}
+        self._tables = {}  # coded column -> (values list, value -> code)
+        for name, kind in KINDS.items():
+            if kind == "flag":
+                self._data[name] = bytearray()
+            elif kind in ("i", "d"):
+                self._data[name] = array(kind)
+            elif kind == "code":
+                self._data[name] = array("H")
+                self._tables[name] = ([], {})
+            else:
+                self._data[name] = []
+        self._len = 0
+        self.extend(records)
+
+    def append(self, record) -> None:
+        visit = VisitRecord.of(record)
+        data = self._data
+        for name, kind in KINDS.items():
+            value = getattr(visit, name)
+            if kind == "code":
+                values, codes = self._tables[name]
+                code = codes.get(value)
+                if code is None:
+                    if len(values) >= 0xFFFF:
+                        raise ValueError(f"Too many distinct values in column {name!r}")
+                    code = codes[value] = len(values)
+                    values.append(value)
+                data[name].append(code)
+            else:
+                data[name].append(value)
+        self._len += 1
+
+    def extend(self, records: Iterable) -> None:
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _value(self, name: str, i: int):
+        kind = KINDS[name]
+        raw = self._data[name][i]
+        if kind == "flag":
+            return bool(raw)
+        if kind == "code":
+            return self._tables[name][0][raw]
+        return raw
+
+    def __getitem__(self, i: int) -> VisitRecord:
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("visit index out of range")
+        return VisitRecord({name: self._value(name, i) for name in KINDS})
+
+    def __iter__(self) -> Iterator[VisitRecord]:
+        for i in range(self._len):
+            yield self[i]
+
+    def column(self, name: str):
+        """One field for every visit as a NumPy array (numbers, bools or strings)."""
+        import numpy as np
+
+        kind = KINDS[name]
+        raw = self._data[name]
+        if kind == "flag":
+            return np.frombuffer(bytes(raw), dtype=np.uint8).astype(bool)
+        if kind in ("i", "d"):
+            # copied: a view would pin the array's buffer and block further appends
+            return np.array(raw, dtype=np.int64 if kind == "i" else np.float64)
+        if kind == "code":
+            table = np.asarray(self._tables[name][0] or [""], dtype=str)
+            return table[np.frombuffer(raw, dtype=np.uint16)] if self._len else np.array([], dtype=str)
+        return np.asarray(raw, dtype=str)
+
+    def columns(self) -> dict:
+        return {name: self.column(name) for name in KINDS}
+
+    def assess(self) -> dict:
+        """``assess_many`` over every stored visit."""
+        return assess_many(self.columns())
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (string contents counted once per distinct object)."""
+        total = 0
+        seen = set()
+        for name, kind in KINDS.items():
+            col = self._data[name]
+            total += sys.getsizeof(col)
+            if kind == "text":
+                for s in col:
+                    if id(s) not in seen:
+                        seen.add(id(s))
+                        total += sys.getsizeof(s)
+            elif kind == "code":
+                total += sum(sys.getsizeof(v) for v in self._tables[name][0])
+        return total
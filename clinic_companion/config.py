@@ -0,0 +1,319 @@
+"""Hot-reloadable rule set: reference ranges, red-flag triggers and doctor rules.
+
+The range tables (``ranges.py``), the trigger automaton behind ``red_flags``
+(``triggers.py``) and the doctor checks and questions (``rules.py``) are
+compiled together into one immutable ``Config``. A site changes them without a
+redeploy by editing files in ``CLINIC_RULES_DIR``:
+
+- ``*.rules``: extra doctor checks and questions (``kind | conditions | text``)
+- ``*.pack``: extra symptom phrasings, ``phrase => trigger`` per line, in the
+  format of the bundled ``packs/*.txt``
+- ``*.triggers``: new red-flag triggers, ``phrase | warning label`` per line
+- ``ranges.json``: ``{"pcv": [rows...], ...}``, replacing the rows of the
+  metrics it names (row format in ``ranges.py``)
+- ``VERSION``: optional one-line name for the set, e.g. ``antenatal-2026-10``
+
+A watcher thread polls the directory every ``CLINIC_RULES_POLL`` seconds
+(default 5). When a file changes, the new set is read, validated and compiled
+on that thread, then swapped in with a single reference assignment. A set that
+fails to load is logged and the running one stays. Readers never see a half
+built set:
+
+- ``current()`` is the active set. ``assess_visit`` and ``assess_many`` take it
+  once per call, so a result never mixes two sets
+- ``pin()`` keeps one set for the rest of the calling thread's work; the app
+  pins one per script run, so every part of a page uses the same set
+- the result cache is keyed on the set's version, so results of an older set
+  are never served after a swap
+
+Every summary ends with the version: ``Rule set: built-in``, or the ``VERSION``
+name (``local`` without one) followed by a checksum of the files, e.g.
+``Rule set: antenatal-2026-10 (1a2b3c4d)``.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+import zlib
+from typing import List, NamedTuple, Optional, Tuple
+
+from .i18n import N_
+from .ranges import BP_PRECEDENCE, RANGE_TABLES, RANGES, RangeTables
+from .rules import RULES, RuleSet, load_rules
+from .triggers import TriggerMatcher, build_matcher, bundled_packs, default_matcher, fold
+
+BUILTIN = N_("built-in")
+POLL_INTERVAL = float(os.environ.get("CLINIC_RULES_POLL", "5"))  # seconds between directory checks
+PATTERNS = ("*.rules", "*.pack", "*.triggers", "ranges.json", "VERSION")
+MAX_TRIGGERS = 200  # extra red-flag triggers across all *.triggers files
+MAX_LABEL = 200  # characters in a warning label
+
+class Config(NamedTuple):
+    version: str  # shown in every summary
+    ranges: RangeTables
+    rules: RuleSet
+    matcher: TriggerMatcher
+    source: Optional[str] = None  # directory it was loaded from; None for the built-in set
+
+# ---------------------------
+# Loading and validation
+# ---------------------------
+def source_files(directory) -> List[Path]:
+    """The files of a rule directory that make up a rule set, in load order."""
+    directory = Path(directory)
+    return sorted({path for pattern in PATTERNS for path in directory.glob(pattern) if path.is_file()})
+
+def signature(directory) -> Tuple[tuple, ...]:
+    """Cheap change detector: (name, mtime, size) of every source file."""
+    out = []
+    for path in source_files(directory):
+        try:
+            st = path.stat()
+        except OSError:  # removed between listing and stat
+            continue
+        out.append((path.name, st.st_mtime_ns, st.st_size))
+    return tuple(out)
+
+def load_triggers(path, known=None) -> List[Tuple[str, str]]:
+    """Read a ``*.triggers`` file (``phrase | warning label`` per line).
+
+    ``known`` maps the folded phrases already registered (built-in or earlier files)
+    to where they came from; a phrase registered twice is an error, and new phrases
+    are added to it.
+    """
+    known = {} if known is None else known
+    pairs = []
+    for lineno, raw in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        phrase, sep, label = (part.strip() for part in line.partition("|"))
+        where = f"{path}:{lineno}"
+        if not sep or not phrase or not label:
+            raise ValueError(f"{where}: expected 'phrase | warning label', got {raw!r}")
+        key = " ".join(fold(phrase).split())
+        if not any(ch.isalnum() for ch in key):
+            raise ValueError(f"{where}: phrase {phrase!r} has no letters or digits")
+        if key in known:
+            raise ValueError(f"{where}: phrase {phrase!r} is already a trigger ({known[key]})")
+        if len(label) > MAX_LABEL:
+            raise ValueError(f"{where}: warning label longer than {MAX_LABEL} characters")
+        known[key] = where
+        pairs.append((phrase, label))
+    return pairs
+
+def load_ranges(path) -> RangeTables:
+    """``RANGE_TABLES`` with the metrics in a ``ranges.json`` file replaced, compiled."""
+    import json  # only when a site overrides ranges
+
+    try:
+        overrides = json.loads(Path(path).read_text(encoding="utf-8"))
+    except ValueError as exc:
+        raise ValueError(f"{path}: not valid JSON: {exc}") from None
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{path}: expected an object mapping metric names to rows")
+    unknown = sorted(set(overrides) - set(RANGE_TABLES))
+    if unknown:
+        raise ValueError(f"{path}: unknown metric(s) {', '.join(unknown)} (expected one of: {', '.join(RANGE_TABLES)})")
+    tables = {**RANGE_TABLES, **overrides}
+    try:
+        compiled = RangeTables(tables)
+        for metric in ("bp_systolic", "bp_diastolic"):
+            labels = {label for row in tables[metric] for label, _bound in row["bands"]}
+            if not labels <= set(BP_PRECEDENCE):
+                extra = ", ".join(sorted(labels - set(BP_PRECEDENCE)))
+                raise ValueError(f"{metric}: labels must be among ranges.BP_PRECEDENCE, got {extra}")
+    except (KeyError, TypeError, AttributeError) as exc:
+        raise ValueError(f"{path}: malformed rows ({type(exc).__name__}: {exc})") from None
+    except ValueError as exc:
+        raise ValueError(f"{path}: {exc}") from None
+    return compiled
+
+def builtin() -> Config:
+    """The rule set that ships with the app (precompiled tables when available)."""
+    return Config(BUILTIN, RANGES, RuleSet(RULES), default_matcher())
+
+def load(directory) -> Config:
+    """Read, validate and compile the rule set in ``directory``; raises ValueError naming the bad file and line."""
+    from .engine import SYMPTOM_TRIGGERS
+
+    directory = Path(directory)
+    files = source_files(directory)
+    by_suffix = {suffix: [p for p in files if p.suffix == suffix] for suffix in (".rules", ".pack", ".triggers")}
+    ranges_file = directory / "ranges.json"
+    ranges = load_ranges(ranges_file) if ranges_file.is_file() else RANGES
+    rules = RuleSet(list(RULES) + [r for path in by_suffix[".rules"] for r in load_rules(path)])
+    matcher = default_matcher()
+    if by_suffix[".pack"] or by_suffix[".triggers"]:
+        known = {" ".join(fold(key).split()): "built-in" for key, _label in SYMPTOM_TRIGGERS}
+        extra = [t for path in by_suffix[".triggers"] for t in load_triggers(path, known)]
+        if len(extra) > MAX_TRIGGERS:
+            raise ValueError(f"{directory}: {len(extra)} extra red-flag triggers, at most {MAX_TRIGGERS} are allowed")
+        triggers = list(SYMPTOM_TRIGGERS) + extra
+        try:
+            matcher = build_matcher(triggers, bundled_packs() + by_suffix[".pack"])
+        except ValueError as exc:
+            raise ValueError(f"{directory}: {exc}") from None
+    checksum = 0
+    for path in files:
+        checksum = zlib.crc32(path.read_bytes(), zlib.crc32(path.name.encode("utf-8"), checksum))
+    version_file = directory / "VERSION"
+    name = (version_file.read_text(encoding="utf-8").strip().splitlines() or [""])[0][:40] if version_file.is_file() else ""
+    return Config(f"{name or 'local'} ({checksum:08x})", ranges, rules, matcher, str(directory))
+
+# ---------------------------
+# Active set
+# ---------------------------
+_active: Optional[Config] = None
+_active_signature = None
+_lock = threading.Lock()
+_pinned: ContextVar[Optional[Config]] = ContextVar("clinic_rule_set", default=None)
+
+def _initial() -> Config:
+    """Load the set named by the environment on first use; a bad set stops startup, as before."""
+    global _active, _active_signature
+    with _lock:
+        if _active is None:
+            directory = os.environ.get("CLINIC_RULES_DIR")
+            if directory:
+                _active_signature = signature(directory)
+                _active = load(directory)
+            else:
+                _active = builtin()
+        return _active
+
+def active() -> Config:
+    """The set new work starts with (ignores any pin)."""
+    config = _active
+    return config if config is not None else _initial()
+
+def current() -> Config:
+    """The set to use here: this thread's pinned set, else the active one."""
+    config = _pinned.get()
+    return config if config is not None else active()
+
+def pin() -> Config:
+    """Keep the active set for the rest of this thread's work, until the next ``pin``."""
+    config = active()
+    _pinned.set(config)
+    return config
+
+@contextmanager
+def pinned():
+    """``current()`` for the duration of the block, even if a reload lands meanwhile."""
+    config = current()
+    token = _pinned.set(config)
+    try:
+        yield config
+    finally:
+        _pinned.reset(token)
+
+def swap(config: Config) -> Config:
+    """Make ``config`` the active set (one reference assignment); returns the previous one."""
+    global _active
+    active()  # the first load must not overwrite a swap
+    with _lock:
+        previous, _active = _active, config
+    return previous
+
+# ---------------------------
+# Watching the rule directory
+# ---------------------------
+def _logger():
+    import logging  # deferred: the engine imports this module and logging is a noticeable share of its import time
+
+    return logging.getLogger("clinic_companion.config")
+
+class RuleWatcher:
+    """Reloads the rule set from a daemon thread when the files in its directory change."""
+
+    def __init__(self, directory: str, interval: float = POLL_INTERVAL, known=None):
+        self.directory = directory
+        self.interval = interval
+        self.reloads = self.failures = 0
+        self.last_error: Optional[str] = None
+        self._signature = known
+        self._thread = None
+
+    def check(self) -> bool:
+        """Reload if the files changed since the last check; True when a new set was swapped in."""
+        current_signature = signature(self.directory)
+        if current_signature == self._signature:
+            return False
+        self._signature = current_signature
+        try:
+            config = load(self.directory)
+        except (OSError, ValueError) as exc:
+            self.failures += 1
+            self.last_error = str(exc)
+            _logger().error("rule set in %s not loaded, keeping %s: %s", self.directory, active().version, exc)
+            return False
+        previous = swap(config)
+        self.reloads += 1
+        self.last_error = None
+        _logger().info("rule set %s replaced %s", config.version, previous.version)
+        return True
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="clinic-rules", daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception:  # keep watching whatever happens to one reload
+                _logger().exception("rule set reload failed")
+
+    def prometheus_lines(self):
+        yield "# TYPE clinic_rules_reloads_total counter"
+        yield f"clinic_rules_reloads_total {self.reloads}"
+        yield "# TYPE clinic_rules_reload_failures_total counter"
+        yield f"clinic_rules_reload_failures_total {self.failures}"
+        version = active().version.replace("\\", "\\\\").replace('"', '\\"')
+        yield "# TYPE clinic_rules_info gauge"
+        yield f'clinic_rules_info{{version="{version}"}} 1'
+
+_watcher: Optional[RuleWatcher] = None
+
+def watch() -> Optional[RuleWatcher]:
+    """Start watching ``CLINIC_RULES_DIR`` (once per process); None when it is not set."""
+    global _watcher
+    directory = os.environ.get("CLINIC_RULES_DIR")
+    if not directory:
+        return None
+    active()
+    with _lock:
+        if _watcher is None or _watcher.directory != directory:
+            known = _active_signature if _active is not None and _active.source == directory else None
+            _watcher = RuleWatcher(directory, known=known)
+            _watcher.start()
+        return _watcher
+
+# ---------------------------
+# CLI entry point
+# ---------------------------
+def run(args) -> int:
+    try:
+        config = load(args.directory)
+    except (OSError, ValueError) as exc:
+        print(f"Not loaded: {exc}", file=sys.stderr)
+        return 1
+    counts = {kind: sum(r.kind == kind for r in config.rules.rules) for kind in ("check", "question")}
+    print(f"Rule set {config.version}: {len(config.matcher.triggers)} red-flag triggers "
+          f"({config.matcher.phrase_count} phrases), {counts['check']} doctor checks, "
+          f"{counts['question']} questions, ranges {'from ranges.json' if config.ranges is not RANGES else 'built-in'}")
+    return 0
+
+def add_parser(subparsers):
+    p = subparsers.add_parser("check-rules", help="Validate a rule directory before it goes live",
+                              description="Loads and compiles a CLINIC_RULES_DIR directory the way a running app would.")
+    p.add_argument("directory", nargs="?", default=os.environ.get("CLINIC_RULES_DIR", "."),
+                   help="rule directory (default: $CLINIC_RULES_DIR)")
+    p.set_defaults(func=run)
+    return p
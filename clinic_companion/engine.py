@@ -0,0 +1,667 @@
+"""Assessment engine for Clinic Companion NG.
+
+Everything here is plain Python so it can be imported without starting
+Streamlit: the web app, scripts and notebooks all share the same classification
+logic. NumPy is only imported by the vectorized batch path, on first use, so
+importing the engine stays cheap on a cold start.
+"""
+from datetime import datetime
+import math
+
+from .config import current as current_config, pinned
+from .i18n import N_, translator
+from .ranges import BP_PRECEDENCE, age_band, combine_bp
+from .rules import BIT, features
+
+DISCLAIMER = N_(
+    "⚠️ **Educational use only (not medical advice).**\n\n"
+    "- This tool does **not** diagnose illness or recommend treatment.\n"
+    "- Do **not** start/stop medicines based on this.\n"
+    "- Use it to prepare for a conversation with a licensed clinician.\n"
+    "- If you feel very unwell or symptoms are severe, **seek urgent medical care**."
+)
+# Texts below marked with N_() are English message ids: the app shows them through
+# the active language's catalog (see i18n.py), so engine results stay in English.
+
+def _provided_num(x) -> bool:
+    return x is not None and float(x) > 0
+
+def safe_text(s: str) -> str:
+    """Escape text that might contain HTML-like characters."""
+    import html  # deferred: html.entities is a noticeable share of engine import time
+
+    return html.escape(s or "").strip()
+
+# ---------------------------
+# Educational classification helpers (non-diagnostic)
+# ---------------------------
+def classify_bp(sys_bp: int, dia_bp: int, age=None) -> str:
+    # soften to reduce panic: 120–124 sits in the near-typical band (see ranges.py)
+    return current_config().ranges.classify_bp(sys_bp, dia_bp, age_band(age))
+
+def bp_context() -> str:
+    return N_(
+        "BP can change due to stress, pain, poor sleep, caffeine, dehydration, and illness. "
+        "Clinicians often repeat readings after 5–10 minutes of rest."
+    )
+
+def classify_temp(temp_c: float) -> str:
+    return current_config().ranges.lookup("temp", temp_c)
+
+def temp_context() -> str:
+    return N_(
+        "Fever is the body’s response to infection or inflammation. In Nigeria, clinicians may consider "
+        "malaria or respiratory infections depending on symptoms and tests."
+    )
+
+def classify_pulse(pulse: int, age=None) -> str:
+    return current_config().ranges.lookup("pulse", pulse, age_band(age))
+
+def pulse_context() -> str:
+    return N_("Pulse can rise with fever, dehydration, pain, anxiety, or recent activity. Clinicians interpret it with symptoms.")
+
+def classify_pcv(pcv: float, sex: str, pregnant: bool = False) -> str:
+    return current_config().ranges.lookup("pcv", pcv, sex=sex, pregnant=pregnant)
+
+def pcv_context() -> str:
+    return N_(
+        "When PCV is low, clinicians often check nutrition, recent infections (including malaria depending on exposure), "
+        "and any history of blood loss. It does not automatically mean something serious, but it deserves review."
+    )
+
+def classify_glucose(glucose_mmol: float, fasting: bool, pregnant: bool = False) -> str:
+    return current_config().ranges.lookup("glucose", glucose_mmol, pregnant=pregnant, fasting=fasting)
+
+def glucose_context(fasting: bool) -> str:
+    if fasting:
+        return N_("Fasting glucose is best interpreted with context. Clinicians may confirm with repeat testing or HbA1c.")
+    return N_("Random glucose depends on recent meals. Clinicians may suggest fasting glucose or HbA1c for clarity.")
+
+# ---------------------------
+# BMI
+# ---------------------------
+def compute_bmi(height_cm: float, weight_kg: float):
+    if height_cm <= 0 or weight_kg <= 0:
+        return None
+    h_m = height_cm / 100.0
+    return weight_kg / (h_m * h_m)
+
+def classify_bmi(bmi: float, age=None) -> str:
+    return current_config().ranges.lookup("bmi", bmi, age_band(age))
+
+# ---------------------------
+# Hydration (educational scoring)
+# ---------------------------
+def hydration_risk(drinking_less, urine_color, peeing_less, vomiting, diarrhea, heat_sweat, dry_dizzy):
+    score = 0
+    if drinking_less == "Yes":
+        score += 1
+    if urine_color == "Yellow":
+        score += 1
+    if urine_color == "Dark yellow":
+        score += 2
+    if peeing_less == "Yes":
+        score += 2
+    if vomiting == "Some":
+        score += 1
+    if vomiting == "Frequent":
+        score += 2
+    if diarrhea == "Some":
+        score += 1
+    if diarrhea == "Frequent":
+        score += 2
+    if heat_sweat == "Yes":
+        score += 1
+    if dry_dizzy == "Yes":
+        score += 1
+
+    if score >= 6:
+        return N_("High"), score
+    if score >= 3:
+        return N_("Moderate"), score
+    return N_("Low"), score
+
+def hydration_advice(level: str):
+    if level == "High":
+        return [
+            N_("If you cannot keep fluids down, feel faint/confused, or symptoms are worsening, seek urgent medical care."),
+            N_("Small sips frequently can be easier than large amounts at once, especially if nauseated."),
+            N_("If vomiting/diarrhea is present, you can ask your clinician/pharmacist about oral rehydration solutions (ORS)."),
+        ]
+    if level == "Moderate":
+        return [
+            N_("Increase fluid intake gradually. Small frequent sips may be easier if nauseated."),
+            N_("Watch for urine becoming lighter and urinating more normally over time."),
+            N_("If fever/heat exposure is present, drink a bit more than usual and rest."),
+        ]
+    return [
+        N_("Hydration looks okay from what you entered. Keep drinking fluids regularly."),
+        N_("If you’re in heat or sweating heavily, increase fluids a little and monitor urine color."),
+    ]
+
+# ---------------------------
+# Red flags (conservative)
+# ---------------------------
+SYMPTOM_TRIGGERS = [
+    ("chest pain", N_("Chest pain or heavy chest pressure")),
+    ("difficulty breathing", N_("Difficulty breathing")),
+    ("shortness of breath", N_("Shortness of breath")),
+    ("faint", N_("Fainting or repeated fainting")),
+    ("confusion", N_("Confusion or altered mental state")),
+    ("seiz", N_("Seizure / convulsions")),
+    ("stroke", N_("Stroke-like symptoms (face droop, arm weakness, speech trouble)")),
+    ("vomit blood", N_("Vomiting blood")),
+    ("black stool", N_("Black/tarry stool")),
+    ("bleeding", N_("Uncontrolled bleeding")),
+]
+
+VITAL_FLAGS = {
+    "bp_very_high": N_("Very high blood pressure range (urgent assessment recommended)."),
+    "bp_very_low": N_("Very low blood pressure range, especially if weak/faint (urgent assessment may be needed)."),
+    "fever_very_high": N_("Very high fever (urgent assessment if persistent or with severe symptoms)."),
+    "glucose_very_high": N_("Very high blood sugar range (urgent assessment if unwell, vomiting, confusion, or dehydrated)."),
+    "glucose_very_low": N_("Very low blood sugar range (urgent assessment if shaky, sweaty, confused, faint)."),
+    "fluid_loss": N_("Frequent vomiting/diarrhea can cause dehydration. Seek care if you can’t keep fluids down."),
+}
+
+def red_flags(symptoms_text: str, sys_bp: int, dia_bp: int, temp_c: float, glucose_mmol: float,
+             vomiting: str, diarrhea: str):
+    # One pass over the text for every trigger phrase and synonym (see triggers.py)
+    flags = current_config().matcher.labels(symptoms_text or "")
+
+    if sys_bp > 180 or dia_bp > 120:
+        flags.append(VITAL_FLAGS["bp_very_high"])
+    if (sys_bp > 0 and dia_bp > 0) and (sys_bp < 85 or dia_bp < 55):
+        flags.append(VITAL_FLAGS["bp_very_low"])
+    if temp_c >= 39.5:
+        flags.append(VITAL_FLAGS["fever_very_high"])
+    if glucose_mmol > 13.9:
+        flags.append(VITAL_FLAGS["glucose_very_high"])
+    if 0 < glucose_mmol < 3.0:
+        flags.append(VITAL_FLAGS["glucose_very_low"])
+
+    # dehydration + inability to keep fluids down (simple proxy)
+    if vomiting == "Frequent" or diarrhea == "Frequent":
+        flags.append(VITAL_FLAGS["fluid_loss"])
+
+    return list(dict.fromkeys(flags))
+
+# ---------------------------
+# Questions generator
+# ---------------------------
+def smart_questions(has_bp, has_temp, has_pulse, has_pcv, has_glucose, has_hydration, has_bmi):
+    """Questions for a visit with these values entered (see ``rules.py`` for the rules themselves)."""
+    present = (("has_bp", has_bp), ("has_temp", has_temp), ("has_pulse", has_pulse), ("has_pcv", has_pcv),
+               ("has_glucose", has_glucose), ("has_hydration", has_hydration), ("has_bmi", has_bmi))
+    mask = 0
+    for name, flag in present:
+        if flag:
+            mask |= BIT[name]
+    return current_config().rules.questions(mask)
+
+# ---------------------------
+# Summary builder
+# ---------------------------
+def _time_line(now: datetime = None, _=N_) -> str:
+    return _("Date/Time: {when}").format(when=(now or datetime.now()).strftime('%Y-%m-%d %H:%M'))
+
+def restamp_summary(summary: str, now: datetime = None, lang: str = "en") -> str:
+    """Replace the Date/Time line of a previously built summary (used for cached results)."""
+    head, sep, rest = summary.partition("\n")
+    _, sep2, tail = rest.partition("\n")
+    return head + sep + _time_line(now, translator(lang)) + sep2 + tail
+
+def visit_summary(visit: "VisitRecord", now: datetime = None, lang: str = "en") -> str:
+    """Copy/paste clinic summary for one visit, with its labels in ``lang`` (see i18n.py)."""
+    _ = translator(lang)
+    na = _("N/A")
+    who = _("Patient") if not visit.caregiver else _("Patient (info provided by caregiver)")
+    lines = []
+    lines.append(f"{who}: {visit.patient_name or na} | {_('Age')}: {visit.age or na} | {_('Sex')}: {_(visit.sex) or na}"
+                 + (f" | {_('Pregnant')}" if visit.expecting else ""))
+    lines.append(_time_line(now, _))
+    lines.append("")
+    lines.append(_("Symptoms/Concerns:"))
+    if visit.symptoms:
+        lines.append(f"- {visit.symptoms}")
+    else:
+        lines.append(f"- {na}")
+    if visit.onset:
+        lines.append(f"- {_('Started')}: {_(visit.onset)}")
+    if visit.progression:
+        lines.append(f"- {_('Trend')}: {_(visit.progression)}")
+    if visit.main_concern:
+        lines.append(f"- {_('Main worry')}: {visit.main_concern}")
+
+    lines.append("")
+    lines.append(_("Medicines / Supplements (as reported):"))
+    lines.append(f"- {_('Medicines')}: {visit.meds or na}")
+    lines.append(f"- {_('Supplements/herbal')}: {visit.supplements or na}")
+
+    lines.append("")
+    lines.append(_("Values Provided:"))
+    if visit.has_bp:
+        lines.append(f"- {_('BP')}: {visit.sys_bp}/{visit.dia_bp} mmHg")
+    if visit.pulse > 0:
+        lines.append(f"- {_('Pulse')}: {visit.pulse} bpm")
+    if visit.temp_c > 0:
+        lines.append(f"- {_('Temperature')}: {visit.temp_c:.1f} °C")
+    if visit.pcv > 0:
+        lines.append(f"- PCV: {visit.pcv:.1f} %")
+    if visit.glucose > 0:
+        lines.append(f"- {_('Glucose')}: {visit.glucose:.1f} mmol/L ({_('fasting') if visit.fasting else _('random')})")
+    if visit.height_cm > 0 and visit.weight_kg > 0 and visit.bmi is not None:
+        lines.append(f"- {_('Height/Weight')}: {visit.height_cm:.1f} cm / {visit.weight_kg:.1f} kg | BMI: {visit.bmi:.1f} kg/m²")
+
+    # hydration summary (brief)
+    if visit.has_hydration:
+        lines.append("")
+        lines.append(_("Hydration notes (as reported):"))
+        for name, label in HYDRATION_LABELS.items():
+            value = getattr(visit, name)
+            if value:
+                lines.append(f"- {_(label)}: {_(value)}")
+
+    lines.append("")
+    lines.append(_("Goal for visit:"))
+    lines.append("- " + _("Understand what these findings mean in context, confirm what needs repeat testing, and agree next steps."))
+    lines.append("")
+    lines.append(_("Rule set: {version}").format(version=_(current_config().version)))
+    return "\n".join(lines)
+
+def insert_section(summary: str, section: str) -> str:
+    """Add a section to a ``visit_summary`` just before its closing "Goal for visit" and rule-set sections.
+
+    Found by position (the last two blank-line separated blocks), not by heading, so
+    it works in every language and whatever the patient typed.
+    """
+    parts = summary.rsplit("\n\n", 2)
+    if len(parts) < 3:
+        return summary.rstrip("\n") + "\n\n" + section
+    return "\n\n".join([parts[0], section, *parts[1:]])
+
+def build_summary(caregiver: bool, patient_name: str, age: str, sex: str,
+                  symptoms: str, onset: str, progression: str, main_concern: str,
+                  meds: str, supplements: str,
+                  sys_bp: int, dia_bp: int, pulse: int, temp_c: float,
+                  pcv: float, glucose: float, fasting: bool,
+                  height_cm: float, weight_kg: float, bmi: float,
+                  hyd_inputs: dict, pregnant: bool = False, now: datetime = None, lang: str = "en"):
+    """Keyword-argument form of ``visit_summary`` (``hyd_inputs`` is keyed by summary label)."""
+    fields = {name: hyd_inputs.get(label, "") for name, label in HYDRATION_LABELS.items()}
+    visit = VisitRecord(dict(
+        caregiver=caregiver, patient_name=patient_name, age=age, sex=sex, pregnant=pregnant,
+        symptoms=symptoms, onset=onset, progression=progression, main_concern=main_concern,
+        meds=meds, supplements=supplements, sys_bp=sys_bp, dia_bp=dia_bp, pulse=pulse,
+        temp_c=temp_c, pcv=pcv, glucose=glucose, fasting=fasting, height_cm=height_cm,
+        weight_kg=weight_kg, **fields,
+    ))
+    visit.bmi, visit.expecting = bmi, pregnant
+    return visit_summary(visit, now, lang)
+
+# ---------------------------
+# Status badge (shared by the UI and exports)
+# ---------------------------
+def status_badge(label: str) -> str:
+    typical_markers = {
+        "Typical / near typical", "Typical", "Typical fasting range", "Common random range", "Typical resting range", "Typical range"
+    }
+    if label in typical_markers:
+        return N_("✅ Typical")
+    if label == "Not provided":
+        return N_("➖ Not provided")
+    if "High" in label or "Low" in label or "Above" in label or "Below" in label or "Fever" in label or "Borderline" in label:
+        return N_("⚠️ Outside usual range")
+    return N_("ℹ️ Check")
+
+# ---------------------------
+# Whole-visit assessment (scripts, batch jobs)
+# ---------------------------
+HYDRATION_FIELDS = ("drinking_less", "urine_color", "peeing_less", "vomiting", "diarrhea", "heat_sweat", "dry_dizzy")
+
+# Labels used for the hydration answers in the clinic summary
+HYDRATION_LABELS = {
+    "drinking_less": N_("Drinking less"),
+    "urine_color": N_("Urine color"),
+    "peeing_less": N_("Peeing less"),
+    "vomiting": N_("Vomiting"),
+    "diarrhea": N_("Diarrhea"),
+    "heat_sweat": N_("Heat/sweating"),
+    "dry_dizzy": N_("Dry mouth/dizziness"),
+}
+
+# Every intake field with its "left blank" value; the type of the default is the field type.
+INTAKE_DEFAULTS = {
+    "caregiver": False,
+    "patient_name": "",
+    "age": "",
+    "sex": "Prefer not to say",
+    "pregnant": False,
+    "symptoms": "",
+    "onset": "",
+    "progression": "",
+    "main_concern": "",
+    "meds": "",
+    "supplements": "",
+    "sys_bp": 0,
+    "dia_bp": 0,
+    "pulse": 0,
+    "temp_c": 0.0,
+    "pcv": 0.0,
+    "glucose": 0.0,
+    "fasting": False,
+    "height_cm": 0.0,
+    "weight_kg": 0.0,
+    **{name: "" for name in HYDRATION_FIELDS},
+}
+
+# Options offered by the form's select boxes (the first one is the default)
+YES_NO = ("", "No", "Yes")
+FREQUENCY = ("", "No", "Some", "Frequent")
+INTAKE_CHOICES = {
+    "sex": ("Prefer not to say", "Male", "Female"),
+    "onset": ("", "Today", "2–3 days ago", "1–2 weeks ago", "Longer than 2 weeks"),
+    "progression": ("", "Getting better", "Getting worse", "About the same"),
+    "drinking_less": YES_NO,
+    "urine_color": ("", "Pale yellow", "Yellow", "Dark yellow"),
+    "peeing_less": YES_NO,
+    "vomiting": FREQUENCY,
+    "diarrhea": FREQUENCY,
+    "heat_sweat": YES_NO,
+    "dry_dizzy": YES_NO,
+}
+
+# Upper bounds of the form's number inputs (all lower bounds are 0)
+INTAKE_LIMITS = {
+    "sys_bp": 300,
+    "dia_bp": 200,
+    "pulse": 250,
+    "temp_c": 45.0,
+    "pcv": 80.0,
+    "glucose": 60.0,
+    "height_cm": 250.0,
+    "weight_kg": 300.0,
+}
+
+_TRUE_STRINGS = {"1", "true", "yes", "y", "on"}
+
+def _coerce(value, default):
+    if value is None or value == "":
+        return default
+    if isinstance(default, bool):
+        if isinstance(value, str):
+            return value.strip().lower() in _TRUE_STRINGS
+        return bool(value)
+    if isinstance(default, (int, float)):
+        number = float(value)
+        if not math.isfinite(number):
+            raise ValueError("not a finite number")
+        return int(number) if isinstance(default, int) else number
+    return str(value).strip()
+
+def _coerce_field(record: dict, name: str, default):
+    try:
+        return _coerce(record.get(name), default)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Invalid value for {name!r}: {record.get(name)!r}") from None
+
+def normalize_intake(record) -> dict:
+    """Fill in blanks and coerce types (CSV/JSON values arrive as strings or numbers)."""
+    if isinstance(record, VisitRecord):
+        return record.as_dict()
+    return {name: _coerce_field(record, name, default) for name, default in INTAKE_DEFAULTS.items()}
+
+class VisitRecord:
+    """One normalized intake: fields coerced once, derived facts computed once.
+
+    Attribute access replaces the loose locals / dict lookups of the form flow, and
+    ``__slots__`` keeps each instance small. Pass a raw record (form values, CSV row,
+    JSON object) or another ``VisitRecord``.
+    """
+
+    __slots__ = tuple(INTAKE_DEFAULTS) + ("bmi", "expecting", "has_bp", "has_hydration")
+
+    def __init__(self, record: dict):
+        for name, default in INTAKE_DEFAULTS.items():
+            setattr(self, name, _coerce_field(record, name, default))
+        self.bmi = compute_bmi(self.height_cm, self.weight_kg)
+        self.expecting = self.pregnant and self.sex != "Male"  # pregnancy ranges apply
+        self.has_bp = self.sys_bp > 0 and self.dia_bp > 0
+        self.has_hydration = any(getattr(self, name) for name in HYDRATION_FIELDS)
+
+    @classmethod
+    def of(cls, record) -> "VisitRecord":
+        return record if isinstance(record, cls) else cls(record)
+
+    @property
+    def has_any(self) -> bool:
+        """Whether anything at all was entered (the results page needs at least one value)."""
+        return bool(
+            self.symptoms or self.has_bp or self.pulse > 0 or self.temp_c > 0 or self.pcv > 0
+            or self.glucose > 0 or self.bmi is not None or self.has_hydration or self.meds
+            or self.supplements or self.onset or self.progression or self.main_concern
+        )
+
+    @property
+    def hyd_inputs(self) -> dict:
+        return {label: getattr(self, name) for name, label in HYDRATION_LABELS.items()}
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in INTAKE_DEFAULTS}
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        return isinstance(other, VisitRecord) and self.__getstate__() == other.__getstate__()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        provided = ", ".join(f"{k}={v!r}" for k, v in self.as_dict().items() if v != INTAKE_DEFAULTS[k])
+        return f"VisitRecord({provided})"
+
+def assess_visit(record) -> dict:
+    """Run every helper the results page uses for one intake record (dict or ``VisitRecord``).
+
+    All of it uses one rule set (see ``config.py``), even if a reload lands meanwhile.
+    """
+    v = VisitRecord.of(record)
+    level, score = hydration_risk(*(getattr(v, name) for name in HYDRATION_FIELDS))
+    with pinned() as config:
+        # per-axis BP labels: combined for the page, read one by one by the rule features
+        bp_axes = config.ranges.bp_axes(v.sys_bp, v.dia_bp, age_band(v.age))
+        labels = {
+            "bp": combine_bp(bp_axes),
+            "temp": classify_temp(v.temp_c),
+            "pulse": classify_pulse(v.pulse, v.age),
+            "pcv": classify_pcv(v.pcv, v.sex, v.expecting),
+            "glucose": classify_glucose(v.glucose, v.fasting, v.expecting),
+            "bmi": classify_bmi(v.bmi, v.age),
+        }
+        mask = features(v, labels, bp_axes)  # encoded once, shared by both rule lists
+        return {
+            "labels": labels,
+            "bmi": v.bmi,
+            "hydration": {"level": level, "score": score} if v.has_hydration else None,
+            "red_flags": red_flags(v.symptoms, v.sys_bp, v.dia_bp, v.temp_c, v.glucose, v.vomiting, v.diarrhea),
+            "doctor_checks": config.rules.doctor_checks(mask),
+            "questions": config.rules.questions(mask),
+            "summary": visit_summary(v),
+            "rules_version": config.version,
+        }
+
+# ---------------------------
+# Vectorized batch assessment
+# ---------------------------
+
+def _col(columns: dict, name: str, n: int, fill, dtype):
+    import numpy as np
+
+    values = columns.get(name)
+    if values is None:
+        return np.full(n, fill, dtype=str if dtype is object else dtype)
+    arr = np.asarray(values)
+    if dtype is object:
+        if arr.dtype.kind in "US":
+            return arr.astype(str)
+        arr = arr.astype(object)
+        arr[np.equal(arr, None)] = fill
+        return arr.astype(str)
+    return np.nan_to_num(arr.astype(dtype), nan=fill)
+
+def _record_count(columns: dict) -> int:
+    lengths = {len(v) for v in columns.values() if v is not None}
+    if len(lengths) > 1:
+        raise ValueError(f"assess_many() columns have different lengths: {sorted(lengths)}")
+    return lengths.pop() if lengths else 0
+
+def _selector_groups(bands, sex, pregnant, fasting):
+    """Row indexes for each distinct (age_band, sex, pregnant, fasting) combination."""
+    import numpy as np
+
+    sexes = np.where(np.isin(sex, ("Male", "Female")), sex, "Prefer not to say")
+    band_names, band_idx = np.unique(bands, return_inverse=True)
+    sex_names, sex_idx = np.unique(sexes, return_inverse=True)
+    code = ((band_idx.ravel() * len(sex_names) + sex_idx.ravel()) * 2 + pregnant) * 2 + fasting
+    codes, inverse = np.unique(code, return_inverse=True)
+    order = np.argsort(inverse.ravel(), kind="stable")
+    splits = np.split(order, np.cumsum(np.bincount(inverse.ravel()))[:-1])
+    groups = []
+    for c, rows in zip(codes, splits):
+        c = int(c)
+        key = (str(band_names[c // 2 // 2 // len(sex_names)]), str(sex_names[c // 2 // 2 % len(sex_names)]),
+               bool(c // 2 % 2), bool(c % 2))
+        groups.append((key, rows))
+    return groups
+
+def _lookup_many(metric: str, values, groups, ranges):
+    """Vectorized ``RangeTables.lookup``: one ``searchsorted`` per selector group."""
+    import numpy as np
+
+    out = np.empty(len(values), dtype=object)
+    for key, rows in groups:
+        breaks, labels = ranges.bands_for(metric, *key)
+        out[rows] = np.asarray(labels, dtype=object)[np.searchsorted(breaks, values[rows], side="right")]
+    return out.astype(str)
+
+_BP_RANK = {label: i for i, label in enumerate(BP_PRECEDENCE)}
+
+def _lookup_bp(sys_bp, dia_bp, selectors, ranges):
+    import numpy as np
+
+    sys_label = _lookup_many("bp_systolic", sys_bp, selectors, ranges)
+    dia_label = _lookup_many("bp_diastolic", dia_bp, selectors, ranges)
+    rank = np.vectorize(_BP_RANK.__getitem__, otypes=[int])
+    return np.where(rank(sys_label) <= rank(dia_label), sys_label, dia_label)
+
+def assess_many(columns: dict) -> dict:
+    """Classify a whole cohort at once.
+
+    ``columns`` maps the intake field names used by the form (``sys_bp``, ``dia_bp``,
+    ``pulse``, ``temp_c``, ``pcv``, ``sex``, ``age``, ``pregnant``, ``glucose``, ``fasting``,
+    ``height_cm``, ``weight_kg``, ``symptoms`` and the hydration answers) to equal-length
+    sequences.
+    Missing columns are treated as "not provided". Every label column matches what
+    ``assess_visit`` returns for the same row (``pregnant`` counts only when ``sex``
+    is not "Male", as in ``VisitRecord.expecting``); ``python -m benchmarks check``
+    compares the two.
+    """
+    import numpy as np
+
+    config = current_config()  # one rule set for the whole cohort
+    n = _record_count(columns)
+    sys_bp = _col(columns, "sys_bp", n, 0, float)
+    dia_bp = _col(columns, "dia_bp", n, 0, float)
+    pulse = _col(columns, "pulse", n, 0, float)
+    temp_c = _col(columns, "temp_c", n, 0.0, float)
+    pcv = _col(columns, "pcv", n, 0.0, float)
+    glucose = _col(columns, "glucose", n, 0.0, float)
+    fasting = _col(columns, "fasting", n, False, bool)
+    height_cm = _col(columns, "height_cm", n, 0.0, float)
+    weight_kg = _col(columns, "weight_kg", n, 0.0, float)
+    sex = _col(columns, "sex", n, "", object)
+    symptoms = _col(columns, "symptoms", n, "", object)
+    hyd = {name: _col(columns, name, n, "", object) for name in HYDRATION_FIELDS}
+
+    age = columns.get("age")
+    if age is None:
+        bands = np.full(n, "adult")
+    else:
+        ages, age_idx = np.unique(np.asarray(age, dtype=object).astype(str), return_inverse=True)
+        bands = np.array([age_band(a) for a in ages])[age_idx.ravel()] if n else np.full(0, "adult")
+    expecting = _col(columns, "pregnant", n, False, bool) & (sex != "Male")  # as VisitRecord.expecting
+    selectors = _selector_groups(bands, sex, expecting, fasting)
+
+    bp = _lookup_bp(sys_bp, dia_bp, selectors, config.ranges)
+    temp = _lookup_many("temp", temp_c, selectors, config.ranges)
+    pulse_label = _lookup_many("pulse", pulse, selectors, config.ranges)
+    pcv_label = _lookup_many("pcv", pcv, selectors, config.ranges)
+    glu_label = _lookup_many("glucose", glucose, selectors, config.ranges)
+
+    has_bmi = (height_cm > 0) & (weight_kg > 0)
+    h_m = np.where(has_bmi, height_cm, 1.0) / 100.0
+    bmi = np.where(has_bmi, weight_kg / (h_m * h_m), np.nan)
+    bmi_label = _lookup_many("bmi", np.where(has_bmi, bmi, 0.0), selectors, config.ranges)
+
+    score = (
+        (hyd["drinking_less"] == "Yes").astype(int)
+        + (hyd["urine_color"] == "Yellow") + 2 * (hyd["urine_color"] == "Dark yellow")
+        + 2 * (hyd["peeing_less"] == "Yes")
+        + (hyd["vomiting"] == "Some") + 2 * (hyd["vomiting"] == "Frequent")
+        + (hyd["diarrhea"] == "Some") + 2 * (hyd["diarrhea"] == "Frequent")
+        + (hyd["heat_sweat"] == "Yes")
+        + (hyd["dry_dizzy"] == "Yes")
+    )
+    hyd_level = np.select([score >= 6, score >= 3], ["High", "Moderate"], default="Low")
+    has_hydration = np.zeros(n, dtype=bool)
+    for values in hyd.values():
+        has_hydration |= values != ""
+
+    # Red flags: one boolean column per rule, in the same order red_flags() emits them.
+    # Symptom text goes through the trigger automaton once per distinct text.
+    matcher = config.matcher
+    texts, text_idx = np.unique(symptoms, return_inverse=True)
+    fired = np.zeros((len(texts), len(matcher.triggers)), dtype=bool)
+    for i, text in enumerate(texts):
+        fired[i, matcher.trigger_ids(str(text))] = True
+    fired = fired[text_idx.ravel()]
+    flag_columns = [(fired[:, i], label) for i, (_, label) in enumerate(matcher.triggers)]
+    flag_columns += [
+        ((sys_bp > 180) | (dia_bp > 120), VITAL_FLAGS["bp_very_high"]),
+        ((sys_bp > 0) & (dia_bp > 0) & ((sys_bp < 85) | (dia_bp < 55)), VITAL_FLAGS["bp_very_low"]),
+        (temp_c >= 39.5, VITAL_FLAGS["fever_very_high"]),
+        (glucose > 13.9, VITAL_FLAGS["glucose_very_high"]),
+        ((glucose > 0) & (glucose < 3.0), VITAL_FLAGS["glucose_very_low"]),
+        ((hyd["vomiting"] == "Frequent") | (hyd["diarrhea"] == "Frequent"), VITAL_FLAGS["fluid_loss"]),
+    ]
+    flag_matrix = np.column_stack([mask for mask, _ in flag_columns]) if n else np.zeros((0, len(flag_columns)), bool)
+    flag_labels = [label for _, label in flag_columns]
+    # Cohorts repeat a handful of flag patterns, so build each distinct label list once.
+    # Rows are keyed on their packed bytes, which stay exact however many triggers a rule set adds.
+    patterns, inverse = np.unique(np.packbits(flag_matrix, axis=1), axis=0, return_inverse=True)
+    pattern_labels = [
+        tuple(dict.fromkeys(label for label, hit in zip(flag_labels, row) if hit))
+        for row in np.unpackbits(patterns, axis=1, count=len(flag_labels)).astype(bool)
+    ]
+    flags = [list(pattern_labels[j]) for j in inverse.ravel()]
+
+    return {
+        "bp": bp,
+        "temp": temp,
+        "pulse": pulse_label,
+        "pcv": pcv_label,
+        "glucose": glu_label,
+        "bmi": bmi,
+        "bmi_label": bmi_label,
+        "hydration_level": hyd_level,
+        "hydration_score": score,
+        "has_hydration": has_hydration,
+        "flag_matrix": flag_matrix,
+        "flag_labels": flag_labels,
+        "red_flags": flags,
+    }
@@ -0,0 +1,139 @@
+"""Bulk summary export: a whole clinic list into one zip archive.
+
+Each intake record becomes ``summaries/<n>_<name>.txt`` (the same text as the
+results page's download button) and ``index.csv`` lists every patient with the
+file name, red-flag count and any error. Records are read, summarized and
+written to the archive one at a time, so memory use does not grow with the
+size of the list; the index is spooled to a temporary file and appended last.
+
+    python -m clinic_companion export clinic_list.csv -o summaries.zip
+"""
+import csv
+from datetime import datetime
+import io
+import re
+import sys
+import tempfile
+import time
+import unicodedata
+import zipfile
+from typing import Iterable, Optional
+
+from .engine import VisitRecord, red_flags, visit_summary
+
+INDEX_FIELDS = ("index", "id", "patient_name", "file", "red_flags", "urgent", "error")
+CSV_ENCODINGS = ("utf-8-sig", "cp1252")  # tried in order: UTF-8 (with or without BOM), then what Excel saves
+
+_UNSAFE = re.compile(r"[^a-z0-9]+")
+
+def summary_filename(index: int, visit: VisitRecord, record_id=None) -> str:
+    """``summaries/00001_ada-obi.txt``: numbered so names never collide, ASCII-only for every unzip tool."""
+    label = str(record_id) if record_id not in (None, "") else visit.patient_name
+    ascii_label = unicodedata.normalize("NFKD", label).encode("ascii", "ignore").decode("ascii")
+    slug = _UNSAFE.sub("-", ascii_label.lower()).strip("-")[:40] or "patient"
+    return f"summaries/{index:05d}_{slug}.txt"
+
+def export_zip(records: Iterable[dict], sink, now: Optional[datetime] = None, compresslevel: int = 6) -> dict:
+    """Write one summary per record plus ``index.csv`` into a zip archive on ``sink``.
+
+    ``sink`` is a path or a binary file object (it does not need to be seekable, so a
+    socket or HTTP response works). Returns counts of exported, failed and flagged rows.
+    """
+    now = now or datetime.now()
+    stamp = now.timetuple()[:6]
+    exported = failed = flagged = 0
+    with tempfile.SpooledTemporaryFile(max_size=1 << 20, mode="w+", encoding="utf-8", newline="") as index_file:
+        index = csv.writer(index_file)
+        index.writerow(INDEX_FIELDS)
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zf:
+            for i, record in enumerate(records, start=1):
+                if not isinstance(record, dict):  # valid JSON but not an object, e.g. [1, 2]
+                    failed += 1
+                    index.writerow((i, "", "", "", "", "", f"expected a JSON object, got {type(record).__name__}"))
+                    continue
+                record_id = record.get("id", "")
+                try:
+                    if "_error" in record:  # unreadable input line (see batch.read_jsonl)
+                        raise ValueError(record["_error"])
+                    visit = VisitRecord(record)
+                except ValueError as exc:
+                    failed += 1
+                    index.writerow((i, record_id, record.get("patient_name", ""), "", "", "", str(exc)))
+                    continue
+                flags = red_flags(visit.symptoms, visit.sys_bp, visit.dia_bp, visit.temp_c, visit.glucose,
+                                  visit.vomiting, visit.diarrhea)
+                name = summary_filename(i, visit, record_id)
+                info = zipfile.ZipInfo(name, date_time=stamp)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                zf.writestr(info, visit_summary(visit, now).encode("utf-8"), compresslevel=compresslevel)
+                exported += 1
+                flagged += bool(flags)
+                index.writerow((i, record_id, visit.patient_name, name, len(flags), "yes" if flags else "no", ""))
+
+            index_file.seek(0)
+            info = zipfile.ZipInfo("index.csv", date_time=stamp)
+            with zf.open(info, "w") as out:
+                for chunk in iter(lambda: index_file.read(1 << 16), ""):
+                    out.write(chunk.encode("utf-8"))
+    return {"exported": exported, "failed": failed, "flagged": flagged}
+
+def decode_csv(data: bytes) -> str:
+    """Uploaded CSV bytes as text, trying ``CSV_ENCODINGS`` in order; ValueError if none fits."""
+    for encoding in CSV_ENCODINGS:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"not a text file in any of: {', '.join(CSV_ENCODINGS)}")
+
+def export_csv_bytes(data: bytes, now: Optional[datetime] = None) -> tuple:
+    """Uploaded CSV bytes -> (zip bytes, stats). Used by the app's bulk-export section.
+
+    Raises ValueError when the bytes are not text in one of ``CSV_ENCODINGS`` or not CSV.
+    """
+    from .batch import read_csv
+
+    lines = io.StringIO(decode_csv(data), newline="")
+    with tempfile.SpooledTemporaryFile(max_size=16 << 20) as buf:
+        try:
+            stats = export_zip(read_csv(lines), buf, now)
+        except csv.Error as exc:
+            raise ValueError(f"not a readable CSV file ({exc})") from None
+        buf.seek(0)
+        return buf.read(), stats
+
+# ---------------------------
+# CLI entry point
+# ---------------------------
+def run(args) -> int:
+    from .batch import read_records
+
+    source = open(args.input, encoding=args.encoding, newline="") if args.input != "-" else sys.stdin
+    started = time.perf_counter()
+    try:
+        sink = args.output if args.output != "-" else sys.stdout.buffer
+        stats = export_zip(read_records(source, args.format), sink)
+    except UnicodeDecodeError as exc:
+        print(f"{args.input} is not {args.encoding} text ({exc.reason}); "
+              f"a list saved by Excel usually needs --encoding cp1252", file=sys.stderr)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    if not args.quiet:
+        elapsed = time.perf_counter() - started
+        print(f"Exported {stats['exported']} summaries in {elapsed:.2f}s ({stats['flagged']} with red flags, "
+              f"{stats['failed']} failed) -> {args.output}", file=sys.stderr)
+    return 1 if stats["failed"] and args.strict else 0
+
+def add_parser(subparsers):
+    p = subparsers.add_parser("export", help="Export a clinic list as a zip of summaries plus an index",
+                              description="Reads intake records (CSV or JSONL) and writes one summary file per patient.")
+    p.add_argument("input", nargs="?", default="-", help="intake file (default: stdin)")
+    p.add_argument("-o", "--output", default="clinic_summaries.zip", help="zip file to write ('-' for stdout)")
+    p.add_argument("--format", choices=("auto", "jsonl", "csv"), default="auto", help="input format (default: auto)")
+    p.add_argument("--encoding", default="utf-8-sig", help="input file encoding (default: utf-8, BOM optional)")
+    p.add_argument("--strict", action="store_true", help="exit with status 1 if any record failed")
+    p.add_argument("-q", "--quiet", action="store_true", help="do not print the report")
+    p.set_defaults(func=run)
+    return p
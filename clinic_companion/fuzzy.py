@@ -0,0 +1,201 @@
+"""Typo-tolerant trigger matching ("shortnes of breath", "siezure", "difficuty breathing").
+
+The exact automaton in ``triggers.py`` only fires on the registered spelling.
+``FuzzyIndex`` is the fallback: trigger phrases are split into words, and a word
+in the symptom text may differ from a trigger word by a small number of edits
+(insert, delete, substitute or swap two neighbouring letters):
+
+- words of up to 5 letters must match exactly ("of", "chest", "pain", "seiz");
+  common misspellings of them go in a pack instead (``packs/en.txt``)
+- 6-10 letters allow one edit, 11 or more allow two
+- the first and last letters must be right (typos there are rare, and it keeps
+  "paint" from reading as "faint")
+- a text word that is a real word in its own right ("contusion", "strike",
+  "breeding") is never corrected to a trigger word; each language pack lists its
+  own on ``!`` lines (``packs/en.txt``)
+- like the exact matcher, a trigger word may be the start of a longer word
+  ("seizure" fires on "siezures")
+
+Lookups use a symmetric-delete index built once: every trigger word is stored
+under each string obtained by deleting up to its edit budget of inner letters,
+and a text word is looked up under its own deletes. Each word therefore costs a
+few dict probes whatever the vocabulary size, and only those candidates are
+checked with an exact (bounded) edit distance.
+"""
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+_WORD = re.compile(r"\w+")
+
+MIN_FUZZY_LEN = 6  # shorter trigger words match exactly
+TWO_EDITS_LEN = 11
+CACHE_SIZE = 8192
+
+def max_edits(length: int) -> int:
+    """Edit budget for a trigger word of ``length`` letters."""
+    if length < MIN_FUZZY_LEN:
+        return 0
+    return 1 if length < TWO_EDITS_LEN else 2
+
+def deletes(word: str, k: int) -> set:
+    """``word`` and every string made by deleting up to ``k`` of its letters."""
+    out = {word}
+    layer = out
+    for _ in range(k):
+        layer = {w[:i] + w[i + 1:] for w in layer for i in range(len(w))}
+        out |= layer
+    return out
+
+def _keys(word: str, k: int) -> list:
+    """Index keys of ``word``: the deletes of its inner letters between the first and last (never edited)."""
+    head, tail = word[0], word[-1]
+    return [head + inner + tail for inner in deletes(word[1:-1], k)]
+
+def _one_edit(a: str, b: str) -> int:
+    """``edit_distance(a, b, 1)`` without the table: compare around the first difference."""
+    if a == b:
+        return 0
+    i = 0
+    while i < len(a) and i < len(b) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        if a[i + 1:] == b[i + 1:]:
+            return 1  # substitution
+        if a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2] and a[i + 2:] == b[i + 2:]:
+            return 1  # neighbours swapped
+        return 2
+    if len(a) > len(b):
+        return 1 if a[i + 1:] == b[i:] else 2
+    return 1 if a[i:] == b[i + 1:] else 2
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal-string-alignment distance between ``a`` and ``b``, or ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if limit == 1:
+        return _one_edit(a, b)
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        ca = a[i - 1]
+        for j in range(1, len(b) + 1):
+            cb = b[j - 1]
+            cost = ca != cb
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                d = min(d, prev2[j - 2] + 1)
+            cur[j] = d
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1] if prev[-1] <= limit else limit + 1
+
+class FuzzyIndex:
+    """Symmetric-delete index over the words of the trigger phrases.
+
+    ``phrases`` are ``(folded phrase, trigger index)`` pairs, as registered in the
+    exact matcher. ``scan`` skips phrases typed word for word as registered;
+    those are the automaton's job. ``real_words`` (folded) are never corrected:
+    someone who typed "contusion" or "strike" meant it.
+    """
+
+    def __init__(self, phrases: Iterable[Tuple[str, int]], real_words: Iterable[str] = ()):
+        self.real_words = frozenset(real_words)
+        words: Dict[str, int] = {}
+        self._phrases: Dict[int, List[Tuple[Tuple[int, ...], int, str]]] = {}
+        for phrase, idx in dict.fromkeys(phrases):
+            ids = tuple(words.setdefault(w, len(words)) for w in _WORD.findall(phrase))
+            if ids:
+                self._phrases.setdefault(ids[0], []).append((ids, idx, phrase))
+        self.words = list(words)
+        self._exact = words
+        self._index: Dict[str, List[int]] = {}
+        # first letter -> {text-word length: delete budget} to probe with, for the whole
+        # word and for prefixes of a longer word (trigger word plus an ending, "siez|ures")
+        self._whole: Dict[str, Dict[int, int]] = {}
+        self._extend: Dict[str, Dict[int, int]] = {}
+        for wid, word in enumerate(self.words):
+            k = max_edits(len(word))
+            if not k:
+                continue
+            for key in _keys(word, k):
+                self._index.setdefault(key, []).append(wid)
+            whole = self._whole.setdefault(word[0], {})
+            extend = self._extend.setdefault(word[0], {})
+            for j in range(len(word) - k, len(word) + k + 1):
+                whole[j] = max(whole.get(j, 0), k)
+                if j >= len(word):  # a shortened prefix would read "faith" as "faint"
+                    extend[j] = max(extend.get(j, 0), k)
+        self._cache: Dict[str, Dict[int, bool]] = {}
+
+    def state(self) -> dict:
+        """Plain-data form of the index (stored in the precompiled artifact with the matcher)."""
+        return {"words": self.words, "phrases": self._phrases, "index": self._index,
+                "whole": self._whole, "extend": self._extend, "real_words": sorted(self.real_words)}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "FuzzyIndex":
+        index = cls.__new__(cls)
+        index.words = state["words"]
+        index._exact = {word: wid for wid, word in enumerate(index.words)}
+        index._phrases, index._index = state["phrases"], state["index"]
+        index._whole, index._extend = state["whole"], state["extend"]
+        index.real_words = frozenset(state["real_words"])
+        index._cache = {}
+        return index
+
+    def _word_matches(self, token: str) -> Dict[int, bool]:
+        """Trigger words ``token`` stands for: word id -> True if ``token`` is that word exactly."""
+        found = self._cache.get(token)
+        if found is not None:
+            return found
+        found = {}
+        wid = self._exact.get(token)
+        if wid is not None:
+            found[wid] = True
+        n = len(token)
+        # a trigger word as typed is taken as is: "confusion" is not a misspelt "convulsion"
+        if not found and n >= MIN_FUZZY_LEN - 1 and token[0] in self._whole and token not in self.real_words:
+            whole = self._whole[token[0]]
+            probes = [(n, whole[n])] if n in whole else []
+            probes += [(j, k) for j, k in self._extend[token[0]].items() if j < n]
+            for j, k in probes:
+                prefix = token[:j]
+                if j < n and prefix in self.real_words:  # "strikes" is not "strokes"
+                    continue
+                for key in _keys(prefix, k):
+                    for wid in self._index.get(key, ()):
+                        if wid in found:
+                            continue
+                        word = self.words[wid]
+                        if j < n and j < len(word):
+                            continue
+                        budget = max_edits(len(word))
+                        if edit_distance(word[1:-1], prefix[1:-1], budget) <= budget:
+                            found[wid] = False
+        if len(self._cache) >= CACHE_SIZE:
+            self._cache.clear()
+        self._cache[token] = found
+        return found
+
+    def scan(self, folded: str) -> Iterator[Tuple[int, int, int, str]]:
+        """``(start, end, trigger index, phrase)`` for each typo-tolerant match in folded text."""
+        tokens = [(m.start(), m.end(), self._word_matches(m.group())) for m in _WORD.finditer(folded)]
+        for i, (start, _, first) in enumerate(tokens):
+            for wid in first:
+                for ids, idx, phrase in self._phrases.get(wid, ()):
+                    if i + len(ids) > len(tokens):
+                        continue
+                    exact = True
+                    for n, want in enumerate(ids):
+                        hit = tokens[i + n][2].get(want)
+                        if hit is None:
+                            break
+                        exact = exact and hit
+                    else:
+                        if not exact:
+                            yield start, tokens[i + len(ids) - 1][1], idx, phrase
+
+    def trigger_ids(self, folded: str) -> set:
+        return {idx for _, _, idx, _ in self.scan(folded)}
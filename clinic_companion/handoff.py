@@ -0,0 +1,306 @@
+"""Compact binary visit record for QR hand-off at triage.
+
+The copy/paste summary is ~1 KB of text, too much for a QR code that a phone
+scans reliably at a busy triage desk. ``encode`` packs the same visit into
+fixed-width fields plus its short texts, typically 60-200 bytes:
+
+    offset  size  field
+    0       1     format version (``VERSION``)
+    1       1     dictionary id: a hash of the choice lists, flag codes, text
+                  fields and preset dictionary below, so a payload is never
+                  read against different dictionaries
+    2       4     visit time, minutes since 1970-01-01 UTC
+    6       4     bits: caregiver, pregnant, fasting, one dictionary-coded
+                  field per select box (``INTAKE_CHOICES`` order, 2-3 bits
+                  each), one "cut short" bit per text field, and whether the
+                  text block is deflated
+    10      2     systolic BP (mmHg)
+    12      1     diastolic BP (mmHg)
+    13      1     pulse (bpm)
+    14      10    temperature, PCV, glucose, height and weight in tenths
+    24      4     red flags, one bit per ``FLAG_CODES`` entry; the top bit says
+                  other red flags (a site's own triggers) follow the texts
+    28      n     text fields: 1-byte length + UTF-8 each, then (top flag bit
+                  set) the other red-flag labels the same way, one per line;
+                  raw-deflated with a preset dictionary of common intake words
+                  when that is smaller
+    -2      2     low 16 bits of the CRC-32 of everything before
+
+``decode`` reverses it in a few microseconds. For the QR code itself the bytes
+are written as Base45 (``to_text``), which fits the QR alphanumeric mode that
+phone scanners read without trouble; ``qr_code`` draws it when the optional
+``segno`` package is installed.
+
+    python -m clinic_companion handoff encode visit.json --qr visit.svg
+    python -m clinic_companion handoff decode "CC1:..."
+"""
+from datetime import datetime, timezone
+from functools import lru_cache
+import json
+import struct
+import sys
+import zlib
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from .engine import INTAKE_CHOICES, INTAKE_DEFAULTS, INTAKE_LIMITS, SYMPTOM_TRIGGERS, VITAL_FLAGS, \
+    VisitRecord, red_flags
+
+VERSION = 2
+PREFIX = "CC1:"  # text form: PREFIX + Base45(payload)
+
+BOOL_FIELDS = ("caregiver", "pregnant", "fasting")
+ENUM_FIELDS = tuple(INTAKE_CHOICES)
+TENTHS_FIELDS = ("temp_c", "pcv", "glucose", "height_cm", "weight_kg")
+# text field -> most UTF-8 bytes kept (longer texts are cut short and marked as such)
+TEXT_FIELDS = {"patient_name": 40, "age": 12, "symptoms": 160, "main_concern": 80, "meds": 60, "supplements": 40}
+# Red flags by code: symptom triggers, then the vitals-based flags
+FLAG_CODES = tuple(phrase for phrase, _label in SYMPTOM_TRIGGERS) + tuple(VITAL_FLAGS)
+_FLAG_LABELS = [label for _phrase, label in SYMPTOM_TRIGGERS] + list(VITAL_FLAGS.values())
+_FLAG_BITS = {label: 1 << i for i, label in enumerate(_FLAG_LABELS)}
+_OTHER_FLAGS_BIT = 1 << 31  # labels not in FLAG_CODES are carried as text
+
+# Preset dictionary for the text block: deflate finds these words without having seen them first.
+ZDICT = (
+    b"paracetamol amlodipine lisinopril metformin insulin ibuprofen antibiotics amoxicillin artemether "
+    b"lumefantrine coartem ors zinc iron folic acid vitamin herbal agbo bitters "
+    b"malaria typhoid fever headache weakness dizziness cough catarrh body pain stomach pain "
+    b"chest pain difficulty breathing shortness of breath vomiting diarrhea fainting seizure convulsion "
+    b"bleeding black stool swelling rash tired cannot eat not eating weight loss since yesterday days weeks "
+    b"months years old worse better same high blood pressure sugar pregnant baby child "
+)
+
+_BITS = [(name, 1) for name in BOOL_FIELDS] + [(name, (len(INTAKE_CHOICES[name]) - 1).bit_length())
+                                                for name in ENUM_FIELDS]
+_CUT_SHIFT = sum(width for _name, width in _BITS)
+_DEFLATED_BIT = 1 << (_CUT_SHIFT + len(TEXT_FIELDS))
+_FIXED = struct.Struct(">BBIIHBB5HI")
+_CHOICE_CODES = {name: {choice: code for code, choice in enumerate(INTAKE_CHOICES[name])} for name in ENUM_FIELDS}
+_SHIFTS = [sum(width for _name, width in _BITS[:i]) for i in range(len(_BITS))]
+_BOOL_SHIFTS = [(name, shift) for (name, _width), shift in zip(_BITS, _SHIFTS) if name in BOOL_FIELDS]
+_ENUM_SHIFTS = [(name, shift, (1 << width) - 1, _CHOICE_CODES[name]) for (name, width), shift in zip(_BITS, _SHIFTS)
+                if name in ENUM_FIELDS]
+DICTIONARY_ID = zlib.crc32(repr((INTAKE_CHOICES, FLAG_CODES, TEXT_FIELDS)).encode("utf-8") + ZDICT) & 0xFF
+
+if _CUT_SHIFT + len(TEXT_FIELDS) + 1 > 32 or len(FLAG_CODES) > 31:  # pragma: no cover - guards future edits
+    raise RuntimeError("hand-off layout no longer fits its 32-bit fields; bump VERSION and widen them")
+
+class Handoff(NamedTuple):
+    record: dict  # intake fields (as ``normalize_intake`` returns them; texts possibly cut short)
+    flags: Tuple[str, ...]  # ``FLAG_CODES`` entries that were raised
+    recorded_at: datetime  # to the minute, UTC
+    cut_short: Tuple[str, ...]  # text fields that did not fit
+    other_flags: Tuple[str, ...] = ()  # red-flag labels outside ``FLAG_CODES`` (site triggers), as raised
+
+    @property
+    def flag_labels(self) -> List[str]:
+        return [_FLAG_LABELS[FLAG_CODES.index(code)] for code in self.flags] + list(self.other_flags)
+
+def _tenths(name: str, value: float) -> int:
+    if not 0 <= value <= INTAKE_LIMITS[name]:
+        raise ValueError(f"{name} must be between 0 and {INTAKE_LIMITS[name]}")
+    return int(round(value * 10))
+
+def _clip(text: str, limit: int) -> Tuple[bytes, bool]:
+    data = " ".join(text.split()).encode("utf-8")
+    if len(data) <= limit:
+        return data, False
+    return data[:limit].decode("utf-8", "ignore").rstrip().encode("utf-8"), True
+
+def encode(record, flags: Optional[Iterable[str]] = None, now: Optional[datetime] = None) -> bytes:
+    """Pack a visit (any intake record or ``VisitRecord``) into the hand-off bytes.
+
+    ``flags`` are the red-flag labels already computed for it (``assess_visit``'s
+    ``red_flags``); when omitted they are worked out here. Labels outside
+    ``FLAG_CODES`` are carried as text; ``ValueError`` if they do not fit in 255
+    bytes, since a hand-off must never drop a red flag.
+    """
+    v = VisitRecord.of(record)
+    if flags is None:
+        flags = red_flags(v.symptoms, v.sys_bp, v.dia_bp, v.temp_c, v.glucose, v.vomiting, v.diarrhea)
+    bits = 0
+    for name, shift in _BOOL_SHIFTS:
+        if getattr(v, name):
+            bits |= 1 << shift
+    for name, shift, _mask, codes in _ENUM_SHIFTS:
+        bits |= codes.get(getattr(v, name), 0) << shift
+    texts = []
+    for i, (name, limit) in enumerate(TEXT_FIELDS.items()):
+        data, cut = _clip(getattr(v, name), limit)
+        texts.append(bytes((len(data),)) + data)
+        bits |= cut << (_CUT_SHIFT + i)
+    flag_bits = 0
+    other = []
+    for label in flags:
+        if label in _FLAG_BITS:
+            flag_bits |= _FLAG_BITS[label]
+        elif label not in other:
+            other.append(label)
+    if other:
+        data = "\n".join(other).encode("utf-8")
+        if len(data) > 255:
+            raise ValueError("other red flags are too long for the hand-off code")
+        texts.append(bytes((len(data),)) + data)
+        flag_bits |= _OTHER_FLAGS_BIT
+    block = b"".join(texts)
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=ZDICT)
+    deflated = compressor.compress(block) + compressor.flush()
+    if len(deflated) < len(block):
+        block, bits = deflated, bits | _DEFLATED_BIT
+    for name in ("sys_bp", "dia_bp", "pulse"):
+        if not 0 <= getattr(v, name) <= INTAKE_LIMITS[name]:
+            raise ValueError(f"{name} must be between 0 and {INTAKE_LIMITS[name]}")
+    minutes = int((now or datetime.now(timezone.utc)).timestamp() // 60)
+    body = _FIXED.pack(VERSION, DICTIONARY_ID, minutes, bits, v.sys_bp, v.dia_bp, v.pulse,
+                       *(_tenths(name, getattr(v, name)) for name in TENTHS_FIELDS), flag_bits) + block
+    return body + struct.pack(">H", zlib.crc32(body) & 0xFFFF)
+
+def decode(payload: bytes) -> Handoff:
+    """Unpack hand-off bytes; ``ValueError`` if they are damaged or from another version."""
+    if len(payload) < _FIXED.size + 2:
+        raise ValueError("payload too short")
+    body, (crc,) = payload[:-2], struct.unpack(">H", payload[-2:])
+    if zlib.crc32(body) & 0xFFFF != crc:
+        raise ValueError("checksum mismatch (damaged or not a hand-off payload)")
+    version, dictionary_id, minutes, bits, sys_bp, dia_bp, pulse, *tenths, flag_bits = _FIXED.unpack_from(body)
+    if version != VERSION:
+        raise ValueError(f"unsupported hand-off version {version}")
+    if dictionary_id != DICTIONARY_ID:
+        raise ValueError("payload was made with different choice lists or flag codes")
+    record = dict(INTAKE_DEFAULTS)
+    record.update(sys_bp=sys_bp, dia_bp=dia_bp, pulse=pulse)
+    record.update(zip(TENTHS_FIELDS, (t / 10 for t in tenths)))
+    for name, shift in _BOOL_SHIFTS:
+        record[name] = bool(bits >> shift & 1)
+    try:
+        for name, shift, mask, _codes in _ENUM_SHIFTS:
+            record[name] = INTAKE_CHOICES[name][bits >> shift & mask]
+    except IndexError:
+        raise ValueError(f"unknown code for {name}") from None
+    block = body[_FIXED.size:]
+    if bits & _DEFLATED_BIT:
+        try:
+            block = zlib.decompressobj(-15, zdict=ZDICT).decompress(block)
+        except zlib.error:
+            raise ValueError("text block is not valid deflate data") from None
+    pos, cut_short = 0, []
+    try:
+        for i, name in enumerate(TEXT_FIELDS):
+            end = pos + 1 + block[pos]
+            record[name] = block[pos + 1:end].decode("utf-8")
+            pos = end
+            if bits >> (_CUT_SHIFT + i) & 1:
+                cut_short.append(name)
+        other = ()
+        if flag_bits & _OTHER_FLAGS_BIT:
+            other = tuple(block[pos + 1:pos + 1 + block[pos]].decode("utf-8").split("\n"))
+    except (IndexError, UnicodeDecodeError):
+        raise ValueError("text block is damaged") from None
+    flags = tuple(code for i, code in enumerate(FLAG_CODES) if flag_bits >> i & 1)
+    recorded_at = datetime.fromtimestamp(minutes * 60, timezone.utc)
+    return Handoff(record, flags, recorded_at, tuple(cut_short), other)
+
+# ---------------------------
+# Text form and QR code
+# ---------------------------
+BASE45 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+_BASE45_VALUES = {c: i for i, c in enumerate(BASE45)}
+
+def base45_encode(data: bytes) -> str:
+    """RFC 9285 Base45: every 2 bytes as 3 characters of the QR alphanumeric set."""
+    out = []
+    for i in range(0, len(data) - 1, 2):
+        n = data[i] * 256 + data[i + 1]
+        n, c = divmod(n, 45)
+        e, d = divmod(n, 45)
+        out += (BASE45[c], BASE45[d], BASE45[e])
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        out += (BASE45[c], BASE45[d])
+    return "".join(out)
+
+def base45_decode(text: str) -> bytes:
+    try:
+        values = [_BASE45_VALUES[c] for c in text]
+    except KeyError as exc:
+        raise ValueError(f"not a Base45 character: {exc.args[0]!r}") from None
+    out = bytearray()
+    for i in range(0, len(values), 3):
+        chunk = values[i:i + 3]
+        n = sum(v * 45 ** k for k, v in enumerate(chunk))
+        if len(chunk) == 3:
+            if n > 0xFFFF:
+                raise ValueError("invalid Base45 group")
+            out += bytes(divmod(n, 256))
+        elif len(chunk) == 2 and n <= 0xFF:
+            out.append(n)
+        else:
+            raise ValueError("invalid Base45 length")
+    return bytes(out)
+
+def to_text(payload: bytes) -> str:
+    """The QR content: ``PREFIX`` + Base45 of the payload."""
+    return PREFIX + base45_encode(payload)
+
+def from_text(text: str) -> Handoff:
+    text = text.strip()
+    if not text.startswith(PREFIX):
+        raise ValueError(f"hand-off text must start with {PREFIX!r}")
+    return decode(base45_decode(text[len(PREFIX):]))
+
+def qr_code(data):
+    """A ``segno`` QR code of hand-off bytes or their ``to_text`` form (needs the optional ``segno`` package)."""
+    try:
+        import segno
+    except ImportError:
+        raise ImportError("QR output needs the optional 'segno' package: pip install segno") from None
+    return segno.make(data if isinstance(data, str) else to_text(data), error="m", mode="alphanumeric", micro=False)
+
+@lru_cache(maxsize=None)
+def qr_available() -> bool:
+    from importlib.util import find_spec
+
+    return find_spec("segno") is not None
+
+# ---------------------------
+# CLI entry point
+# ---------------------------
+def run(args) -> int:
+    if args.action == "decode":
+        text = args.input if args.input != "-" else sys.stdin.read()
+        try:
+            handoff = from_text(text)
+        except ValueError as exc:
+            print(f"Cannot read hand-off code: {exc}", file=sys.stderr)
+            return 1
+        out = {**handoff.record, "red_flags": handoff.flag_labels,
+               "recorded_at": handoff.recorded_at.isoformat(), "cut_short": list(handoff.cut_short)}
+        print(json.dumps(out, ensure_ascii=False, indent=1))
+        return 0
+    source = open(args.input, encoding="utf-8") if args.input != "-" else sys.stdin
+    try:
+        record = json.load(source)
+        if not isinstance(record, dict):
+            raise ValueError(f"expected a JSON object, got {type(record).__name__}")
+        payload = encode(record)
+    except ValueError as exc:  # bad JSON, or a value the code cannot carry
+        print(f"Cannot encode hand-off code: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    print(to_text(payload))
+    if args.qr:
+        qr = qr_code(payload)
+        qr.save(args.qr, scale=4, border=4)
+        print(f"{len(payload)} bytes, QR version {qr.version} -> {args.qr}", file=sys.stderr)
+    return 0
+
+def add_parser(subparsers):
+    p = subparsers.add_parser("handoff", help="Encode a visit as a compact QR hand-off code, or decode one",
+                              description="Packs an intake record into a few hundred bytes for a QR code.")
+    p.add_argument("action", choices=("encode", "decode"))
+    p.add_argument("input", nargs="?", default="-",
+                   help="encode: intake JSON file; decode: the CC1: text (default: stdin)")
+    p.add_argument("--qr", help="encode: also write the QR code to this .svg/.png file (needs segno)")
+    p.set_defaults(func=run)
+    return p
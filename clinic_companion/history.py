@@ -0,0 +1,358 @@
+"""Longitudinal visit history in an embedded SQLite database.
+
+Visits are appended (never updated) to ``visits``, indexed on
+``(patient_key, ts)``. Alongside each insert, per-patient running aggregates
+(count, sum, min, max and the last few values) are updated in ``metric_stats``
+in the same transaction, so trends for a returning patient come from a single
+primary-key lookup instead of a scan over their whole history.
+
+Patients are matched on an explicit patient ID (clinic card or phone number)
+together with name and sex, never on the name alone: two people with the same
+name must not share a trend line. The key stored is an HMAC of these under a
+per-deployment secret (``CLINIC_HISTORY_SALT``), so it cannot be reversed with a
+list of common names. Each row also carries a visit id, one per app session and
+patient, so re-submitting a corrected form replaces that visit instead of adding
+another data point. The store is opt-in: set ``CLINIC_HISTORY_DB`` to a file
+path and ``CLINIC_HISTORY_SALT`` to a long random secret to enable it in the app.
+"""
+from datetime import datetime
+from functools import lru_cache
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from .engine import VisitRecord, insert_section
+from .i18n import N_, translator
+
+WINDOW = 3  # values kept for the rolling mean / direction ("over the last three visits")
+SALT_ENV = "CLINIC_HISTORY_SALT"
+MIN_SALT = 16  # characters; shorter secrets are refused
+
+logger = logging.getLogger("clinic_companion.history")
+
+# metric -> (label, unit, value format)
+METRICS = {
+    "sys_bp": (N_("BP (systolic)"), "mmHg", "{:.0f}"),
+    "dia_bp": (N_("BP (diastolic)"), "mmHg", "{:.0f}"),
+    "pulse": (N_("Pulse"), "bpm", "{:.0f}"),
+    "temp_c": (N_("Temperature"), "°C", "{:.1f}"),
+    "pcv": (N_("PCV"), "%", "{:.1f}"),
+    "glucose": (N_("Glucose"), "mmol/L", "{:.1f}"),
+    "bmi": (N_("BMI"), "kg/m²", "{:.1f}"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS visits (
+    id          INTEGER PRIMARY KEY,
+    patient_key TEXT NOT NULL,
+    ts          REAL NOT NULL,
+    visit_id    TEXT,
+    sys_bp      REAL,
+    dia_bp      REAL,
+    pulse       REAL,
+    temp_c      REAL,
+    pcv         REAL,
+    glucose     REAL,
+    bmi         REAL
+);
+CREATE INDEX IF NOT EXISTS visits_patient_ts ON visits (patient_key, ts);
+CREATE INDEX IF NOT EXISTS visits_ts ON visits (ts);
+CREATE TABLE IF NOT EXISTS metric_stats (
+    patient_key TEXT NOT NULL,
+    metric      TEXT NOT NULL,
+    n           INTEGER NOT NULL,
+    total       REAL NOT NULL,
+    min         REAL NOT NULL,
+    max         REAL NOT NULL,
+    recent      TEXT NOT NULL,
+    last_ts     REAL NOT NULL,
+    PRIMARY KEY (patient_key, metric)
+) WITHOUT ROWID;
+"""
+# After the visit_id migration (stores created before it lack the column)
+VISIT_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS visits_visit_id ON visits (visit_id)"
+
+class Trend(NamedTuple):
+    metric: str
+    count: int          # visits with this value recorded
+    last: float
+    previous: Optional[float]
+    delta: Optional[float]  # last - previous
+    rolling_mean: float     # mean of the last WINDOW values
+    minimum: float
+    maximum: float
+    mean: float             # mean over all visits
+    direction: Optional[str]  # "rising" / "falling" over the last WINDOW visits, else None
+    recent: tuple           # the last WINDOW values, oldest first
+
+def patient_key(record, patient_id: str, salt: str) -> Optional[str]:
+    """Keyed hash of patient ID + name + sex, or None unless both an ID and a name were given.
+
+    Case, spacing and dashes in the ID are ignored, as are case and spacing in the name.
+    """
+    v = VisitRecord.of(record)
+    name = " ".join(v.patient_name.casefold().split())
+    pid = "".join((patient_id or "").casefold().replace("-", "").split())
+    if not name or not pid:
+        return None
+    message = f"{pid}|{name}|{v.sex}".encode("utf-8")
+    return hmac.new(salt.encode("utf-8"), message, hashlib.sha256).hexdigest()[:32]
+
+def visit_values(record) -> Dict[str, float]:
+    """The metrics provided on this visit (0 / blank means not measured)."""
+    v = VisitRecord.of(record)
+    values = {name: float(getattr(v, name)) for name in ("pulse", "temp_c", "pcv", "glucose") if getattr(v, name) > 0}
+    if v.has_bp:
+        values["sys_bp"], values["dia_bp"] = float(v.sys_bp), float(v.dia_bp)
+    if v.bmi is not None:
+        values["bmi"] = float(v.bmi)
+    return values
+
+def _direction(recent: List[float]) -> Optional[str]:
+    if len(recent) < WINDOW:
+        return None
+    steps = [b - a for a, b in zip(recent, recent[1:])]
+    if all(s > 0 for s in steps):
+        return "rising"
+    if all(s < 0 for s in steps):
+        return "falling"
+    return None
+
+class HistoryStore:
+    """Append-only visit history with incrementally maintained per-metric trends."""
+
+    def __init__(self, path: str, salt: str):
+        import sqlite3  # only when history is enabled
+
+        if len(salt) < MIN_SALT:
+            raise ValueError(f"history salt must be at least {MIN_SALT} characters")
+        self.path, self.salt = path, salt
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(visits)")}
+            if "visit_id" not in columns:
+                self._conn.execute("ALTER TABLE visits ADD COLUMN visit_id TEXT")
+            self._conn.execute(VISIT_INDEX)
+
+    def patient_key(self, record, patient_id: str) -> Optional[str]:
+        return patient_key(record, patient_id, self.salt)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ----- writes -----
+    def record_visit(self, key: str, values: Dict[str, float], ts: Optional[float] = None,
+                     visit_id: Optional[str] = None) -> None:
+        self.record_visits([(key, values, ts, visit_id)])
+
+    def record_visits(self, visits: Iterable[tuple]) -> int:
+        """Store ``(patient_key, values, ts, visit_id)`` tuples in one transaction; returns the count.
+
+        A visit whose ``visit_id`` is already stored replaces it (a corrected
+        re-submit); ``None`` always appends.
+        """
+        count = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for key, values, ts, visit_id in visits:
+                    ts = time.time() if ts is None else ts
+                    if visit_id is not None and self._replace(key, values, ts, visit_id):
+                        count += 1
+                        continue
+                    self._append(key, values, ts, visit_id)
+                    count += 1
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def _insert(self, key: str, values: Dict[str, float], ts: float, visit_id: Optional[str]) -> None:
+        self._conn.execute(
+            "INSERT INTO visits (patient_key, ts, visit_id, sys_bp, dia_bp, pulse, temp_c, pcv, glucose, bmi) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, ts, visit_id, *(values.get(name) for name in METRICS)),
+        )
+
+    def _replace(self, key: str, values: Dict[str, float], ts: float, visit_id: str) -> bool:
+        """Swap in a re-submitted visit and rebuild the patient's aggregates; False if it is new."""
+        conn = self._conn
+        row = conn.execute("SELECT patient_key, ts FROM visits WHERE visit_id = ?", (visit_id,)).fetchone()
+        if row is None:
+            return False
+        conn.execute("DELETE FROM visits WHERE visit_id = ?", (visit_id,))
+        self._insert(key, values, row[1], visit_id)  # keeps its place in the patient's timeline
+        for stale in {row[0], key}:
+            self._rebuild(stale)
+        return True
+
+    def _rebuild(self, key: str) -> None:
+        """Recompute ``metric_stats`` for one patient from their visits (after a replacement)."""
+        conn = self._conn
+        conn.execute("DELETE FROM metric_stats WHERE patient_key = ?", (key,))
+        rows = conn.execute(
+            f"SELECT ts, {', '.join(METRICS)} FROM visits WHERE patient_key = ? ORDER BY ts, id", (key,)
+        ).fetchall()
+        for metric_index, metric in enumerate(METRICS, start=1):
+            readings = [(row[0], row[metric_index]) for row in rows if row[metric_index] is not None]
+            if not readings:
+                continue
+            values = [value for _ts, value in readings]
+            conn.execute(
+                "INSERT INTO metric_stats (patient_key, metric, n, total, min, max, recent, last_ts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, metric, len(values), sum(values), min(values), max(values),
+                 json.dumps(values[-WINDOW:]), readings[-1][0]),
+            )
+
+    def _append(self, key: str, values: Dict[str, float], ts: float, visit_id: Optional[str] = None) -> None:
+        conn = self._conn
+        self._insert(key, values, ts, visit_id)
+        for metric, value in values.items():
+            row = conn.execute(
+                "SELECT n, total, min, max, recent FROM metric_stats WHERE patient_key = ? AND metric = ?",
+                (key, metric),
+            ).fetchone()
+            if row is None:
+                n, total, lo, hi, recent = 1, value, value, value, [value]
+            else:
+                n, total, lo, hi, recent = row
+                n, total, lo, hi = n + 1, total + value, min(lo, value), max(hi, value)
+                recent = (json.loads(recent) + [value])[-WINDOW:]
+            conn.execute(
+                "INSERT OR REPLACE INTO metric_stats (patient_key, metric, n, total, min, max, recent, last_ts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, metric, n, total, lo, hi, json.dumps(recent), ts),
+            )
+
+    # ----- reads -----
+    def trends(self, key: str) -> Dict[str, Trend]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT metric, n, total, min, max, recent FROM metric_stats WHERE patient_key = ?", (key,)
+            ).fetchall()
+        out = {}
+        for metric, n, total, lo, hi, recent in rows:
+            recent = json.loads(recent)
+            previous = recent[-2] if len(recent) > 1 else None
+            out[metric] = Trend(
+                metric=metric, count=n, last=recent[-1], previous=previous,
+                delta=None if previous is None else recent[-1] - previous,
+                rolling_mean=sum(recent) / len(recent), minimum=lo, maximum=hi, mean=total / n,
+                direction=_direction(recent), recent=tuple(recent),
+            )
+        return out
+
+    def series(self, key: str, metric: str, limit: int = 20) -> List[tuple]:
+        """The last ``limit`` ``(ts, value)`` readings of one metric, oldest first."""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT ts, {metric} FROM visits WHERE patient_key = ? AND {metric} IS NOT NULL "
+                "ORDER BY ts DESC LIMIT ?",
+                (key, limit),
+            ).fetchall()
+        return rows[::-1]
+
+    def visit_count(self, key: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM visits WHERE patient_key = ?", (key,)).fetchone()[0]
+
+# ---------------------------
+# Presentation
+# ---------------------------
+_DIRECTIONS = {
+    "rising": N_("Rising over the last {n} visits ({values} {unit})"),
+    "falling": N_("Falling over the last {n} visits ({values} {unit})"),
+}
+
+def trend_text(trend: Trend, lang: str = "en") -> str:
+    """One line describing a metric's trend, e.g. for a vitals card, in ``lang``."""
+    _ = translator(lang)
+    label, unit, fmt = METRICS[trend.metric]
+    if trend.count < 2:
+        return _("First recorded reading.")
+    if trend.direction:
+        values = " → ".join(fmt.format(x) for x in trend.recent)
+        text = _(_DIRECTIONS[trend.direction]).format(n=WINDOW, values=values, unit=unit)
+    elif fmt.format(trend.delta) in (fmt.format(0), fmt.format(-0.0)):
+        text = _("Unchanged since last visit")
+    else:
+        delta = f"{'+' if trend.delta > 0 else ''}{fmt.format(trend.delta)}"
+        text = _("{delta} {unit} since last visit").format(delta=delta, unit=unit)
+    return _("{trend}; average {mean}, range {low}–{high} over {count} visits.").format(
+        trend=text, mean=fmt.format(trend.mean), low=fmt.format(trend.minimum),
+        high=fmt.format(trend.maximum), count=trend.count)
+
+def trend_lines(trends: Dict[str, Trend], lang: str = "en") -> List[str]:
+    _ = translator(lang)
+    lines = []
+    for metric, (label, _unit, _fmt) in METRICS.items():
+        trend = trends.get(metric)
+        if trend is not None and trend.count > 1:
+            lines.append(f"- {_(label)}: {trend_text(trend, lang)}")
+    return lines
+
+def summary_with_trends(summary: str, trends: Dict[str, Trend], lang: str = "en") -> str:
+    """Insert a trends block before the "Goal for visit" section of a summary built in ``lang``."""
+    lines = trend_lines(trends, lang)
+    if not lines:
+        return summary
+    _ = translator(lang)
+    return insert_section(summary, "\n".join([_("Trends (this and earlier visits):"), *lines]))
+
+# ---------------------------
+# App integration
+# ---------------------------
+_store = None
+_store_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def _salt_missing() -> None:
+    logger.error("CLINIC_HISTORY_DB is set but %s is missing or shorter than %d characters; "
+                 "visit history is off", SALT_ENV, MIN_SALT)
+
+def store_from_env() -> Optional[HistoryStore]:
+    """The process-wide store at ``CLINIC_HISTORY_DB``, or None when history is off (or has no salt)."""
+    global _store
+    path = os.environ.get("CLINIC_HISTORY_DB")
+    if not path:
+        return None
+    salt = os.environ.get(SALT_ENV, "")
+    if len(salt) < MIN_SALT:
+        _salt_missing()
+        return None
+    with _store_lock:
+        if _store is None or _store.path != path or _store.salt != salt:
+            _store = HistoryStore(path, salt)
+        return _store
+
+def record_and_trend(store: HistoryStore, record, patient_id: str, session: Optional[str] = None,
+                     now: Optional[datetime] = None) -> Dict[str, Trend]:
+    """Record this visit for the identified patient and return their updated trends.
+
+    Returns {} without recording when the patient ID or name is missing. With a
+    ``session`` token, later submits for the same patient in that session replace
+    the visit instead of adding one.
+    """
+    visit = VisitRecord.of(record)
+    key = store.patient_key(visit, patient_id)
+    if key is None:
+        return {}
+    values = visit_values(visit)
+    if values:
+        visit_id = f"{session}:{key}" if session else None
+        store.record_visit(key, values, (now or datetime.now()).timestamp(), visit_id)
+    return store.trends(key)
@@ -0,0 +1,270 @@
+"""Translations of the user-facing text (Pidgin, Yoruba, Igbo, Hausa).
+
+English is the source language: every message is looked up by its English text.
+Translations are edited as gettext ``.po`` files in ``locales/<lang>/LC_MESSAGES/``
+and compiled to binary ``.mo`` catalogs next to them::
+
+    python -m clinic_companion catalogs             # compile every .po
+    python -m clinic_companion catalogs --extract   # refresh locales/clinic.pot first
+
+Only the active language's catalog is read, on first use, and kept for the life
+of the process (``catalog`` is cached), so switching language in one session
+does not re-read or re-parse anything for the others. A ``.mo`` records a CRC of
+the ``.po`` it came from; if the ``.po`` has been edited since, it is compiled in
+memory instead, so a stale catalog never shows outdated text. Messages without a
+translation are shown in English.
+"""
+from functools import lru_cache
+import os
+from pathlib import Path
+import struct
+import sys
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+LANGUAGES = {
+    "en": "English",
+    "pcm": "Naijá (Pidgin)",
+    "yo": "Yorùbá",
+    "ig": "Igbo",
+    "ha": "Hausa",
+}
+DEFAULT_LANGUAGE = "en"
+DOMAIN = "clinic"
+LOCALE_DIR = Path(__file__).with_name("locales")
+
+def N_(message: str) -> str:
+    """Mark ``message`` for extraction without translating it (translated where it is shown)."""
+    return message
+
+def language_from(value: Optional[str]) -> str:
+    """A supported language code from ``?lang=`` / ``CLINIC_LANG`` (English otherwise)."""
+    value = (value or os.environ.get("CLINIC_LANG") or DEFAULT_LANGUAGE).strip().lower()
+    return value if value in LANGUAGES else DEFAULT_LANGUAGE
+
+def catalog_paths(lang: str) -> Tuple[Path, Path]:
+    base = LOCALE_DIR / lang / "LC_MESSAGES" / DOMAIN
+    return base.with_suffix(".po"), base.with_suffix(".mo")
+
+# ---------------------------
+# Runtime lookup
+# ---------------------------
+@lru_cache(maxsize=None)
+def catalog(lang: str):
+    """The ``gettext`` translations object for ``lang``, loaded once per process."""
+    import gettext
+    import io
+
+    if lang == DEFAULT_LANGUAGE or lang not in LANGUAGES:
+        return gettext.NullTranslations()
+    po_path, mo_path = catalog_paths(lang)
+    po_bytes = po_path.read_bytes() if po_path.exists() else None
+    try:
+        with open(mo_path, "rb") as f:
+            translations = gettext.GNUTranslations(f)
+        fresh = po_bytes is None or translations.info().get("x-source-crc32") == str(zlib.crc32(po_bytes))
+    except (OSError, UnicodeDecodeError):
+        translations, fresh = None, False
+    if fresh:
+        return translations
+    if po_bytes is None:
+        return gettext.NullTranslations()
+    import logging  # deferred like gettext: only this fallback logs
+
+    logging.getLogger(__name__).warning(
+        "%s is missing or older than %s; compiling in memory (run `python -m clinic_companion catalogs`)",
+        mo_path.name, po_path)
+    return gettext.GNUTranslations(io.BytesIO(compile_po(po_bytes)))
+
+@lru_cache(maxsize=None)
+def translator(lang: str) -> Callable[[str], str]:
+    """``gettext`` function for ``lang``; English returns its argument unchanged."""
+    if lang == DEFAULT_LANGUAGE or lang not in LANGUAGES:
+        return N_  # no catalog (and no gettext import) for the source language
+    lookup = catalog(lang).gettext
+
+    def _(message: str) -> str:
+        return lookup(message) if message else message  # gettext("") is the catalog header
+
+    return _
+
+# ---------------------------
+# .po -> .mo compiler (what ``msgfmt`` does, for the subset these catalogs use)
+# ---------------------------
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\"}
+
+def _unquote(text: str, where: str) -> str:
+    text = text.strip()
+    if len(text) < 2 or text[0] != '"' or text[-1] != '"':
+        raise ValueError(f"{where}: expected a quoted string, got {text!r}")
+    out, chars = [], iter(text[1:-1])
+    for ch in chars:
+        if ch == "\\":
+            nxt = next(chars, "")
+            out.append(_ESCAPES.get(nxt, "\\" + nxt))
+        else:
+            out.append(ch)
+    return "".join(out)
+
+def parse_po(text: str, name: str = "<po>", untranslated: bool = False) -> Dict[str, str]:
+    """msgid -> msgstr for every translated, non-fuzzy entry (the header is msgid ``""``).
+
+    With ``untranslated`` empty entries are kept too (for reading the ``.pot`` template).
+    """
+    messages: Dict[str, str] = {}
+    entry: Dict[str, str] = {}
+    field = None
+    fuzzy = False
+
+    def flush():
+        nonlocal entry, fuzzy, field
+        if "msgid" in entry and (entry.get("msgstr") or untranslated) and not (fuzzy and entry["msgid"]):
+            messages[entry["msgid"]] = entry["msgstr"]
+        entry, fuzzy, field = {}, False, None
+
+    for lineno, raw in enumerate(text.splitlines(), start=1):
+        line = raw.strip()
+        where = f"{name}:{lineno}"
+        if not line:
+            continue
+        if line.startswith("#"):
+            if field == "msgstr":
+                flush()
+            if line.startswith("#,") and "fuzzy" in line:
+                fuzzy = True
+            continue
+        keyword, _, rest = line.partition(" ")
+        if keyword in ("msgid", "msgstr"):
+            if keyword == "msgid" and field == "msgstr":
+                flush()
+            field = keyword
+            entry[field] = _unquote(rest, where)
+        elif line.startswith('"') and field:
+            entry[field] += _unquote(line, where)
+        else:
+            raise ValueError(f"{where}: unsupported line {raw!r} (only msgid/msgstr entries are used)")
+    flush()
+    return messages
+
+def mo_bytes(messages: Dict[str, str]) -> bytes:
+    """GNU ``.mo`` file for ``messages`` (little-endian, no hash table)."""
+    keys = sorted(messages)
+    ids = [k.encode("utf-8") for k in keys]
+    strs = [messages[k].encode("utf-8") for k in keys]
+    n = len(keys)
+    start = 7 * 4 + 16 * n  # header, then both (length, offset) tables
+    offsets, blob = [], b""
+    for data in ids + strs:
+        offsets.append((len(data), start + len(blob)))
+        blob += data + b"\0"
+    header = struct.pack("<7I", 0x950412DE, 0, n, 7 * 4, 7 * 4 + 8 * n, 0, 0)
+    tables = b"".join(struct.pack("<2I", length, offset) for length, offset in offsets)
+    return header + tables + blob
+
+def compile_po(po_bytes: bytes, name: str = "<po>") -> bytes:
+    """Compile ``.po`` source to ``.mo``, stamping the source CRC into the header."""
+    messages = parse_po(po_bytes.decode("utf-8"), name)
+    header = "".join(f"{line}\n" for line in messages.get("", "").splitlines()
+                     if not line.lower().startswith("x-source-crc32:"))
+    if "charset=" not in header:
+        header += "Content-Type: text/plain; charset=UTF-8\n"
+    messages[""] = header + f"X-Source-CRC32: {zlib.crc32(po_bytes)}\n"
+    return mo_bytes(messages)
+
+def compile_catalogs(langs: Iterable[str] = ()) -> List[Tuple[Path, int, int]]:
+    """Compile each language's ``.po``; returns (mo path, translated, total in template)."""
+    template = set()
+    if _template_path().exists():
+        template = set(parse_po(_template_path().read_text(encoding="utf-8"), untranslated=True))
+    template.discard("")
+    out = []
+    for lang in langs or [code for code in LANGUAGES if code != DEFAULT_LANGUAGE]:
+        po_path, mo_path = catalog_paths(lang)
+        if not po_path.exists():
+            continue
+        po_bytes = po_path.read_bytes()
+        data = compile_po(po_bytes, str(po_path))
+        tmp = mo_path.with_suffix(".mo.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, mo_path)
+        translated = set(parse_po(po_bytes.decode("utf-8"))) - {""}
+        out.append((mo_path, len(translated & template) if template else len(translated), len(template)))
+    catalog.cache_clear()
+    translator.cache_clear()
+    return out
+
+# ---------------------------
+# Message extraction (template for translators)
+# ---------------------------
+def _template_path() -> Path:
+    return LOCALE_DIR / f"{DOMAIN}.pot"
+
+def _source_messages(paths: Iterable[Path]) -> List[str]:
+    """String literals passed to ``_()`` or ``N_()`` in the given Python files, in source order."""
+    import ast
+
+    found = []
+    for path in paths:
+        calls = []
+        for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"), str(path))):
+            if not (isinstance(node, ast.Call) and node.args and isinstance(node.args[0], ast.Constant)
+                    and isinstance(node.args[0].value, str)):
+                continue
+            name = getattr(node.func, "id", None) or getattr(node.func, "attr", None)  # _(), N_(), i18n.N_()
+            if name in ("_", "N_"):
+                calls.append((node.lineno, node.col_offset, node.args[0].value))
+        found += [message for _, _, message in sorted(calls)]
+    return found
+
+def _data_messages() -> List[str]:
+    """Texts that live in data tables rather than calls: range labels, rule texts, form choices."""
+    from .engine import INTAKE_CHOICES
+    from .ranges import RANGE_TABLES
+    from .rules import RULES
+
+    found = [band[0] for rows in RANGE_TABLES.values() for row in rows for band in row["bands"]]
+    found += [r.text for r in RULES]
+    found += [choice for choices in INTAKE_CHOICES.values() for choice in choices if choice]
+    return found
+
+def _po_quote(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"').replace("\t", "\\t")
+    if "\n" not in escaped:
+        return f'"{escaped}"'
+    parts = escaped.split("\n")
+    lines = [f'"{p}\\n"' for p in parts[:-1]] + ([f'"{parts[-1]}"'] if parts[-1] else [])
+    return '""\n' + "\n".join(lines)
+
+def extract(sources: Iterable[Path] = ()) -> Path:
+    """Write ``locales/clinic.pot`` with every message from the app and the engine's data."""
+    root = Path(__file__).resolve().parent
+    sources = list(sources) or [root.parent / "app.py", root.parent / "admin_page.py", *sorted(root.glob("*.py"))]
+    messages = list(dict.fromkeys(_source_messages([p for p in sources if p.exists()]) + _data_messages()))
+    lines = ['msgid ""', 'msgstr ""', '"Content-Type: text/plain; charset=UTF-8\\n"', ""]
+    for message in messages:
+        lines += [f"msgid {_po_quote(message)}", 'msgstr ""', ""]
+    path = _template_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return path
+
+# ---------------------------
+# CLI entry point
+# ---------------------------
+def run(args) -> int:
+    if args.extract:
+        path = extract()
+        print(f"Wrote {path}", file=sys.stderr)
+    for mo_path, translated, total in compile_catalogs(args.lang or ()):
+        coverage = f"{translated}/{total} messages" if total else f"{translated} messages"
+        print(f"Wrote {mo_path.relative_to(LOCALE_DIR)} ({coverage})", file=sys.stderr)
+    return 0
+
+def add_parser(subparsers):
+    p = subparsers.add_parser("catalogs", help="Compile translation catalogs (.po -> .mo)",
+                              description="Compile locales/<lang>/LC_MESSAGES/clinic.po into binary .mo catalogs.")
+    p.add_argument("--lang", action="append", choices=[c for c in LANGUAGES if c != DEFAULT_LANGUAGE],
+                   help="only this language (repeatable)")
+    p.add_argument("--extract", action="store_true", help="rewrite the clinic.pot template from the sources first")
+    p.set_defaults(func=run)
+    return p
@@ -0,0 +1,254 @@
+"""Lightweight in-process metrics for the results flow.
+
+Each results stage is timed (wall clock and thread CPU time) into histograms,
+red-flag hits are counted per trigger and hydration results per risk level.
+Everything is exported two ways, both opt-in through environment variables:
+
+- ``CLINIC_METRICS_PORT``: serve Prometheus text format on ``http://127.0.0.1:<port>/metrics``
+- ``CLINIC_METRICS_LOG=1``: write one JSON line per submission to stderr
+
+No third-party client library is needed; the registry below is small and
+thread-safe (Streamlit runs each session on its own thread).
+"""
+from contextlib import contextmanager
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from .engine import SYMPTOM_TRIGGERS, VITAL_FLAGS
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+logger = logging.getLogger("clinic_companion.metrics")
+
+# red-flag label -> short trigger name used as the metric label
+FLAG_KEYS = {label: key for key, label in SYMPTOM_TRIGGERS}
+FLAG_KEYS.update({label: key for key, label in VITAL_FLAGS.items()})
+
+# ---------------------------
+# Registry
+# ---------------------------
+def _labels_text(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name, self.help = name, help_text
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def expose(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels_text(key)} {value:g}"
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=STAGE_BUCKETS):
+        self.name, self.help = name, help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self, **labels) -> Optional[dict]:
+        series = self._series.get(tuple(sorted(labels.items())))
+        if series is None:
+            return None
+        return {"sum": series[-2], "count": series[-1]}
+
+    def expose(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                yield f"{self.name}_bucket{_labels_text(key + (('le', f'{bound:g}'),))} {count}"
+            yield f"{self.name}_bucket{_labels_text(key + (('le', '+Inf'),))} {series[-1]}"
+            yield f"{self.name}_sum{_labels_text(key)} {series[-2]:.6f}"
+            yield f"{self.name}_count{_labels_text(key)} {series[-1]}"
+
+STAGE_SECONDS = Histogram("clinic_stage_seconds", "Wall-clock time spent in each results stage.")
+STAGE_CPU_SECONDS = Histogram("clinic_stage_cpu_seconds", "Thread CPU time spent in each results stage.")
+SUBMISSIONS = Counter("clinic_submissions_total", "Visits submitted (reruns not counted).")
+RED_FLAGS = Counter("clinic_red_flags_total", "Red flags shown on submitted visits, by trigger.")
+HYDRATION = Counter("clinic_hydration_risk_total", "Hydration risk results of submitted visits, by level.")
+
+METRICS = [STAGE_SECONDS, STAGE_CPU_SECONDS, SUBMISSIONS, RED_FLAGS, HYDRATION]
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.expose())
+    lines.extend(_cache_lines())
+    lines.extend(_session_lines())
+    lines.extend(_print_lines())
+    lines.extend(_audit_lines())
+    lines.extend(_rules_lines())
+    return "\n".join(lines) + "\n"
+
+def _cache_lines() -> Iterable[str]:
+    from .cache import RESULT_CACHE
+    stats = RESULT_CACHE.stats()
+    for name, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("size", "gauge")):
+        metric = f"clinic_result_cache_{name}" + ("_total" if kind == "counter" else "")
+        yield f"# TYPE {metric} {kind}"
+        yield f"{metric} {stats[name]}"
+
+def _session_lines() -> Iterable[str]:
+    from .sessions import MONITOR
+    return MONITOR.prometheus_lines() if MONITOR.sweeps else ()
+
+def _print_lines() -> Iterable[str]:
+    printable = sys.modules.get("clinic_companion.printable")  # only once the app has used it
+    return printable.PRINTS.prometheus_lines() if printable is not None else ()
+
+def _audit_lines() -> Iterable[str]:
+    audit = sys.modules.get("clinic_companion.audit")
+    log = audit._log if audit is not None else None  # only once the app has enabled it
+    return log.prometheus_lines() if log is not None else ()
+
+def _rules_lines() -> Iterable[str]:
+    config = sys.modules.get("clinic_companion.config")
+    watcher = config._watcher if config is not None else None  # only while CLINIC_RULES_DIR is watched
+    return watcher.prometheus_lines() if watcher is not None else ()
+
+# ---------------------------
+# Per-submission timing
+# ---------------------------
+class RunTimer:
+    """Times the stages of one results render and records the outcome."""
+
+    def __init__(self):
+        self.stages: Dict[str, dict] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            STAGE_SECONDS.observe(wall, stage=name)
+            STAGE_CPU_SECONDS.observe(cpu, stage=name)
+            self.stages[name] = {"wall_ms": round(wall * 1e3, 3), "cpu_ms": round(cpu * 1e3, 3)}
+
+    def finish(self, result: dict, submitted: bool = True) -> None:
+        """Record the render; the outcome counters only for a submission (stage timings are kept for every rerun)."""
+        triggers = [FLAG_KEYS.get(label, "other") for label in result["red_flags"]]
+        hydration = result["hydration"]["level"] if result["hydration"] else "not_provided"
+        if submitted:
+            SUBMISSIONS.inc()
+            for trigger in triggers:
+                RED_FLAGS.inc(trigger=trigger)
+            HYDRATION.inc(level=hydration)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "event": "results_rendered",
+                "ts": round(time.time(), 3),
+                "submitted": submitted,
+                "total_ms": round((time.perf_counter() - self._started) * 1e3, 3),
+                "stages": self.stages,
+                "red_flags": triggers,
+                "hydration": hydration,
+            }))
+
+# ---------------------------
+# Exporters
+# ---------------------------
+def _handler_class():
+    # http.server is only imported when the endpoint is enabled (keeps app startup lean)
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/metrics":
+                body = render_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif path == "/sessions":  # per-session memory report (see sessions.py)
+                from .sessions import MONITOR
+                body = json.dumps(MONITOR.report(), indent=1).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # keep scrapes out of the app log
+            pass
+
+    return MetricsHandler
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_http_server(port: int, host: str = "127.0.0.1"):
+    """Serve ``/metrics`` from a daemon thread; later calls return the running server."""
+    from http.server import ThreadingHTTPServer
+
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _handler_class())
+            threading.Thread(target=_server.serve_forever, name="clinic-metrics", daemon=True).start()
+        return _server
+
+def configure_json_logging(stream=None) -> None:
+    if any(getattr(h, "_clinic_json", False) for h in logger.handlers):
+        return
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler._clinic_json = True
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+def configure_from_env() -> None:
+    """Turn on the exporters requested via ``CLINIC_METRICS_PORT`` / ``CLINIC_METRICS_LOG``."""
+    port = os.environ.get("CLINIC_METRICS_PORT")
+    if port:
+        try:
+            start_http_server(int(port), os.environ.get("CLINIC_METRICS_HOST", "127.0.0.1"))
+        except OSError as exc:  # port taken (e.g. a second worker on the same box)
+            logger.warning("metrics endpoint not started on port %s: %s", port, exc)
+    if os.environ.get("CLINIC_METRICS_LOG", "").lower() in ("1", "true", "yes"):
+        configure_json_logging()
@@ -0,0 +1,379 @@
+"""Offline-first visit queue with compressed, idempotent bulk sync.
+
+Outreach sites often have no connection. ``Outbox`` appends every completed
+visit to a log on local disk and syncs it to a central endpoint when the link
+is up:
+
+- the log is a directory of JSON-lines segments (``visits-00000001.log``, ...)
+  that are only ever appended to; each line is written and fsynced before
+  ``enqueue`` returns, so queued visits survive a crash or restart. A torn last
+  line left by a crash is cut off when the outbox is next opened
+- ``cursor.json`` records how far the central endpoint has acknowledged; it is
+  replaced atomically, and segments wholly before it are deleted
+- every visit gets an idempotency key when it is queued. The endpoint stores a
+  key at most once, so a chunk resent after a lost response (or a sync killed
+  half-way) never duplicates a record
+- ``sync`` sends the backlog as gzip-compressed NDJSON chunks of at most
+  ``CHUNK_BYTES`` on the wire (and ``CHUNK_RECORDS`` records), one keep-alive
+  connection per pass, and stops at the first failure to try again later
+
+``SyncStore`` is the receiving end: a SQLite table keyed on the idempotency
+key, served as ``POST /v1/sync`` by ``python -m clinic_companion serve --sync-db``.
+
+    CLINIC_OUTBOX_DIR=outbox CLINIC_SYNC_URL=http://hq:8080/v1/sync streamlit run app.py
+    python -m clinic_companion sync --outbox outbox --url http://hq:8080/v1/sync
+"""
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .engine import normalize_intake
+
+SEGMENT_BYTES = 4 << 20  # a new segment is started once the current one reaches this size
+CHUNK_BYTES = 64 << 10  # compressed bytes per sync request
+CHUNK_RECORDS = 500
+DEFAULT_INTERVAL = float(os.environ.get("CLINIC_SYNC_INTERVAL", "300"))  # seconds between background syncs
+
+_SEGMENT = re.compile(r"^visits-(\d{8})\.log$")
+
+logger = logging.getLogger("clinic_companion.outbox")
+
+class Entry(NamedTuple):
+    key: str
+    line: bytes  # the JSON line as stored (and sent), newline included
+    end: Tuple[int, int]  # (segment, offset) just past this line
+
+def _gzip(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return compressor.compress(data) + compressor.flush()
+
+class Outbox:
+    """Append-only on-disk queue of completed visits, with an acknowledged-up-to cursor."""
+
+    def __init__(self, directory: str, site: str = "", fsync: bool = True, segment_bytes: int = SEGMENT_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.site = site
+        self.fsync = fsync
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self.cursor = self._read_cursor()
+        segments = self._segments()
+        self._active = max(segments[-1] if segments else 1, self.cursor[0])
+        self._repair_tail(self._active)
+
+    # ----- files -----
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"visits-{segment:08d}.log")
+
+    def _segments(self) -> List[int]:
+        return sorted(int(m.group(1)) for m in map(_SEGMENT.match, os.listdir(self.directory)) if m)
+
+    def _read_cursor(self) -> Tuple[int, int]:
+        try:
+            with open(os.path.join(self.directory, "cursor.json"), encoding="utf-8") as f:
+                cursor = json.load(f)
+            return int(cursor["segment"]), int(cursor["offset"])
+        except FileNotFoundError:
+            return 1, 0
+
+    def _repair_tail(self, segment: int) -> None:
+        """Cut off a last line without its newline (a write interrupted by a crash; never acknowledged)."""
+        path = self._path(segment)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(max(0, size - 65536))
+            tail = f.read()
+            if tail.endswith(b"\n"):
+                return
+            keep = size - len(tail) + tail.rfind(b"\n") + 1
+            logger.warning("dropping %d bytes of an incomplete record at the end of %s", size - keep, path)
+            f.truncate(keep)
+
+    # ----- queue -----
+    def enqueue(self, record, key: Optional[str] = None, queued_at: Optional[float] = None) -> str:
+        """Append a visit (normalized like the form) durably; returns its idempotency key."""
+        key = key or os.urandom(16).hex()
+        entry = {"key": key, "queued_at": round(time.time() if queued_at is None else queued_at, 3)}
+        if self.site:
+            entry["site"] = self.site
+        entry["record"] = normalize_intake(record)
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._lock:
+            path = self._path(self._active)
+            if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+                self._active += 1
+                path = self._path(self._active)
+            with open(path, "ab") as f:
+                f.write(line)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+        return key
+
+    def pending(self) -> Iterator[Entry]:
+        """Queued visits not yet acknowledged, oldest first (lines still being written are skipped)."""
+        segment, offset = self.cursor
+        for number in self._segments():
+            if number < segment:
+                continue
+            with open(self._path(number), "rb") as f:
+                position = f.seek(offset if number == segment else 0)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    position += len(line)
+                    try:
+                        key = json.loads(line)["key"]
+                    except (ValueError, KeyError, TypeError):
+                        logger.warning("skipping an unreadable line in %s", self._path(number))
+                        continue
+                    yield Entry(key, line, (number, position))
+
+    def pending_count(self) -> int:
+        return sum(1 for _entry in self.pending())
+
+    def ack(self, end: Tuple[int, int]) -> None:
+        """Record that everything before ``end`` reached the central store; drops finished segments."""
+        path = os.path.join(self.directory, "cursor.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"segment": end[0], "offset": end[1]}, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self.cursor = end
+        for number in self._segments():
+            if number < end[0]:
+                os.remove(self._path(number))
+
+    def note_rejected(self, rejected: List[dict], sent: List[Entry]) -> None:
+        """Keep visits the endpoint refused, with its reasons, in ``rejected.jsonl`` for a person to fix and resend."""
+        if not rejected:
+            return
+        lines = {entry.key: entry.line for entry in sent}
+        with open(os.path.join(self.directory, "rejected.jsonl"), "a", encoding="utf-8") as f:
+            for item in rejected:
+                line = lines.get(item.get("key")) or sent[item.get("line", 0) - 1].line
+                entry = {"errors": item.get("errors", []), "entry": json.loads(line)}
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        logger.warning("%d queued visits were rejected by the sync endpoint (see rejected.jsonl)", len(rejected))
+
+# ---------------------------
+# Sync (client)
+# ---------------------------
+def chunks(entries: Iterable[Entry], max_bytes: int = CHUNK_BYTES,
+           max_records: int = CHUNK_RECORDS) -> Iterator[Tuple[bytes, List[Entry]]]:
+    """Group entries into gzip bodies of at most ``max_bytes``: (body, entries in it).
+
+    The compressed size is tracked exactly as lines are added (a sync flush per
+    line), so a chunk is closed just before the line that would overflow it. A
+    single line that is larger on its own is sent alone.
+    """
+    batch: List[Entry] = []
+    compressor, size = zlib.compressobj(6, zlib.DEFLATED, 31), 0
+    for entry in entries:
+        grown = len(compressor.compress(entry.line)) + len(compressor.flush(zlib.Z_SYNC_FLUSH))
+        if batch and (size + grown + 8 > max_bytes or len(batch) >= max_records):  # 8: gzip trailer
+            yield _gzip(b"".join(e.line for e in batch)), batch
+            batch = []
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            grown = len(compressor.compress(entry.line)) + len(compressor.flush(zlib.Z_SYNC_FLUSH))
+            size = 0
+        batch.append(entry)
+        size += grown
+    if batch:
+        yield _gzip(b"".join(e.line for e in batch)), batch
+
+def sync(outbox: Outbox, url: str, max_bytes: int = CHUNK_BYTES, max_records: int = CHUNK_RECORDS,
+         timeout: float = 30.0) -> dict:
+    """Send the outbox backlog to ``url``; stops at the first failure. Returns counts and any error."""
+    import http.client
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    conn = connection_class(parts.hostname, parts.port, timeout=timeout)
+    path = parts.path or "/"
+    stats = {"sent": 0, "accepted": 0, "duplicates": 0, "rejected": 0, "requests": 0, "bytes": 0, "error": None}
+    try:
+        for body, sent in chunks(outbox.pending(), max_bytes, max_records):
+            conn.request("POST", path, body, headers={"Content-Type": "application/x-ndjson",
+                                                      "Content-Encoding": "gzip"})
+            response = conn.getresponse()
+            data = response.read()
+            stats["requests"] += 1
+            stats["bytes"] += len(body)
+            if response.status != 200:
+                stats["error"] = f"HTTP {response.status}: {data[:200].decode('utf-8', 'replace')}"
+                break
+            reply = json.loads(data)
+            outbox.note_rejected(reply.get("rejected", []), sent)
+            outbox.ack(sent[-1].end)
+            stats["sent"] += len(sent)
+            for name in ("accepted", "duplicates"):
+                stats[name] += reply.get(name, 0)
+            stats["rejected"] += len(reply.get("rejected", []))
+    except (OSError, http.client.HTTPException, ValueError) as exc:
+        stats["error"] = f"{type(exc).__name__}: {exc}"
+    finally:
+        conn.close()
+    return stats
+
+class SyncWorker:
+    """Syncs an outbox every ``interval`` seconds from a daemon thread."""
+
+    def __init__(self, outbox: Outbox, url: str, interval: float = DEFAULT_INTERVAL):
+        self.outbox = outbox
+        self.url = url
+        self.interval = interval
+        self.last: Optional[dict] = None
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="clinic-sync", daemon=True)
+            self._thread.start()
+
+    def poke(self) -> None:
+        """Sync now instead of at the next interval (e.g. right after a visit is queued)."""
+        self._wake.set()
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.last = sync(self.outbox, self.url)
+            except Exception:  # a bad reply must not kill the thread
+                logger.exception("outbox sync failed")
+                continue
+            if self.last["error"]:
+                logger.info("outbox sync stopped, will retry: %s", self.last["error"])
+
+# ---------------------------
+# Central store (server)
+# ---------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS synced_visits (
+    key         TEXT PRIMARY KEY,
+    site        TEXT NOT NULL,
+    queued_at   REAL NOT NULL,
+    received_at REAL NOT NULL,
+    record      TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+class SyncStore:
+    """Visits received from outboxes, stored once per idempotency key."""
+
+    def __init__(self, path: str):
+        import sqlite3  # only when the sync endpoint is enabled
+
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def ingest(self, entries: List[dict]) -> dict:
+        """Insert ``{"key", "queued_at", "site", "record"}`` entries in one transaction."""
+        received_at = time.time()
+        accepted = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for entry in entries:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO synced_visits VALUES (?, ?, ?, ?, ?)",
+                        (entry["key"], str(entry.get("site", "")), float(entry.get("queued_at", received_at)),
+                         received_at, json.dumps(entry["record"], ensure_ascii=False, separators=(",", ":"))),
+                    )
+                    accepted += cursor.rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {"accepted": accepted, "duplicates": len(entries) - accepted}
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM synced_visits").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+# ---------------------------
+# App integration
+# ---------------------------
+_outbox = None
+_worker = None
+_outbox_lock = threading.Lock()
+
+def outbox_from_env() -> Optional[Outbox]:
+    """The process-wide outbox at ``CLINIC_OUTBOX_DIR`` (syncing to ``CLINIC_SYNC_URL`` if set), or None."""
+    global _outbox, _worker
+    directory = os.environ.get("CLINIC_OUTBOX_DIR")
+    if not directory:
+        return None
+    with _outbox_lock:
+        if _outbox is None or _outbox.directory != directory:
+            _outbox = Outbox(directory, site=os.environ.get("CLINIC_SITE", ""))
+            url = os.environ.get("CLINIC_SYNC_URL")
+            _worker = SyncWorker(_outbox, url) if url else None
+            if _worker is not None:
+                _worker.start()
+        return _outbox
+
+def queue_visit(record) -> Optional[str]:
+    """Queue a completed visit when the outbox is enabled; a sync is started in the background."""
+    outbox = outbox_from_env()
+    if outbox is None:
+        return None
+    key = outbox.enqueue(record)
+    if _worker is not None:
+        _worker.poke()
+    return key
+
+# ---------------------------
+# CLI entry point
+# ---------------------------
+def run(args) -> int:
+    outbox = Outbox(args.outbox)
+    if args.status:
+        print(f"{outbox.pending_count()} visits waiting in {args.outbox}")
+        return 0
+    started = time.perf_counter()
+    stats = sync(outbox, args.url, max_bytes=args.chunk_kb << 10)
+    elapsed = time.perf_counter() - started
+    print(f"Synced {stats['sent']} visits in {stats['requests']} requests ({stats['bytes'] / 1024:.1f} KB sent, "
+          f"{stats['duplicates']} already there, {stats['rejected']} rejected) in {elapsed:.2f}s", file=sys.stderr)
+    if stats["error"]:
+        print(f"Stopped early, {outbox.pending_count()} visits still waiting: {stats['error']}", file=sys.stderr)
+        return 1
+    return 0
+
+def add_parser(subparsers):
+    p = subparsers.add_parser("sync", help="Send queued visits to the central endpoint",
+                              description="Syncs an outbox directory in compressed chunks; safe to rerun after a failure.")
+    p.add_argument("--outbox", default=os.environ.get("CLINIC_OUTBOX_DIR", "outbox"), help="outbox directory")
+    p.add_argument("--url", default=os.environ.get("CLINIC_SYNC_URL", "http://127.0.0.1:8080/v1/sync"),
+                   help="sync endpoint (default: $CLINIC_SYNC_URL or a local server)")
+    p.add_argument("--chunk-kb", type=int, default=CHUNK_BYTES >> 10, help="compressed KB per request (default: 64)")
+    p.add_argument("--status", action="store_true", help="only print how many visits are waiting")
+    p.set_defaults(func=run)
+    return p
@@ -0,0 +1,112 @@
+"""Precompiled rule tables for fast cold starts.
+
+Compiling the reference-range tables and building the trigger automaton are the
+main costs of getting the engine ready in a fresh worker. Both results are
+written once to a ``marshal`` artifact (``tables.marshal`` next to this file),
+which is memory-mapped and decoded on load instead of recomputed.
+
+Each section carries a snapshot of the sources it was built from (the range
+table definitions, the trigger list and the synonym pack files). A section whose
+snapshot no longer matches -- or a missing/corrupt artifact, or one written
+by another Python version -- is ignored and the tables are compiled from source
+as before, so a stale artifact can never change results.
+
+Rebuild after editing ranges, triggers or packs (or the layout of the matcher
+state, see ``triggers.STATE_VERSION``)::
+
+    python -m clinic_companion compile-tables
+
+``CLINIC_TABLES_PATH`` points the loader at another artifact file (``off``
+disables it).
+"""
+from functools import lru_cache
+import marshal
+import mmap
+import os
+from pathlib import Path
+import sys
+from typing import Optional
+
+MAGIC = b"CCNGTAB1"
+DEFAULT_PATH = Path(__file__).with_name("tables.marshal")
+
+loaded_sections = set()  # sections served from the artifact in this process
+
+def fingerprint(*parts: bytes) -> bytes:
+    """Exact, length-prefixed snapshot of the sources a section is built from.
+
+    Compared byte for byte on load; cheaper at startup than hashing (no hashlib import)
+    and the sources are only a few kilobytes.
+    """
+    return b"".join(len(part).to_bytes(8, "little") + part for part in parts)
+
+def artifact_path() -> Optional[Path]:
+    configured = os.environ.get("CLINIC_TABLES_PATH")
+    if configured is None:
+        return DEFAULT_PATH
+    return None if configured.lower() == "off" else Path(configured)
+
+@lru_cache(maxsize=4)
+def _read(path: Path) -> Optional[dict]:
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(MAGIC)] != MAGIC:
+                return None
+            with memoryview(mm) as view, view[len(MAGIC):] as body:
+                payload = marshal.loads(body)
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+    if not isinstance(payload, dict) or payload.get("python") != tuple(sys.version_info[:2]):
+        return None
+    return payload
+
+def load_section(name: str, expected: bytes):
+    """The precompiled ``name`` section if its fingerprint matches ``expected``, else None."""
+    path = artifact_path()
+    payload = _read(path) if path is not None else None
+    if payload is None:
+        return None
+    section = payload["sections"].get(name)
+    if section is None or section[0] != expected:
+        return None
+    loaded_sections.add(name)
+    return section[1]
+
+def build(path=None) -> Path:
+    """Compile every section from source and write the artifact atomically."""
+    from .engine import SYMPTOM_TRIGGERS
+    from .ranges import RANGE_TABLES, RangeTables, ranges_fingerprint
+    from .triggers import build_matcher, bundled_packs, matcher_fingerprint
+
+    path = Path(path) if path is not None else DEFAULT_PATH
+    packs = bundled_packs()
+    payload = {
+        "python": tuple(sys.version_info[:2]),
+        "sections": {
+            "ranges": (ranges_fingerprint(RANGE_TABLES), RangeTables(RANGE_TABLES).compiled),
+            "matcher": (matcher_fingerprint(SYMPTOM_TRIGGERS, packs),
+                        build_matcher(SYMPTOM_TRIGGERS, packs).state()),
+        },
+    }
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(marshal.dumps(payload))
+    os.replace(tmp, path)
+    _read.cache_clear()
+    return path
+
+# ---------------------------
+# CLI entry point
+# ---------------------------
+def run(args) -> int:
+    path = build(args.output)
+    print(f"Wrote {path} ({path.stat().st_size:,} bytes)", file=sys.stderr)
+    return 0
+
+def add_parser(subparsers):
+    p = subparsers.add_parser("compile-tables", help="Precompile range and trigger tables for fast startup",
+                              description="Write the marshal artifact loaded at import time.")
+    p.add_argument("-o", "--output", default=None, help=f"artifact path (default: {DEFAULT_PATH.name} in the package)")
+    p.set_defaults(func=run)
+    return p
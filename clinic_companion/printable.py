@@ -0,0 +1,362 @@
+"""Printable one-page summaries (HTML and PDF), rendered off the request path.
+
+A ``Document`` holds what goes on the page: the vitals rows with their status
+badges, the red flags and the clinic summary text, already in the reader's
+language. ``PrintRenderer`` renders documents on a small thread pool and keeps
+the bytes in a process-wide LRU keyed on a hash of the document, so identical
+summaries (reruns, fragment reruns, two tabs with the same visit) are rendered
+once. ``submit`` only queues work and returns a future; a render that is
+already running is shared rather than started again.
+
+Both formats are written with the standard library. The PDF uses the printer's
+built-in Courier font, which only covers Western European letters: tone marks
+and other characters outside it are dropped, so languages that need them
+should print the HTML version. When the document carries a hand-off code (see
+``handoff.py``) and ``segno`` is installed, both pages also show it as a QR
+code, and a PNG of it is rendered for the results page.
+"""
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+import hashlib
+import html
+import io
+import json
+import os
+import textwrap
+import threading
+import time
+import unicodedata
+import zlib
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from . import handoff
+from .engine import DISCLAIMER
+from .i18n import N_, translator
+
+DEFAULT_WORKERS = int(os.environ.get("CLINIC_PRINT_WORKERS", "2"))
+DEFAULT_MAX_BYTES = int(float(os.environ.get("CLINIC_PRINT_CACHE_MB", "16")) * (1 << 20))
+
+TITLE = N_("Clinic Companion NG: visit summary")
+CUT_NOTE = N_("See the on-screen summary for the rest.")
+QR_NOTE = N_("Scan at triage")
+
+class Document(NamedTuple):
+    """One printable page. Every text is already translated for ``lang``."""
+    lang: str
+    vitals: Tuple[Tuple[str, str, str, str], ...]  # (title, value, badge, classification)
+    red_flags: Tuple[str, ...]
+    summary: str
+    handoff: str = ""  # ``handoff.to_text`` of the visit, drawn as a QR code when segno is installed
+
+def document_key(doc: Document, fmt: str) -> str:
+    """Content hash of a document in one output format."""
+    payload = json.dumps([fmt, doc], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+def _qr(doc: Document):
+    return _qr_code(doc.handoff) if doc.handoff and handoff.qr_available() else None
+
+@lru_cache(maxsize=64)
+def _qr_code(text: str):
+    # Building the symbol is most of a render's cost; the PDF, HTML and PNG of one page share it.
+    return handoff.qr_code(text)
+
+def _sections(doc: Document) -> List[Tuple[str, List[str]]]:
+    """(heading, lines) in page order, shared by both formats."""
+    _ = translator(doc.lang)
+    vitals = [f"{title}: {value}  {badge} ({label})" if label else f"{title}: {value}"
+              for title, value, badge, label in doc.vitals]
+    flags = list(doc.red_flags) or [_("None detected from what was entered.")]
+    return [
+        (_("Vitals"), vitals),
+        (_("Urgent warnings"), flags),
+        (_("Clinic summary"), doc.summary.splitlines()),
+    ]
+
+# ---------------------------
+# HTML
+# ---------------------------
+_HTML_CSS = (
+    "@page{size:A4;margin:14mm}"
+    "body{font:10.5pt/1.35 system-ui,-apple-system,'Segoe UI',Roboto,sans-serif;color:#111;margin:0 auto;max-width:182mm}"
+    "h1{font-size:15pt;margin:0 0 6pt}h2{font-size:11.5pt;margin:10pt 0 3pt;border-bottom:1px solid #999}"
+    "table{border-collapse:collapse;width:100%}td{padding:2pt 4pt;border-bottom:1px solid #ddd;vertical-align:top}"
+    ".flags li{color:#a00;font-weight:600}"
+    ".qr{float:right;margin:0 0 6pt 10pt;text-align:center;font-size:8pt}.qr svg{display:block}"
+    "pre{font:9.5pt/1.3 ui-monospace,Menlo,Consolas,monospace;white-space:pre-wrap;margin:0}"
+    "footer{margin-top:10pt;font-size:8.5pt;color:#444}"
+)
+
+def render_html(doc: Document) -> bytes:
+    """A self-contained HTML page laid out for one A4 sheet (print it from the browser)."""
+    _ = translator(doc.lang)
+    esc = html.escape
+    (vitals_heading, _rows), (flags_heading, flags), (summary_heading, _lines) = _sections(doc)
+    rows = "".join(
+        f"<tr><td>{esc(title)}</td><td>{esc(value)}</td><td>{esc(badge)}</td><td>{esc(label)}</td></tr>"
+        for title, value, badge, label in doc.vitals
+    )
+    items = "".join(f"<li>{esc(flag)}</li>" for flag in flags)
+    qr = _qr(doc)
+    code = f'<div class="qr">{qr.svg_inline(scale=3, border=2)}{esc(_(QR_NOTE))}</div>' if qr is not None else ""
+    page = (
+        f'<!DOCTYPE html><html lang="{esc(doc.lang)}"><head><meta charset="utf-8">'
+        f"<title>{esc(_(TITLE))}</title><style>{_HTML_CSS}</style></head><body>"
+        f"{code}<h1>{esc(_(TITLE))}</h1>"
+        f"<h2>{esc(vitals_heading)}</h2><table>{rows}</table>"
+        f'<h2>{esc(flags_heading)}</h2><ul class="{"flags" if doc.red_flags else ""}">{items}</ul>'
+        f"<h2>{esc(summary_heading)}</h2><pre>{esc(doc.summary)}</pre>"
+        f"<footer>{esc(_(DISCLAIMER))}</footer></body></html>"
+    )
+    return page.encode("utf-8")
+
+# ---------------------------
+# PDF
+# ---------------------------
+PAGE_WIDTH, PAGE_HEIGHT, MARGIN = 595, 842, 42  # A4 in points
+LEADING = 1.25  # line height / font size
+QR_BOX = 96  # points; the QR code sits in the top right corner, text beside it wraps short
+FONT_SIZES = (10, 9, 8, 7)  # body sizes tried in turn until the page fits
+_ADVANCE = 0.6  # Courier: every glyph is 600/1000 em wide
+_FOLD = str.maketrans({"→": "->", "←": "<-", "≥": ">=", "≤": "<=", "₦": "N", "–": "-", "—": "-", "…": "..."})
+
+def pdf_text(text: str) -> str:
+    """``text`` reduced to what the PDF's WinAnsi Courier can show (accents and symbols outside it dropped)."""
+    out = []
+    for ch in text.translate(_FOLD):
+        try:
+            ch.encode("cp1252")
+            out.append(ch)
+        except UnicodeEncodeError:
+            out.extend(c for c in unicodedata.normalize("NFKD", ch) if not unicodedata.combining(c) and c.isascii())
+    return " ".join("".join(out).split())  # also closes the gaps left by dropped emoji
+
+def _pdf_string(text: str) -> bytes:
+    data = text.encode("cp1252", "replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+def _layout(doc: Document, size: float, qr_box: float = 0) -> List[Tuple[str, float, str]]:
+    """(font, size, text) per printed line at body font ``size``; blank text is a spacer.
+
+    Lines beside a ``qr_box`` (top right corner) wrap short, and the summary
+    starts below it.
+    """
+    full = int((PAGE_WIDTH - 2 * MARGIN) / (size * _ADVANCE))
+    narrow = int((PAGE_WIDTH - 2 * MARGIN - qr_box) / (size * _ADVANCE))
+    lines, used = [], 0.0
+
+    def add(font: str, font_size: float, text: str):
+        nonlocal used
+        lines.append((font, font_size, text))
+        used += font_size * LEADING
+
+    add("F2", size + 4, pdf_text(translator(doc.lang)(TITLE)))
+    sections = _sections(doc)
+    for i, (heading, body) in enumerate(sections):
+        while i == len(sections) - 1 and used < qr_box:
+            add("F1", size, "")
+        add("F1", size, "")
+        add("F2", size + 1, pdf_text(heading))
+        for line in body:
+            for part in textwrap.wrap(pdf_text(line), narrow if used < qr_box else full, subsequent_indent="  ") or [""]:
+                add("F1", size, part)
+    add("F1", size, "")
+    for part in textwrap.wrap(pdf_text(translator(doc.lang)(DISCLAIMER)), full + 10):
+        add("F1", size - 1, part)
+    return lines
+
+def _fit_page(doc: Document, qr_box: float = 0) -> List[Tuple[str, float, str]]:
+    """The largest body size whose lines fit one page; at the smallest size the summary is cut short."""
+    room = PAGE_HEIGHT - 2 * MARGIN
+    for size in FONT_SIZES:
+        lines = _layout(doc, size, qr_box)
+        if sum(s * LEADING for _f, s, _t in lines) <= room:
+            return lines
+    kept, used = [], 0.0
+    for line in lines:
+        if used + line[1] * LEADING > room - size * 2 * LEADING:
+            break
+        kept.append(line)
+        used += line[1] * LEADING
+    return kept + [("F1", size, "[...] " + pdf_text(translator(doc.lang)(CUT_NOTE)))]
+
+def _qr_ops(qr, note: str) -> List[bytes]:
+    """Drawing operators for the QR code in the top right corner: one rectangle per run of dark modules."""
+    n = qr.symbol_size(border=0)[0]
+    module = QR_BOX / n
+    x0, top = PAGE_WIDTH - MARGIN - QR_BOX, PAGE_HEIGHT - MARGIN
+    ops = [b"0 g"]
+    for r, row in enumerate(qr.matrix_iter(border=0)):
+        row = list(row)
+        c = 0
+        while c < n:
+            if not row[c]:
+                c += 1
+                continue
+            start = c
+            while c < n and row[c]:
+                c += 1
+            ops.append(b"%.2f %.2f %.2f %.2f re" % (x0 + start * module, top - (r + 1) * module,
+                                                   (c - start) * module, module))
+    ops.append(b"f")
+    ops.append(b"BT /F1 7 Tf 1 0 0 1 %.2f %.2f Tm %s Tj ET" % (x0, top - QR_BOX - 9, _pdf_string(note)))
+    return ops
+
+def render_pdf(doc: Document) -> bytes:
+    """A one-page A4 PDF (PDF 1.4, built-in Courier fonts, compressed content stream)."""
+    qr = _qr(doc)
+    ops = _qr_ops(qr, pdf_text(translator(doc.lang)(QR_NOTE))) if qr is not None else []
+    ops.append(b"BT")
+    y = PAGE_HEIGHT - MARGIN
+    for font, size, text in _fit_page(doc, QR_BOX + 14 if qr is not None else 0):
+        y -= size * LEADING
+        if text:
+            ops.append(b"/%s %g Tf 1 0 0 1 %d %.2f Tm %s Tj" % (font.encode(), size, MARGIN, y, _pdf_string(text)))
+    ops.append(b"ET")
+    stream = zlib.compress(b"\n".join(ops))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R /F2 6 0 R >> >> >>" % (PAGE_WIDTH, PAGE_HEIGHT),
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+# format -> (renderer, MIME type, file extension)
+FORMATS = {
+    "pdf": (render_pdf, "application/pdf", ".pdf"),
+    "html": (render_html, "text/html", ".html"),
+}
+
+def render_qr(doc: Document) -> bytes:
+    """PNG of the hand-off QR code, for the results page."""
+    buf = io.BytesIO()
+    _qr(doc).save(buf, kind="png", scale=5, border=4)
+    return buf.getvalue()
+
+RENDERERS = {**{fmt: spec[0] for fmt, spec in FORMATS.items()}, "qr": render_qr}
+
+# ---------------------------
+# Background rendering + cache
+# ---------------------------
+class PrintRenderer:
+    """Renders documents on a thread pool; finished bytes are kept in a byte-bounded LRU."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_bytes: int = DEFAULT_MAX_BYTES):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._done = OrderedDict()  # key -> rendered bytes
+        self._pending = {}  # key -> Future of a render in progress
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.shared = self.evictions = self.errors = 0
+        self.render_seconds = 0.0
+
+    def submit(self, doc: Document, fmt: str) -> Future:
+        """Future of the ``fmt`` bytes for ``doc``: already done on a cache hit, never blocks."""
+        key = document_key(doc, fmt)
+        with self._lock:
+            data = self._done.get(key)
+            if data is not None:
+                self._done.move_to_end(key)
+                self.hits += 1
+                future = Future()
+                future.set_result(data)
+                return future
+            future = self._pending.get(key)
+            if future is not None:
+                self.shared += 1
+                return future
+            self.misses += 1
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="clinic-print")
+            # Still holding the lock, so _render cannot finish before the future is registered.
+            future = self._pending[key] = self._pool.submit(self._render, key, doc, fmt)
+            return future
+
+    def prepare(self, doc: Document) -> dict:
+        """Start every format of ``doc`` (and its QR code, when it has one and segno is installed): format -> future."""
+        futures = {fmt: self.submit(doc, fmt) for fmt in FORMATS}
+        if doc.handoff and handoff.qr_available():
+            futures["qr"] = self.submit(doc, "qr")
+        return futures
+
+    def get(self, doc: Document, fmt: str) -> Optional[bytes]:
+        """Cached bytes, or None when not rendered (yet)."""
+        with self._lock:
+            return self._done.get(document_key(doc, fmt))
+
+    def _render(self, key: str, doc: Document, fmt: str) -> bytes:
+        started = time.perf_counter()
+        try:
+            data = RENDERERS[fmt](doc)
+        except Exception:
+            with self._lock:
+                self._pending.pop(key, None)
+                self.errors += 1
+            raise
+        with self._lock:
+            self._pending.pop(key, None)
+            self.render_seconds += time.perf_counter() - started
+            if len(data) <= self.max_bytes:
+                self._done[key] = data
+                self._bytes += len(data)
+                while self._bytes > self.max_bytes:
+                    _key, old = self._done.popitem(last=False)
+                    self._bytes -= len(old)
+                    self.evictions += 1
+        return data
+
+    def clear(self) -> None:
+        with self._lock:
+            self._done.clear()
+            self._bytes = 0
+
+    def shutdown(self) -> None:
+        """Wait for running renders and stop the worker threads (a later submit starts new ones)."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            renders = self.misses - len(self._pending) - self.errors
+            return {
+                "size": len(self._done),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "pending": len(self._pending),
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "mean_render_ms": self.render_seconds / renders * 1000 if renders > 0 else 0.0,
+            }
+
+    def prometheus_lines(self) -> Iterable[str]:
+        stats = self.stats()
+        for name, kind in (("hits", "counter"), ("misses", "counter"), ("errors", "counter"),
+                           ("pending", "gauge"), ("bytes", "gauge")):
+            metric = f"clinic_print_{name}" + ("_total" if kind == "counter" else "")
+            yield f"# TYPE {metric} {kind}"
+            yield f"{metric} {stats[name]}"
+
+PRINTS = PrintRenderer()
@@ -0,0 +1,256 @@
+"""Declarative reference-range tables.
+
+Each metric has a list of rows. A row applies when every key in its ``when``
+selector matches the visit (``age_band``, ``sex``, ``pregnant``, ``fasting``);
+the first matching row wins, so put the most specific rows first. A row's
+``bands`` list is ordered by value: each band is ``[label, lower_bound]`` where
+``lower_bound`` is ``">=x"`` (value at or above x), ``">x"`` (strictly above x),
+or ``None`` for the first band. Gaps between published ranges (e.g. 37.7–37.8 °C)
+are written out as their own "Check entries" band so nothing is implicit.
+
+At import the tables are compiled into one sorted breakpoint array per selector
+combination, so a lookup is a dict hit plus a bisect. The compiled form is read
+from the precompiled artifact when it matches these tables (see ``precompiled``).
+"""
+from bisect import bisect_right
+from itertools import product
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+AGE_BANDS = ("infant", "toddler", "preschool", "school_age", "adult")
+AGE_BAND_STARTS = (1, 3, 6, 13)  # years at which the next band starts
+SEXES = ("Male", "Female", "Prefer not to say")
+
+CHILD_NOTE = "Child ranges differ (clinician uses age-based charts)"
+
+RANGE_TABLES = {
+    "temp": [
+        {"when": {}, "bands": [
+            ["Not provided", None], ["Below typical", ">0"], ["Typical", ">=36.0"], ["Check entries", ">37.7"],
+            ["Fever range", ">=37.8"], ["Check entries", ">38.9"], ["High fever range", ">=39.0"],
+        ]},
+    ],
+    "pulse": [
+        # Awake resting heart rate by age (paediatric life-support reference ranges)
+        {"when": {"age_band": "infant"}, "bands": [
+            ["Not provided", None], ["Below typical resting range", ">0"], ["Typical resting range", ">=100"],
+            ["Above typical resting range", ">160"],
+        ]},
+        {"when": {"age_band": "toddler"}, "bands": [
+            ["Not provided", None], ["Below typical resting range", ">0"], ["Typical resting range", ">=98"],
+            ["Above typical resting range", ">140"],
+        ]},
+        {"when": {"age_band": "preschool"}, "bands": [
+            ["Not provided", None], ["Below typical resting range", ">0"], ["Typical resting range", ">=80"],
+            ["Above typical resting range", ">120"],
+        ]},
+        {"when": {"age_band": "school_age"}, "bands": [
+            ["Not provided", None], ["Below typical resting range", ">0"], ["Typical resting range", ">=75"],
+            ["Above typical resting range", ">118"],
+        ]},
+        {"when": {}, "bands": [
+            ["Not provided", None], ["Below typical resting range", ">0"], ["Typical resting range", ">=60"],
+            ["Above typical resting range", ">100"],
+        ]},
+    ],
+    # Blood pressure is classified per axis, then combined with BP_PRECEDENCE.
+    "bp_systolic": [
+        {"when": {"age_band": "infant"}, "bands": [["Not provided", None], [CHILD_NOTE, ">0"]]},
+        {"when": {"age_band": "toddler"}, "bands": [["Not provided", None], [CHILD_NOTE, ">0"]]},
+        {"when": {"age_band": "preschool"}, "bands": [["Not provided", None], [CHILD_NOTE, ">0"]]},
+        {"when": {"age_band": "school_age"}, "bands": [["Not provided", None], [CHILD_NOTE, ">0"]]},
+        {"when": {}, "bands": [
+            ["Not provided", None], ["Low range", ">0"], ["Typical / near typical", ">=90"],
+            ["Borderline (monitor)", ">=125"], ["Check entries", ">129"], ["High range (mild–moderate)", ">=130"],
+            ["Check entries", ">139"], ["High range", ">=140"],
+        ]},
+    ],
+    "bp_diastolic": [
+        {"when": {"age_band": "infant"}, "bands": [["Not provided", None], [CHILD_NOTE, ">0"]]},
+        {"when": {"age_band": "toddler"}, "bands": [["Not provided", None], [CHILD_NOTE, ">0"]]},
+        {"when": {"age_band": "preschool"}, "bands": [["Not provided", None], [CHILD_NOTE, ">0"]]},
+        {"when": {"age_band": "school_age"}, "bands": [["Not provided", None], [CHILD_NOTE, ">0"]]},
+        {"when": {}, "bands": [
+            ["Not provided", None], ["Low range", ">0"], ["Typical / near typical", ">=60"],
+            ["High range (mild–moderate)", ">=80"], ["Check entries", ">89"], ["High range", ">=90"],
+        ]},
+    ],
+    "pcv": [
+        # Antenatal: WHO anaemia threshold in pregnancy (Hb < 11 g/dL, roughly PCV < 33 %)
+        {"when": {"pregnant": True}, "bands": [
+            ["Not provided", None], ["Below typical", ">0"], ["Typical", ">=33.0"], ["Above typical", ">48.0"],
+        ]},
+        {"when": {"sex": "Male"}, "bands": [
+            ["Not provided", None], ["Below typical", ">0"], ["Typical", ">=40.0"], ["Above typical", ">54.0"],
+        ]},
+        {"when": {"sex": "Female"}, "bands": [
+            ["Not provided", None], ["Below typical", ">0"], ["Typical", ">=36.0"], ["Above typical", ">48.0"],
+        ]},
+        {"when": {}, "bands": [
+            ["Not provided", None], ["Below typical", ">0"], ["Typical", ">=37.0"], ["Above typical", ">52.0"],
+        ]},
+    ],
+    "glucose": [
+        # Antenatal fasting: WHO 2013 gestational diabetes threshold (fasting >= 5.1 mmol/L)
+        {"when": {"fasting": True, "pregnant": True}, "bands": [
+            ["Not provided", None], ["Low fasting range", ">0"], ["Typical fasting range", ">=3.9"],
+            ["Check entries", ">5.0"], ["Above typical fasting range", ">=5.1"], ["Check entries", ">6.9"],
+            ["High fasting range", ">=7.0"],
+        ]},
+        {"when": {"fasting": True}, "bands": [
+            ["Not provided", None], ["Low fasting range", ">0"], ["Typical fasting range", ">=3.9"],
+            ["Check entries", ">5.5"], ["Above typical fasting range", ">=5.6"], ["Check entries", ">6.9"],
+            ["High fasting range", ">=7.0"],
+        ]},
+        {"when": {}, "bands": [
+            ["Not provided", None], ["Low range", ">0"], ["Common random range", ">=3.9"],
+            ["Check entries", ">7.7"], ["Above typical random range", ">=7.8"], ["High random range", ">11.0"],
+        ]},
+    ],
+    "bmi": [
+        {"when": {"age_band": "infant"}, "bands": [["Not provided", None], [CHILD_NOTE, ">0"]]},
+        {"when": {"age_band": "toddler"}, "bands": [["Not provided", None], [CHILD_NOTE, ">0"]]},
+        {"when": {"age_band": "preschool"}, "bands": [["Not provided", None], [CHILD_NOTE, ">0"]]},
+        {"when": {"age_band": "school_age"}, "bands": [["Not provided", None], [CHILD_NOTE, ">0"]]},
+        {"when": {}, "bands": [
+            ["Not provided", None], ["Lower than typical range", ">0"], ["Typical range", ">=18.5"],
+            ["Above typical range", ">=25"], ["Higher risk range", ">=30"],
+        ]},
+    ],
+}
+
+# When systolic and diastolic land in different bands, the earlier label here wins.
+BP_PRECEDENCE = (
+    "Not provided",
+    CHILD_NOTE,
+    "Low range",
+    "High range (mild–moderate)",
+    "High range",
+    "Check entries",
+    "Borderline (monitor)",
+    "Typical / near typical",
+)
+
+# ---------------------------
+# Selectors
+# ---------------------------
+_AGE_NUMBER = re.compile(r"(\d+(?:\.\d+)?)")
+
+def age_band(age) -> str:
+    """Map the free-text age field ("34", "18 months", "2 yrs") to an age band; unknown -> adult."""
+    if age is None:
+        return "adult"
+    if isinstance(age, (int, float)):
+        years = float(age)
+    else:
+        m = _AGE_NUMBER.search(str(age))
+        if not m:
+            return "adult"
+        years = float(m.group(1))
+        if "month" in str(age).lower():
+            years /= 12.0
+        elif "week" in str(age).lower():
+            years /= 52.0
+    if years <= 0:
+        return "adult"
+    return AGE_BANDS[bisect_right(AGE_BAND_STARTS, years)]
+
+def _normalize_sex(sex) -> str:
+    return sex if sex in ("Male", "Female") else "Prefer not to say"
+
+# ---------------------------
+# Compilation
+# ---------------------------
+def _parse_bound(bound: str) -> float:
+    if bound.startswith(">="):
+        return float(bound[2:])
+    if bound.startswith(">"):
+        # "> x" is the same as ">= the next float after x"
+        return math.nextafter(float(bound[1:]), math.inf)
+    raise ValueError(f"Band bound must look like '>=x' or '>x', got {bound!r}")
+
+def compile_bands(bands) -> Tuple[Tuple[float, ...], Tuple[str, ...]]:
+    """Turn ``[[label, bound], ...]`` into (breakpoints, labels) for ``bisect_right``."""
+    if not bands or bands[0][1] is not None:
+        raise ValueError("The first band must have no lower bound")
+    breaks, labels = [], [bands[0][0]]
+    for label, bound in bands[1:]:
+        value = _parse_bound(bound)
+        if breaks and value <= breaks[-1]:
+            raise ValueError(f"Band bounds must increase: {bound!r} after {breaks[-1]!r}")
+        breaks.append(value)
+        labels.append(label)
+    return tuple(breaks), tuple(labels)
+
+def _row_matches(when: dict, key: dict) -> bool:
+    return all(key[name] == value for name, value in when.items())
+
+class RangeTables:
+    """Compiled form of a ``RANGE_TABLES``-style mapping."""
+
+    def __init__(self, tables: Dict[str, list]):
+        self.compiled: Dict[str, Dict[tuple, Tuple[tuple, tuple]]] = {}
+        for metric, rows in tables.items():
+            compiled_rows = [(row.get("when", {}), compile_bands(row["bands"])) for row in rows]
+            by_key = {}
+            for band, sex, pregnant, fasting in product(AGE_BANDS, SEXES, (False, True), (False, True)):
+                key = {"age_band": band, "sex": sex, "pregnant": pregnant, "fasting": fasting}
+                for when, compiled in compiled_rows:
+                    if _row_matches(when, key):
+                        by_key[(band, sex, pregnant, fasting)] = compiled
+                        break
+                else:
+                    raise ValueError(f"Range table {metric!r} has no row for {key}")
+            self.compiled[metric] = by_key
+
+    @classmethod
+    def from_compiled(cls, compiled: Dict[str, Dict[tuple, Tuple[tuple, tuple]]]) -> "RangeTables":
+        """Wrap already-compiled tables (e.g. from the precompiled artifact) without recompiling."""
+        tables = cls.__new__(cls)
+        tables.compiled = compiled
+        return tables
+
+    def bands_for(self, metric: str, age_band: str = "adult", sex: str = "", pregnant: bool = False,
+                  fasting: bool = False) -> Tuple[tuple, tuple]:
+        return self.compiled[metric][(age_band, _normalize_sex(sex), bool(pregnant), bool(fasting))]
+
+    def lookup(self, metric: str, value: Optional[float], age_band: str = "adult", sex: str = "",
+               pregnant: bool = False, fasting: bool = False) -> str:
+        breaks, labels = self.bands_for(metric, age_band, sex, pregnant, fasting)
+        if value is None:
+            return labels[0]
+        return labels[bisect_right(breaks, value)]
+
+    def bp_axes(self, sys_bp: float, dia_bp: float, age_band: str = "adult") -> Tuple[str, str]:
+        """(systolic label, diastolic label) before ``BP_PRECEDENCE`` combines them."""
+        return self.lookup("bp_systolic", sys_bp, age_band), self.lookup("bp_diastolic", dia_bp, age_band)
+
+    def classify_bp(self, sys_bp: float, dia_bp: float, age_band: str = "adult") -> str:
+        return combine_bp(self.bp_axes(sys_bp, dia_bp, age_band))
+
+_BP_RANK = {label: i for i, label in enumerate(BP_PRECEDENCE)}
+
+def combine_bp(axes: Tuple[str, str]) -> str:
+    """The one BP label shown for per-axis labels: whichever comes first in ``BP_PRECEDENCE``."""
+    return min(axes, key=_BP_RANK.__getitem__)
+
+def ranges_fingerprint(tables: Dict[str, list]) -> bytes:
+    from .precompiled import fingerprint
+    return fingerprint(repr((tables, AGE_BANDS, SEXES)).encode("utf-8"))
+
+def load_range_tables(tables: Dict[str, list] = RANGE_TABLES) -> RangeTables:
+    """``RangeTables(tables)``, taken from the precompiled artifact when it is up to date."""
+    from .precompiled import load_section
+    compiled = load_section("ranges", ranges_fingerprint(tables))
+    return RangeTables.from_compiled(compiled) if compiled is not None else RangeTables(tables)
+
+RANGES = load_range_tables()
+
+def metric_labels(metric: str) -> List[str]:
+    """Every label a metric can produce, in first-seen order."""
+    seen = {}
+    for breaks_labels in RANGES.compiled[metric].values():
+        for label in breaks_labels[1]:
+            seen.setdefault(label)
+    return list(seen)
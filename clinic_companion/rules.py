@@ -0,0 +1,243 @@
+"""Rule engine for the "Doctor checks" list and the questions to ask.
+
+Each visit is encoded once as a feature bitmask (BP entered, BP high, fever,
+low PCV, hydration answered, ...). A rule lists the features it requires and
+the features that rule it out, and is filed under one of its required features.
+Evaluating a visit only visits the rules filed under features the visit
+actually has, plus the unconditional ones, so adding rules about, say,
+pregnancy costs nothing for visits without it.
+
+Rules are data. The built-in ones are ``RULES`` below; locally reviewed rules
+can be added as ``*.rules`` files in the directory named by ``CLINIC_RULES_DIR``,
+one rule per line::
+
+    # kind | conditions | text
+    check    | bp_high & expecting | Raised BP in pregnancy: ask about headache, swelling and vision.
+    question | fever & !has_pcv    | Should I have a PCV or malaria test today?
+
+``kind`` is ``check`` or ``question``; conditions are feature names joined with
+``&``, ``!`` negates one, and ``*`` means always. Rules are listed in file order
+after the built-in ones (files in name order). The directory is watched and
+reloaded while the app runs (see ``config.py``).
+"""
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .ranges import age_band
+
+KINDS = ("check", "question")
+MAX_QUESTIONS = 12
+
+FEATURES = (
+    "timeline_given",  # onset or progression answered
+    "has_hydration",   # any hydration question answered
+    "has_bp",
+    "bp_low",          # either reading in a BP_LOW_LABELS band (adults: systolic < 90 or diastolic < 60)
+    "bp_high",         # either reading in a BP_HIGH_LABELS band (adults: systolic >= 140 or diastolic >= 90)
+    "has_temp",
+    "fever",           # temperature label in FEVER_LABELS (>= 37.8 °C)
+    "has_pulse",
+    "has_pcv",
+    "pcv_low",         # below the PCV reference range for sex / pregnancy
+    "has_glucose",
+    "has_bmi",
+    "expecting",       # pregnant (antenatal ranges apply)
+    "caregiver",
+    "has_symptoms",
+    "has_meds",        # medicines or supplements listed
+)
+BIT = {name: 1 << i for i, name in enumerate(FEATURES)}
+
+# Range labels (ranges.RANGE_TABLES) behind the range-based features, so a feature always
+# agrees with the label shown on the page: age bands and ranges.json overrides included
+BP_LOW_LABELS = frozenset({"Low range"})
+BP_HIGH_LABELS = frozenset({"High range"})
+FEVER_LABELS = frozenset({"Fever range", "High fever range"})
+
+class Rule(NamedTuple):
+    kind: str
+    requires: int   # feature bits that must all be set
+    excludes: int   # feature bits that must all be clear
+    text: str
+    order: int = 0  # position in the rule list (output order)
+
+def features(visit, labels: dict, bp_axes: Optional[Tuple[str, str]] = None, ranges=None) -> int:
+    """Feature bitmask of one visit (a ``VisitRecord``) given its classifier labels.
+
+    The page shows one combined BP label, so the BP features read each reading's own
+    label: ``bp_axes`` as ``RangeTables.bp_axes`` returned them when the caller has
+    them, else looked up in ``ranges`` (default: the current rule set's tables).
+    """
+    has_bp = visit.has_bp
+    if has_bp:
+        if bp_axes is None:
+            if ranges is None:
+                from .config import current  # config imports this module
+
+                ranges = current().ranges
+            bp_axes = ranges.bp_axes(visit.sys_bp, visit.dia_bp, age_band(visit.age))
+        sys_label, dia_label = bp_axes
+        bp_low = sys_label in BP_LOW_LABELS or dia_label in BP_LOW_LABELS
+        bp_high = sys_label in BP_HIGH_LABELS or dia_label in BP_HIGH_LABELS
+    else:
+        bp_low = bp_high = False
+    flags = (
+        bool(visit.onset or visit.progression),
+        visit.has_hydration,
+        has_bp,
+        bp_low,
+        bp_high,
+        visit.temp_c > 0,
+        labels["temp"] in FEVER_LABELS,
+        visit.pulse > 0,
+        visit.pcv > 0,
+        labels["pcv"] == "Below typical",
+        visit.glucose > 0,
+        visit.bmi is not None,
+        visit.expecting,
+        visit.caregiver,
+        bool(visit.symptoms),
+        bool(visit.meds or visit.supplements),
+    )
+    mask = 0
+    for i, flag in enumerate(flags):
+        if flag:
+            mask |= 1 << i
+    return mask
+
+def parse_conditions(text: str) -> Tuple[int, int]:
+    """``"bp_high & !expecting"`` -> (requires, excludes) bitmasks; ``*`` or blank means always."""
+    requires = excludes = 0
+    for term in text.split("&"):
+        term = term.strip()
+        if term in ("", "*"):
+            continue
+        negated = term.startswith("!")
+        name = term[1:].strip() if negated else term
+        if name not in BIT:
+            raise ValueError(f"Unknown feature {name!r} (expected one of: {', '.join(FEATURES)})")
+        if negated:
+            excludes |= BIT[name]
+        else:
+            requires |= BIT[name]
+    return requires, excludes
+
+def rule(kind: str, conditions: str, text: str) -> Rule:
+    if kind not in KINDS:
+        raise ValueError(f"Unknown rule kind {kind!r} (expected 'check' or 'question')")
+    requires, excludes = parse_conditions(conditions)
+    return Rule(kind, requires, excludes, text)
+
+# ---------------------------
+# Built-in rules (the original doctor checks and questions)
+# ---------------------------
+RULES = [
+    rule("check", "timeline_given", "Symptom timeline: when it started and whether it’s getting better/worse/same."),
+    rule("check", "!timeline_given", "Symptom timeline: when it started, what triggers it, what makes it better/worse."),
+    rule("check", "has_hydration", "Hydration: intake, vomiting/diarrhea, urine color and frequency, heat/sweating exposure."),
+    rule("check", "!has_hydration", "Hydration: fluid intake, urine color, vomiting/diarrhea, fever/heat exposure."),
+    rule("check", "*", "Medicines and supplements: BP meds, painkillers, antibiotics, herbs/supplements."),
+    rule("check", "bp_low", "Low BP range: hydration status, standing vs sitting readings, recent illness, medication effects."),
+    rule("check", "bp_high & !bp_low", "High BP range: repeat BP after rest, sleep/stress, salt intake, monitoring plan."),
+    rule("check", "has_bp & !bp_low & !bp_high", "BP interpretation: confirm correct cuff/position and repeat after rest if needed."),
+    rule("check", "fever", "Fever: likely causes in your context (including malaria/respiratory infections) and tests to confirm."),
+    rule("check", "pcv_low", "Low PCV: nutrition, malaria risk (if relevant), and bleeding history; consider iron studies/repeat test."),
+    rule("check", "has_glucose", "Glucose: confirm with fasting glucose or HbA1c if needed, depending on context and symptoms."),
+    rule("check", "has_bmi", "Weight/BMI: consider lifestyle risks and whether it relates to BP/glucose/sleep patterns."),
+
+    rule("question", "*", "Based on my symptoms and examination, what are the main things you are considering?"),
+    rule("question", "*", "Which result matters most right now, and which ones can be monitored later?"),
+    rule("question", "*", "Should we repeat any readings (BP/temperature) to confirm accuracy?"),
+    rule("question", "*", "Do I need more tests? If yes, which ones and when?"),
+    rule("question", "*", "What warning signs mean I should return urgently or go to emergency care?"),
+    rule("question", "*", "While we investigate, what practical steps should I focus on (hydration, rest, meals, sleep)?"),
+    rule("question", "has_bp", "Was my blood pressure checked properly (correct cuff size, sitting position, after rest)?"),
+    rule("question", "has_temp", "If this is fever, what causes are most likely in my case, and what tests are needed?"),
+    rule("question", "has_pulse", "Is my pulse expected for my condition (fever, pain, anxiety, dehydration)?"),
+    rule("question", "has_pcv", "If my PCV is low, should we check iron deficiency, malaria (if relevant), or bleeding?"),
+    rule("question", "has_glucose", "Should I do fasting glucose or HbA1c to confirm what this reading means?"),
+    rule("question", "has_hydration", "Could dehydration be contributing to my symptoms, and what should I monitor at home?"),
+    rule("question", "has_bmi", "Does my weight/BMI affect what you want to check (BP, glucose, sleep, lifestyle risks)?"),
+]
+
+class RuleSet:
+    """Rules indexed by required feature; ``evaluate`` returns the texts that apply, in rule order.
+
+    Results are also memoized per (mask, kind): a visit has one of at most 2**len(FEATURES)
+    masks and real traffic uses a few hundred, so most reruns are a dict lookup.
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules = [r._replace(order=i) for i, r in enumerate(rules)]
+        # entries are (requires, excludes, order, text) tuples
+        self._always: Dict[str, List[tuple]] = {kind: [] for kind in KINDS}
+        self._by_bit: Dict[str, Dict[int, List[tuple]]] = {kind: {} for kind in KINDS}
+        for r in self.rules:
+            entry = (r.requires, r.excludes, r.order, r.text)
+            if not r.requires:
+                self._always[r.kind].append(entry)
+                continue
+            # file under the required feature with the shortest list so far: keeps buckets even
+            buckets = self._by_bit[r.kind]
+            bits = [1 << i for i in range(r.requires.bit_length()) if r.requires >> i & 1]
+            key = min(bits, key=lambda b: len(buckets.get(b, ())))
+            buckets.setdefault(key, []).append(entry)
+        self._memo: Dict[Tuple[int, str], List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _evaluate(self, mask: int, kind: str) -> List[str]:
+        hits = [e for e in self._always[kind] if not mask & e[1]]
+        buckets = self._by_bit[kind]
+        rest = mask
+        while rest:
+            bit = rest & -rest
+            rest ^= bit
+            for e in buckets.get(bit, ()):
+                if mask & e[0] == e[0] and not mask & e[1]:
+                    hits.append(e)
+        hits.sort(key=lambda e: e[2])
+        return [e[3] for e in hits]
+
+    def evaluate(self, mask: int, kind: str) -> List[str]:
+        texts = self._memo.get((mask, kind))
+        if texts is None:
+            if len(self._memo) >= 4096:
+                self._memo.clear()
+            texts = self._memo[mask, kind] = self._evaluate(mask, kind)
+        return list(texts)
+
+    def doctor_checks(self, mask: int) -> List[str]:
+        return self.evaluate(mask, "check")
+
+    def questions(self, mask: int) -> List[str]:
+        return self.evaluate(mask, "question")[:MAX_QUESTIONS]
+
+def load_rules(path) -> List[Rule]:
+    """Read a ``*.rules`` file (``kind | conditions | text`` per line)."""
+    rules = []
+    for lineno, raw in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = [p.strip() for p in line.split("|", 2)]
+        if len(parts) != 3 or not parts[2]:
+            raise ValueError(f"{path}:{lineno}: expected 'kind | conditions | text', got {raw!r}")
+        try:
+            rules.append(rule(*parts))
+        except ValueError as exc:
+            raise ValueError(f"{path}:{lineno}: {exc}") from None
+    return rules
+
+def build_rules(files: Sequence = ()) -> RuleSet:
+    rules = list(RULES)
+    for path in files:
+        rules.extend(load_rules(path))
+    return RuleSet(rules)
+
+def default_rules() -> RuleSet:
+    """Process-wide rule set: ``RULES`` plus any files in ``CLINIC_RULES_DIR`` (as last reloaded)."""
+    from .config import current
+
+    return current().rules
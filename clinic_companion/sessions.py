@@ -0,0 +1,338 @@
+"""Per-session memory accounting and idle-session eviction for the Streamlit app.
+
+Every open browser tab is a Streamlit session holding the last submission
+(``intake``, ``trends``, ``visit_time``), the form's widget values and the files
+behind its download buttons and uploads. Tabs left open during a campaign keep
+all of that alive. Nothing here reads or changes a session's state from another
+thread: each session does its own bookkeeping from its own script runs.
+
+- ``touch`` (at the start and end of every app run) stamps the session's last
+  activity and publishes a pickled copy of its ``st.session_state`` to ``MONITOR``
+- ``evict_if_idle``, called from a ``run_every`` fragment on the page, drops the
+  session's results and uploaded files once it has had no full run for
+  ``CLINIC_SESSION_IDLE`` seconds (default 900, ``0`` = never); the page then
+  asks for a fresh submit
+- a daemon thread sweeps ``MONITOR`` every ``CLINIC_SESSION_SWEEP`` seconds: it
+  forgets closed sessions and measures the changed ones by loading their copies
+  under tracemalloc, so each state key's bytes are what tracemalloc saw allocated
+  for it. Tracing is switched on only for those few milliseconds: left on, it
+  slows the whole app several times over
+
+With ``CLINIC_TRACEMALLOC=<frames>`` tracemalloc instead runs from startup, and
+the report also lists the process's top allocation sites.
+
+The report is served as JSON on ``/sessions`` of the metrics endpoint
+(``CLINIC_METRICS_PORT``), with summary gauges on ``/metrics``.
+"""
+import gc
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, List, Optional
+
+DEFAULT_IDLE = float(os.environ.get("CLINIC_SESSION_IDLE", "900"))  # seconds; 0 disables eviction
+DEFAULT_SWEEP = float(os.environ.get("CLINIC_SESSION_SWEEP", "60"))
+MAX_MEASURE = 200  # changed sessions measured per sweep; the rest wait for the next one
+
+# app.py's per-submission results: dropped on eviction, rebuilt by the next submit
+RESULT_KEYS = ("intake", "trends", "visit_time")
+EVICTED_KEY = "evicted"
+ACTIVE_KEY = "last_active"  # MONITOR.clock() at the session's last full run; None once evicted
+
+logger = logging.getLogger("clinic_companion.sessions")
+
+_SHARED = (type, type(sys), type(len), type(lambda: 0))  # classes, modules, functions: never per-session
+
+def deep_size(obj, seen: Optional[set] = None) -> int:
+    """Bytes held by ``obj`` and everything it references (each object counted once per ``seen``)."""
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SHARED) or o is None:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        # the collector's view of what ``o`` references: containers, slots and instance
+        # attributes alike, without materializing lazily created ``__dict__``s
+        stack.extend(gc.get_referents(o))
+    return total
+
+# ---------------------------
+# Measuring state copies with tracemalloc
+# ---------------------------
+_TAG = "<session-state "  # code name each copy is loaded under: "<session-state 12>"
+MEASURE_FRAMES = 4  # enough to reach the tagged frame through unpickling helpers
+_MEASURE_LOCK = threading.Lock()
+
+def freeze(state) -> Dict[str, object]:
+    """Pickled copy of each session-state key (its ``deep_size`` when it cannot be pickled)."""
+    items = state.to_dict() if hasattr(state, "to_dict") else dict(state)
+    out = {}
+    for key, value in items.items():
+        if key == ACTIVE_KEY:  # changes every run; would make every sweep re-measure the session
+            continue
+        try:
+            out[key] = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception:  # unpicklable objects fail in many ways
+            out[key] = deep_size(value)
+    return out
+
+def _digest(frozen: Dict[str, object]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for key in sorted(frozen):
+        value = frozen[key]
+        h.update(key.encode("utf-8") + b"\0" + (value if isinstance(value, bytes) else repr(value).encode()) + b"\0")
+    return h.hexdigest()
+
+def _load(i: int, blob: bytes):
+    code = compile("loads(blob)", f"{_TAG}{i}>", "eval")
+    return eval(code, {"loads": pickle.loads, "blob": blob})
+
+def measure(states: Dict[str, Dict[str, object]]) -> Dict[str, Dict[str, int]]:
+    """Bytes per key of frozen session states (``freeze``), by session id.
+
+    Each copy is loaded under its own code name while tracemalloc traces (started
+    just for this unless it already runs), so a snapshot attributes every new block
+    to the copy that allocated it, whatever other threads do meanwhile.
+    """
+    sizes: Dict[str, Dict[str, int]] = {sid: {} for sid in states}
+    jobs = []
+    for sid, frozen in states.items():
+        for key, blob in frozen.items():
+            if isinstance(blob, bytes):
+                jobs.append((sid, key, blob))
+            else:
+                sizes[sid][key] = blob
+    if not jobs:
+        return sizes
+    with _MEASURE_LOCK:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(MEASURE_FRAMES)
+        try:
+            before = None if started else tracemalloc.take_snapshot()
+            copies = [_load(i, blob) for i, (_sid, _key, blob) in enumerate(jobs)]
+            after = tracemalloc.take_snapshot()
+        finally:
+            if started:
+                tracemalloc.stop()
+    del copies
+    # Freshly started, the snapshot holds only blocks allocated since; otherwise diff the two
+    stats = after.statistics("traceback") if before is None else after.compare_to(before, "traceback")
+    by_job = [0] * len(jobs)
+    for stat in stats:
+        size = stat.size if before is None else stat.size_diff
+        if size <= 0:
+            continue
+        for frame in stat.traceback:
+            if frame.filename.startswith(_TAG):
+                by_job[int(frame.filename[len(_TAG):-1])] += size
+                break
+    for (sid, key, _blob), size in zip(jobs, by_job):
+        sizes[sid][key] = size
+    return sizes
+
+# ---------------------------
+# Called from the session's own script run
+# ---------------------------
+def _script_ctx():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    return get_script_run_ctx()
+
+def touch(state) -> None:
+    """Record a full run of this session and publish its state to ``MONITOR``."""
+    ctx = _script_ctx()
+    if ctx is None:
+        return
+    state[ACTIVE_KEY] = MONITOR.clock()
+    MONITOR.publish(ctx.session_id, freeze(state))
+
+def evict_if_idle(state) -> bool:
+    """Drop this session's results and uploads after ``idle_timeout`` seconds without a full run.
+
+    Runs in the session's own script thread (a ``run_every`` fragment in app.py),
+    so it never races the session's script. True when results were dropped and
+    the page should be rerun.
+    """
+    timeout = MONITOR.idle_timeout
+    last = state.get(ACTIVE_KEY)
+    if not timeout or last is None or MONITOR.clock() - last < timeout:
+        return False
+    dropped = [key for key in RESULT_KEYS if key in state]
+    for key in dropped:
+        del state[key]
+    if dropped:
+        state[EVICTED_KEY] = True  # app.py tells the user why the results are gone
+    state[ACTIVE_KEY] = None  # nothing more to drop until the next full run
+    ctx = _script_ctx()
+    if ctx is not None:
+        ctx.uploaded_file_mgr.remove_session_files(ctx.session_id)
+        MONITOR.evicted(ctx.session_id, dropped)
+    return bool(dropped)
+
+# ---------------------------
+# Streamlit runtime access (only inside a running server)
+# ---------------------------
+def _runtime():
+    try:
+        from streamlit.runtime import Runtime
+    except ImportError:
+        return None
+    return Runtime.instance() if Runtime.exists() else None
+
+def _file_bytes(runtime, session_id: str) -> int:
+    """Bytes of a session's download and upload files (read-only; 0 if the managers change shape)."""
+    total = 0
+    try:
+        media = runtime.media_file_mgr
+        stored = getattr(media._storage, "_files_by_id", {})
+        for file_id in list(media._files_by_session_and_coord.get(session_id, {}).values()):
+            f = stored.get(file_id)
+            total += len(f.content) if f is not None else 0
+        uploads = getattr(runtime.uploaded_file_mgr, "file_storage", {})
+        for rec in list(uploads.get(session_id, {}).values()):
+            total += len(rec.data)
+    except (AttributeError, RuntimeError):  # RuntimeError: a dict changed size while we read it
+        return total
+    return total
+
+# ---------------------------
+# Monitor
+# ---------------------------
+class SessionMonitor:
+    """Collects what sessions publish, measures it and reports the largest sessions."""
+
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE, sweep_interval: float = DEFAULT_SWEEP,
+                 clock: Callable[[], float] = time.monotonic):
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        # session id -> {"state", "digest", "active", "evicted", "sizes", "measured"}
+        self._sessions: Dict[str, dict] = {}
+        self._usage: List[dict] = []
+        self._lock = threading.Lock()
+        self.sweeps = self.evictions = self.bytes_evicted = 0
+        self._thread = None
+
+    def publish(self, session_id: str, frozen: Dict[str, object]) -> None:
+        """A session's state after one of its full runs (see ``touch``)."""
+        digest = _digest(frozen)
+        with self._lock:
+            entry = self._sessions.setdefault(session_id, {"sizes": {}, "measured": None, "evicted": False})
+            entry.update(state=frozen, digest=digest, active=self.clock())
+            entry["evicted"] = entry["evicted"] and not any(key in frozen for key in RESULT_KEYS)
+
+    def evicted(self, session_id: str, keys: Iterable[str]) -> None:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            self.evictions += 1
+            if entry is not None:
+                self.bytes_evicted += sum(entry["sizes"].get(key, 0) for key in keys)
+                entry["evicted"] = True
+
+    def sweep(self, runtime=None) -> List[dict]:
+        """Forget closed sessions, measure the changed ones and keep the result for ``report``."""
+        runtime = runtime or _runtime()
+        with self._lock:
+            if runtime is not None:
+                for sid in [sid for sid in self._sessions if not runtime.is_active_session(sid)]:
+                    del self._sessions[sid]
+            pending = [(sid, entry["state"], entry["digest"]) for sid, entry in self._sessions.items()
+                       if entry["digest"] != entry["measured"]][:MAX_MEASURE]
+        sizes = measure({sid: frozen for sid, frozen, _digest in pending})
+        files = {sid: _file_bytes(runtime, sid) for sid in list(self._sessions)} if runtime is not None else {}
+        now = self.clock()
+        with self._lock:
+            for sid, _frozen, digest in pending:
+                entry = self._sessions.get(sid)
+                if entry is not None:
+                    entry["sizes"], entry["measured"] = sizes[sid], digest
+            usage = [{
+                "session": sid,
+                "connected": True,
+                "idle_s": round(now - entry["active"], 1),
+                "evicted": entry["evicted"],
+                "state_bytes": sum(entry["sizes"].values()),
+                "file_bytes": files.get(sid, 0),
+                "keys": dict(sorted(entry["sizes"].items(), key=lambda kv: -kv[1])),
+            } for sid, entry in self._sessions.items()]
+            usage.sort(key=lambda u: u["state_bytes"] + u["file_bytes"], reverse=True)
+            self._usage = usage
+            self.sweeps += 1
+        return usage
+
+    def report(self, top: int = 10) -> dict:
+        """Totals from the last sweep plus its ``top`` largest sessions."""
+        with self._lock:
+            usage = list(self._usage)
+            out = {
+                "sessions": len(usage),
+                "connected": sum(u["connected"] for u in usage),
+                "idle_timeout_s": self.idle_timeout,
+                "state_bytes": sum(u["state_bytes"] for u in usage),
+                "file_bytes": sum(u["file_bytes"] for u in usage),
+                "sweeps": self.sweeps,
+                "evictions": self.evictions,
+                "bytes_evicted": self.bytes_evicted,
+                "top": usage[:top],
+            }
+        if top and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            stats = tracemalloc.take_snapshot().statistics("lineno")[:top]
+            out["tracemalloc"] = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top_sites": [{"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                               "bytes": s.size, "blocks": s.count} for s in stats],
+            }
+        return out
+
+    def prometheus_lines(self) -> Iterable[str]:
+        r = self.report(top=0)
+        for name, kind, key in (
+            ("clinic_sessions", "gauge", "sessions"),
+            ("clinic_sessions_connected", "gauge", "connected"),
+            ("clinic_session_state_bytes", "gauge", "state_bytes"),
+            ("clinic_session_file_bytes", "gauge", "file_bytes"),
+            ("clinic_session_evictions_total", "counter", "evictions"),
+            ("clinic_session_evicted_bytes_total", "counter", "bytes_evicted"),
+        ):
+            value = r[key]
+            yield f"# TYPE {name} {kind}"
+            yield f"{name} {value}"
+
+    def start(self) -> None:
+        """Sweep every ``sweep_interval`` seconds from a daemon thread (once per process)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="clinic-sessions", daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception:  # a Streamlit internals change must not kill the thread
+                logger.exception("session sweep failed")
+
+MONITOR = SessionMonitor()
+
+def configure_from_env() -> None:
+    """Start tracemalloc (``CLINIC_TRACEMALLOC=<frames>``) and the sweep thread."""
+    frames = os.environ.get("CLINIC_TRACEMALLOC")
+    if frames and not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, int(frames)))
+    if MONITOR.sweep_interval > 0:
+        MONITOR.start()
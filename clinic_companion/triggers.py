@@ -0,0 +1,229 @@
+"""Multi-pattern symptom trigger matching (Aho-Corasick).
+
+All trigger phrases -- the English defaults plus any loaded synonym packs -- are
+compiled once into a single automaton, so scanning symptom text is one pass over
+the text no matter how many phrases are registered.
+
+Synonym packs are plain text files, one ``phrase => trigger`` pair per line, where
+``trigger`` is one of the keys in ``SYMPTOM_TRIGGERS`` (e.g. ``chest pain``).
+Blank lines and lines starting with ``#`` are ignored. A line starting with ``!``
+lists real words of that language that are never typo-corrected to a trigger word
+(see ``fuzzy.py``). The packs shipped with the app live in ``clinic_companion/packs``.
+
+Pack phrases shorter than ``SHORT_PHRASE`` letters only fire as whole words and are
+never typo-corrected: folded, Yoruba "dákú" (fainted) is also inside "dákun"
+(please), and "ẹ̀gbà" (stroke) inside the place name "Egbado".
+
+Misspelled phrases ("chest pian", "siezure") are caught by a typo-tolerant index
+over the same phrases (see ``fuzzy.py``) that runs alongside the automaton.
+"""
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Sequence, Set, Tuple
+import unicodedata
+
+from .fuzzy import FuzzyIndex
+
+PACKS_DIR = Path(__file__).with_name("packs")
+
+# Bump when the layout of ``TriggerMatcher.state()`` (or the fuzzy index in it) changes,
+# so artifacts written by older code are not loaded.
+STATE_VERSION = b"matcher-4"
+
+SHORT_PHRASE = 6  # pack phrases shorter than this (folded) must be whole words
+
+class TriggerMatch(NamedTuple):
+    phrase: str    # the phrase that fired (folded form, as registered)
+    trigger: str   # canonical trigger key from SYMPTOM_TRIGGERS
+    label: str     # user-facing red-flag label
+    start: int     # span in the original text
+    end: int
+    fuzzy: bool = False  # matched only after correcting a typo
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics so "Àyà" and "aya" match the same phrase."""
+    return _fold_with_offsets(text)[0]
+
+def _fold_with_offsets(text: str):
+    """Folded text plus, for non-ASCII input, the original index of each folded char."""
+    text = text or ""
+    if text.isascii():
+        return text.lower(), None
+    chars, offsets = [], []
+    for i, ch in enumerate(text):
+        for c in unicodedata.normalize("NFKD", ch):
+            if not unicodedata.combining(c):
+                for low in c.lower():
+                    chars.append(low)
+                    offsets.append(i)
+    return "".join(chars), offsets
+
+def _read_pack(path) -> Tuple[List[Tuple[str, str]], Set[str]]:
+    """``(phrase, trigger)`` pairs and folded ``!`` real words of a pack file."""
+    pairs, real_words = [], set()
+    for lineno, raw in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("!"):
+            real_words.update(fold(line[1:]).split())
+            continue
+        phrase, sep, trigger = line.partition("=>")
+        if not sep or not phrase.strip() or not trigger.strip():
+            raise ValueError(f"{path}:{lineno}: expected 'phrase => trigger', got {raw!r}")
+        pairs.append((phrase.strip(), trigger.strip()))
+    return pairs, real_words
+
+def load_pack(path) -> List[Tuple[str, str]]:
+    """Read a synonym pack file into ``(phrase, trigger)`` pairs."""
+    return _read_pack(path)[0]
+
+def _word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+def bundled_packs() -> List[Path]:
+    return sorted(PACKS_DIR.glob("*.txt"))
+
+class TriggerMatcher:
+    """Aho-Corasick automaton over trigger phrases.
+
+    ``triggers`` is the ordered ``(key, label)`` list; its order decides the order
+    labels are reported in. ``synonyms`` are extra ``(phrase, key)`` pairs that fire
+    the same trigger as ``key``; those shorter than ``SHORT_PHRASE`` only fire as
+    whole words. With ``fuzzy`` (the default) misspellings of every other phrase
+    fire too, except into one of the ``real_words``.
+    """
+
+    def __init__(self, triggers: Sequence[Tuple[str, str]], synonyms: Iterable[Tuple[str, str]] = (),
+                 fuzzy: bool = True, real_words: Iterable[str] = ()):
+        self.triggers = list(triggers)
+        index = {key: i for i, (key, _) in enumerate(self.triggers)}
+        phrases = [(fold(key), i, False) for i, (key, _) in enumerate(self.triggers)]
+        for phrase, key in synonyms:
+            if key not in index:
+                raise ValueError(f"Synonym {phrase!r} points to unknown trigger {key!r}")
+            phrase = fold(phrase)
+            phrases.append((phrase, index[key], len(phrase) < SHORT_PHRASE))
+
+        # goto[state] maps a char to the next state; out[state] lists
+        # (phrase_len, trigger_idx, phrase, whole_word)
+        self._goto = [{}]
+        self._out = [[]]
+        seen = {}
+        for phrase, idx, whole in phrases:
+            if not phrase or (phrase, idx) in seen:
+                continue
+            seen[phrase, idx] = whole
+            state = 0
+            for ch in phrase:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((len(phrase), idx, phrase, whole))
+        self.phrase_count = len(seen)
+        self.fuzzy = FuzzyIndex([p for p, whole in seen.items() if not whole], real_words) if fuzzy else None
+
+        # Breadth-first failure links; outputs are merged along them so a scan never walks the chain.
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def state(self) -> dict:
+        """Plain-data form of the automaton (what the precompiled artifact stores)."""
+        return {"triggers": self.triggers, "goto": self._goto, "fail": self._fail, "out": self._out,
+                "phrase_count": self.phrase_count,
+                "fuzzy": self.fuzzy.state() if self.fuzzy is not None else None}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "TriggerMatcher":
+        matcher = cls.__new__(cls)
+        matcher.triggers = [tuple(t) for t in state["triggers"]]
+        matcher._goto, matcher._fail, matcher._out = state["goto"], state["fail"], state["out"]
+        matcher.phrase_count = state["phrase_count"]
+        matcher.fuzzy = FuzzyIndex.from_state(state["fuzzy"]) if state["fuzzy"] is not None else None
+        return matcher
+
+    def _scan_folded(self, folded: str):
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        last = len(folded) - 1
+        for pos, ch in enumerate(folded):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for length, idx, phrase, whole in out[state]:
+                    start = pos + 1 - length
+                    if whole and ((start and _word_char(folded[start - 1]))
+                                  or (pos < last and _word_char(folded[pos + 1]))):
+                        continue
+                    yield start, pos + 1, idx, phrase
+
+    def scan(self, text: str) -> List[TriggerMatch]:
+        """Every phrase occurrence in ``text``, in text order, with spans into the original text."""
+        folded, offsets = _fold_with_offsets(text)
+        found = [(start, end, idx, phrase, False) for start, end, idx, phrase in self._scan_folded(folded)]
+        if self.fuzzy is not None:
+            exact = {(start, idx) for start, _, idx, _, _ in found}
+            found += [(start, end, idx, phrase, True) for start, end, idx, phrase in self.fuzzy.scan(folded)
+                      if (start, idx) not in exact]
+            found.sort(key=lambda m: (m[0], m[1]))
+        matches = []
+        for start, end, idx, phrase, fuzzy in found:
+            if offsets is not None:
+                start, end = offsets[start], offsets[end - 1] + 1
+            key, label = self.triggers[idx]
+            matches.append(TriggerMatch(phrase, key, label, start, end, fuzzy))
+        return matches
+
+    def trigger_ids(self, text: str) -> List[int]:
+        """Indexes of the triggers that fired, in trigger-list order."""
+        folded = fold(text)
+        ids = {idx for _, _, idx, _ in self._scan_folded(folded)}
+        if self.fuzzy is not None:
+            ids |= self.fuzzy.trigger_ids(folded)
+        return sorted(ids)
+
+    def labels(self, text: str) -> List[str]:
+        """Labels of the triggers that fired, in trigger-list order (what ``red_flags`` reports)."""
+        return [self.triggers[i][1] for i in self.trigger_ids(text)]
+
+def build_matcher(triggers: Sequence[Tuple[str, str]], packs: Iterable = ()) -> TriggerMatcher:
+    synonyms, real_words = [], set()
+    for pack in packs:
+        pairs, words = _read_pack(pack)
+        synonyms.extend(pairs)
+        real_words |= words
+    return TriggerMatcher(triggers, synonyms, real_words=real_words)
+
+def matcher_fingerprint(triggers: Sequence[Tuple[str, str]], packs: Iterable) -> bytes:
+    from .precompiled import fingerprint
+    parts = [STATE_VERSION, repr([tuple(t) for t in triggers]).encode("utf-8")]
+    for pack in packs:
+        parts.append(Path(pack).read_bytes())
+    return fingerprint(*parts)
+
+@lru_cache(maxsize=1)
+def default_matcher() -> TriggerMatcher:
+    """Process-wide matcher over ``SYMPTOM_TRIGGERS`` and the bundled synonym packs."""
+    from .engine import SYMPTOM_TRIGGERS
+    from .precompiled import load_section
+    packs = bundled_packs()
+    state = load_section("matcher", matcher_fingerprint(SYMPTOM_TRIGGERS, packs))
+    if state is not None:
+        return TriggerMatcher.from_state(state)
+    return build_matcher(SYMPTOM_TRIGGERS, packs)